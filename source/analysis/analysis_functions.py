@@ -27,6 +27,7 @@ from tables import File, open_file
 from scipy.spatial.distance import cdist
 from source.analysis.dr_measure_correlations_to_user_score import read_user_scores
 from data_generation.datasets import InputDataset
+from data_generation.EmbeddingFile import EmbeddingFile
 from generate_data import generate_instance
 import plotly.express as px
 import matplotlib.pyplot as plt
@@ -76,12 +77,12 @@ def engineer_features(data: Dict, user_scores: pd.DataFrame):
     #############################################
 
     print("Loading embedding data.")
+    embedding_files: dict = {ds_name: EmbeddingFile(data[ds_name]["embedding_data"]) for ds_name in data}
     pbar: tqdm = tqdm(total=len(training_data))
     for ix, row in training_data.iterrows():
         ds_name, emb_id = ix
 
-        table: tables.group.Group = data[ds_name]["embedding_data"].root.projection_coordinates
-        embeddings[ds_name][emb_id] = table["model" + str(emb_id)].read()
+        embeddings[ds_name][emb_id] = embedding_files[ds_name].read_projection(emb_id)
         orig_data: InputDataset = data[ds_name]["hd_dataset"]
 
         # Same number of rows in features and labels?
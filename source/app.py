@@ -5,6 +5,7 @@ from functools import partial
 from flask import render_template
 from flask import request
 from flask import jsonify
+from flask import json
 import tables
 import pandas
 import math
@@ -18,17 +19,26 @@ import pickle
 from multiprocessing.pool import Pool as ProcessPool
 import logging
 import datetime
+import threading
 
 from data_generation.datasets import *
+from data_generation.EmbeddingFile import EmbeddingFile
 from data_generation.dimensionality_reduction import DimensionalityReductionKernel
-from objectives.topology_preservation_objectives import CorankingMatrix
+from objectives.topology_preservation_objectives import CorankingMatrix, NeighbourhoodGraph
 from utils import Utils
+from model_detail_cache import ModelDetailCache
 
 
 # Initialize logger.
 logger: logging.Logger = Utils.create_logger()
 # Initialize flask app.
 app = Utils.init_flask_app(sys.argv)
+# Initialize cache for model details. Responses for models close to the one viewed last are prefetched.
+model_detail_cache: ModelDetailCache = ModelDetailCache(cache_path=app.config["CACHE_ROOT"] + "/model_details")
+NUM_PREFETCHED_MODEL_DETAILS: int = 4
+# Serializes access to .h5 files, since request threads and the cache's prefetching thread read them concurrently and
+# HDF5 isn't thread-safe unless built with thread safety enabled.
+h5_file_lock: threading.Lock = threading.Lock()
 
 
 # root: Render HTML for start menu.
@@ -47,6 +57,9 @@ def get_metadata():
     :return:
     """
 
+    # Models of previously loaded dataset are not needed anymore.
+    model_detail_cache.cancel_prefetching()
+
     app.config["DATASET_NAME"] = InputDataset.check_dataset_name(request.args.get('datasetName'))
     app.config["DR_KERNEL_NAME"] = DimensionalityReductionKernel.check_kernel_name(request.args.get('drKernelName'))
     app.config["CACHE_ROOT"] = "/tmp/" + app.config["DATASET_NAME"] + "_" + app.config["DR_KERNEL_NAME"]
@@ -81,11 +94,16 @@ def get_metadata():
         # Load dataset.
         ###################################################
 
-        h5file = tables.open_file(filename=file_name, mode="r")
-        # Cast to dataframe, then return as JSON.
-        df = pandas.DataFrame(h5file.root.metadata[:]).set_index("id")
-        # Close file.
-        h5file.close()
+        with h5_file_lock:
+            h5file = tables.open_file(filename=file_name, mode="r")
+            # Cast to dataframe, then return as JSON.
+            df = pandas.DataFrame(h5file.root.metadata[:]).set_index("id")
+            # Determine whether objectives were computed on full neighbourhood rankings or on a neighbourhood graph.
+            app.config["MAX_K"] = EmbeddingFile.read_max_k(h5file)
+            # Close file.
+            h5file.close()
+        # Drop runtimes per objective, which are only recorded for profiling data generation.
+        df = df.drop(columns=[col for col in df.columns if col.startswith("runtime_")])
 
         ###################################################
         # Preprocess and cache dataset.
@@ -104,6 +122,14 @@ def get_metadata():
                 metadata_template=app.config["METADATA_TEMPLATE"], embeddings_metadata=df
             )
 
+        # Scale hyperparameters and objectives to [0, 1] for finding models close to the one shown in detail view.
+        neighbourhood_features: pd.DataFrame = pd.concat([
+            app.config["EMBEDDING_METADATA"]["features_preprocessed"], app.config["EMBEDDING_METADATA"]["labels"]
+        ], axis=1).astype(float)
+        app.config["EMBEDDING_METADATA"]["neighbourhood_features"] = (
+            neighbourhood_features - neighbourhood_features.min()
+        ) / (neighbourhood_features.max() - neighbourhood_features.min()).replace(0, 1)
+
         ###################################################
         # Load global surrogate models and local
         # explainer values.
@@ -289,59 +315,29 @@ def get_surrogate_model_data():
 @app.route('/get_binned_pointwise_quality_data', methods=["GET"])
 def get_binned_pointwise_quality_data():
     """
-    Calculates and fetches binned pointwise embedding quality of individual samples for each DR model parametrizations.
-    :return: Jsonified object with percentages of bins with bin labels.
+    Fetches binned pointwise embedding quality of individual samples for each DR model parametrizations. Histograms are
+    read from the histogram table written at generation time (see EmbeddingFile.read_pointwise_quality_histograms()) and
+    only computed for numbers of bins or models not stored there.
+    GET parameters:
+        - "nbins" for number of bins of equal width in [0, 1]. Defaults to 10.
+    :return: Jsonified list with share of records per bin ("bin_<index>") for each model, in order of model IDs.
     """
     file_name: str = app.config["FULL_FILE_NAME"]
-    cached_file_path: str = app.config["CACHE_ROOT"] + "_pointwise_quality_binned.pkl"
     number_of_bins: int = int(request.args["nbins"]) if "nbins" in request.args else 10
 
     if os.path.isfile(file_name):
-        if os.path.isfile(cached_file_path):
-            return pd.read_pickle(cached_file_path).to_json(orient='records')
-
-        h5file = open_file(filename=file_name, mode="r+")
-
-        # ------------------------------------------------------
-        # 1. Get metadata on numbers of models and samples.
-        # ------------------------------------------------------
-
-        # Use arbitrary model to fetch number of records/points in model.
-        num_records = h5file.root.metadata[0][1]
-        # Initialize numpy matrix for pointwise qualities.
-        pointwise_qualities = np.zeros([h5file.root.metadata.nrows, num_records])
-
-        # ------------------------------------------------------
-        # 2. Iterate over models.
-        # ------------------------------------------------------
-
-        for model_pointwise_quality_leaf in h5file.walk_nodes("/pointwise_quality/", classname="CArray"):
-            model_id = int(model_pointwise_quality_leaf._v_name[5:])
-            pointwise_qualities[model_id - 1] = model_pointwise_quality_leaf.read().flatten()
-        h5file.close()
-
-        # Reshape data to desired model_id:sample_id:value format.
-        df = pandas.DataFrame(pointwise_qualities)
-        df["model_id"] = df.index
-        df = df.melt("model_id", var_name='sample_id', value_name="measure")
-
-        # Bin data.
-        df["bin"] = pd.DataFrame(
-            pd.cut(df.measure, number_of_bins, labels=["bin_" + str(i) for i in range(number_of_bins)])
+        with h5_file_lock:
+            h5file = open_file(filename=file_name, mode="r")
+            model_ids, counts = EmbeddingFile(h5file).read_pointwise_quality_histograms(number_of_bins)
+            h5file.close()
+
+        # Convert counts into shares of records per model.
+        df: pd.DataFrame = pd.DataFrame(
+            counts / np.maximum(counts.sum(axis=1, keepdims=True), 1),
+            index=pd.Index(model_ids, name="model_id"),
+            columns=["bin_" + str(i) for i in range(number_of_bins)]
         )
-        # Group my embedding.
-        df = df.drop(columns=["measure"]).groupby(
-            by=["model_id", "bin"]).count().reset_index().rename(columns={"sample_id": "count"})
-        # Pivot data to have one row per embedding (with percentages instead of absolute numbers).
-        df = df.pivot(index="model_id", columns="bin", values="count").fillna(0)
-        num_records: int = df[:1].sum(axis=1).values[0]
-        for col_name in df.columns:
-            df[col_name] = df[col_name] / num_records
-
-        # Cache result as file.
-        df.to_pickle(cached_file_path)
-
-        # Return jsonified version of model x sample quality matrix.
+
         return df.to_json(orient='records')
 
     else:
@@ -351,31 +347,116 @@ def get_binned_pointwise_quality_data():
 @app.route('/get_dr_model_details', methods=["GET"])
 def get_dr_model_details():
     """
-    Fetches data for DR model with specifie ID.
+    Fetches data for DR model with specifie ID. Responses are cached (see ModelDetailCache) and computed in background
+    for the models closest to this one.
     GET parameters:
         - "id" for ID of DR embedding.
     :return: Jsonified structure of surrogate model for DR metadata.
     """
 
     embedding_id: int = int(request.args["id"])
-    file_name: str = app.config["FULL_FILE_NAME"]
-    high_dim_file_name: str = app.config["STORAGE_PATH"] + "/records.csv"
-    high_dim_neighbour_ranking_file_name: str = app.config["STORAGE_PATH"] + "neighbourhood_ranking.pkl"
-    high_dim_distance_matrix_file_name = app.config["STORAGE_PATH"] + "distance_matrix.pkl"
 
     # Make sure all files exist.
-    for fn in (
-        file_name, high_dim_file_name, high_dim_neighbour_ranking_file_name, high_dim_distance_matrix_file_name
+    missing_file_name: str = find_missing_dr_model_file()
+    if missing_file_name is not None:
+        return "File " + missing_file_name + " does not exist.", 400
+
+    # Take snapshot of configuration, since it may change while responses are computed in background.
+    config: dict = {**app.config, "EMBEDDING_METADATA": dict(app.config["EMBEDDING_METADATA"])}
+    if embedding_id not in config["EMBEDDING_METADATA"]["original"].index:
+        return "Model with ID " + str(embedding_id) + " does not exist.", 400
+
+    response: bytes = model_detail_cache.get(
+        get_model_detail_cache_key(config, embedding_id), partial(compute_dr_model_details, config, embedding_id)
+    )
+
+    # Warm up cache with models close to this one in terms of hyperparameters and objectives.
+    neighbourhood_features: pd.DataFrame = config["EMBEDDING_METADATA"]["neighbourhood_features"]
+    distances: pd.Series = (
+        (neighbourhood_features - neighbourhood_features.loc[embedding_id]) ** 2
+    ).sum(axis=1).drop(index=embedding_id)
+    model_detail_cache.prefetch([
+        (get_model_detail_cache_key(config, model_id), partial(compute_dr_model_details, config, model_id))
+        for model_id in distances.nsmallest(NUM_PREFETCHED_MODEL_DETAILS).index
+    ])
+
+    return app.response_class(response, mimetype="application/json")
+
+
+def find_missing_dr_model_file() -> str:
+    """
+    Checks whether all files needed for computing details of DR models exist.
+    :return: Name of first missing file; None if all files exist.
+    """
+
+    # High-dimensional arrays may still be stored as pickles by older versions of generate_data.py. Datasets generated
+    # with max_k come with a neighbourhood graph instead of a neighbourhood ranking.
+    for fn, exists in (
+        (app.config["FULL_FILE_NAME"], os.path.isfile),
+        (app.config["STORAGE_PATH"] + "/records.csv", os.path.isfile),
+        (app.config["STORAGE_PATH"] + "neighbourhood_ranking.npy", Utils.find_array_file)
+        if app.config["MAX_K"] is None else
+        (app.config["STORAGE_PATH"] + "neighbourhood_graph.npz", os.path.isfile),
+        (app.config["STORAGE_PATH"] + "distance_matrix.npy", Utils.find_array_file)
     ):
-        if not os.path.isfile(fn):
-            return "File " + fn + " does not exist.", 400
+        if not exists(fn):
+            return fn
+
+    return None
+
+
+def compute_pairwise_displacement_data(config: dict, low_dim_projection: np.ndarray) -> pd.DataFrame:
+    """
+    Computes pairwise displacement data for DR model, using the neighbourhood ranking or - for datasets generated with
+    max_k - the neighbourhood graph of the current dataset.
+    :param config: Snapshot of app configuration.
+    :param low_dim_projection:
+    :return: See CorankingMatrix.compute_pairwise_displacement_data().
+    """
+
+    return CorankingMatrix.compute_pairwise_displacement_data(
+        config["STORAGE_PATH"] + "distance_matrix.npy",
+        config["STORAGE_PATH"] + "neighbourhood_ranking.npy",
+        low_dim_projection,
+        NeighbourhoodGraph.load(config["STORAGE_PATH"] + "neighbourhood_graph.npz").neighbours(config["MAX_K"])
+        if config["MAX_K"] is not None else None
+    )
+
+
+def get_model_detail_cache_key(config: dict, embedding_id: int) -> tuple:
+    """
+    Assembles key for model details in model detail cache.
+    :param config: Snapshot of app configuration.
+    :param embedding_id:
+    :return: Tuple of dataset name, DR kernel name, model ID and version of the files details are computed from.
+    """
+
+    return (
+        config["DATASET_NAME"],
+        config["DR_KERNEL_NAME"],
+        int(embedding_id),
+        max(os.stat(fn).st_mtime_ns for fn in (config["FULL_FILE_NAME"], config["EXPLAINER_VALUES_PATH"]))
+    )
+
+
+def compute_dr_model_details(config: dict, embedding_id: int) -> bytes:
+    """
+    Computes details for DR model with specified ID.
+    :param config: Snapshot of app configuration.
+    :param embedding_id:
+    :return: Serialized JSON response.
+    """
 
-    # Open file containing information on low-dimensional projections.
-    print(file_name)
-    h5file: File = open_file(filename=file_name, mode="r+")
+    file_name: str = config["FULL_FILE_NAME"]
+
+    # Read coordinates for low-dimensional projection and pointwise quality numbers of this embedding.
+    with h5_file_lock:
+        h5file: File = open_file(filename=file_name, mode="r")
+        embedding_file: EmbeddingFile = EmbeddingFile(h5file)
+        low_dim_projection: np.ndarray = embedding_file.read_projection(embedding_id)
+        pointwise_quality: np.ndarray = embedding_file.read_pointwise_quality(embedding_id)
+        h5file.close()
 
-    # Read coordinates for low-dimensional projection of this embedding.
-    low_dim_projection: np.ndarray = h5file.root.projection_coordinates._f_get_child("model" + str(embedding_id)).read()
     # Workaround: Coordinates of very small magnitude are not properly displayed in frontend, so we move the comma a
     # few digits.
     if abs(low_dim_projection.max()) < 0.001:
@@ -383,23 +464,22 @@ def get_dr_model_details():
 
     # Fetch metadata about this dataset's attributes.
     attribute_data_types: dict = {
-        **app.config["DATASET_CLASS"].get_attributes_data_types(),
+        **config["DATASET_CLASS"].get_attributes_data_types(),
         **InputDataset.get_pointwise_metrics_data_types()
     }
 
     # Merge original high-dim. dataset with low-dim. coordinates.
-    original_dataset: pd.DataFrame = app.config["DATASET_CLASS"].sort_dataframe_columns_for_frontend(
+    original_dataset: pd.DataFrame = config["DATASET_CLASS"].sort_dataframe_columns_for_frontend(
         Utils.prepare_binned_original_dataset(
-            app.config["STORAGE_PATH"],
-            app.config["DATASET_NAME"],
-            # Fetch pointwise qualitity numbers for this embedding.
-            h5file.root.pointwise_quality._f_get_child("model" + str(embedding_id)).read()
+            config["STORAGE_PATH"],
+            config["DATASET_NAME"],
+            pointwise_quality
         )
     )
 
     original_dataset.insert(loc=0, column="id", value=[_ for _ in range(len(original_dataset))])
     # Prepare dataset for model detail table.
-    original_dataset_for_table: pd.DataFrame = app.config["DATASET_CLASS"].sort_dataframe_columns_for_frontend(
+    original_dataset_for_table: pd.DataFrame = config["DATASET_CLASS"].sort_dataframe_columns_for_frontend(
         original_dataset[[col for col in attribute_data_types.keys() if col in original_dataset.columns]]
     )
     original_dataset_for_table.insert(loc=0, column="id", value=[_ for _ in range(len(original_dataset))])
@@ -412,23 +492,18 @@ def get_dr_model_details():
         original_dataset[1] = 0
 
     # Compute pairwise displacement data.
-    pairwise_displacement_data: pd.DataFrame = CorankingMatrix.compute_pairwise_displacement_data(
-        high_dim_distance_matrix_file_name,
-        high_dim_neighbour_ranking_file_name,
-        low_dim_projection
-    )
-    pairwise_displacement_data.to_pickle("/tmp/pairwise_displacement_data.pkl")
+    pairwise_displacement_data: pd.DataFrame = compute_pairwise_displacement_data(config, low_dim_projection)
 
     # Fetch dataframe with preprocessed features.
-    embedding_metadata_feat_df = app.config["EMBEDDING_METADATA"]["features_preprocessed"].loc[[embedding_id]]
+    embedding_metadata_feat_df = config["EMBEDDING_METADATA"]["features_preprocessed"].loc[[embedding_id]]
 
     # Drop index for categorical variables that are inactive for this record.
     param_indices: list = Utils.get_active_col_indices(
-        embedding_metadata_feat_df, app.config["EMBEDDING_METADATA"], embedding_id
+        embedding_metadata_feat_df, config["EMBEDDING_METADATA"], embedding_id
     )
 
     # Retrieve SHAP estimates.
-    explainer_values: pd.DataFrame = app.config["EXPLAINER_VALUES"].loc[embedding_id]
+    explainer_values: pd.DataFrame = config["EXPLAINER_VALUES"].loc[embedding_id]
     # Drop runtime (since dropped in frontend).
     explainer_values = explainer_values[explainer_values.objective != "runtime"]
     # todo (remove, generate data cleanly) Hack: Rename target_domain_performance and n_components here.
@@ -445,7 +520,7 @@ def get_dr_model_details():
         # --------------------------------------------------------
 
         # Transform node with this model into a dataframe so we can easily retain column names.
-        "model_metadata": app.config["EMBEDDING_METADATA"]["original"].rename(
+        "model_metadata": config["EMBEDDING_METADATA"]["original"].rename(
             # todo (remove, generate data cleanly) Hack: Rename target_domain_performance and n_components here.
             columns={"target_domain_performance": "rdp", "separability_metric": "separability"}
         ).to_json(orient='index'),
@@ -481,7 +556,7 @@ def get_dr_model_details():
 
         "explanation_columns": [
             # Hardcoded workaround for one-hot encoded category attribute: Rename to "metric".
-            col for col in app.config["EMBEDDING_METADATA"]["features_preprocessed"].columns.values[param_indices]
+            col for col in config["EMBEDDING_METADATA"]["features_preprocessed"].columns.values[param_indices]
         ],
         "explanations": {
             objective: [
@@ -494,10 +569,92 @@ def get_dr_model_details():
         }
     }
 
-    # Close file with low-dim. data.
-    h5file.close()
+    with app.app_context():
+        return json.dumps(result).encode("utf-8")
+
+
+@app.route('/get_dr_model_displacement_data', methods=["GET"])
+def get_dr_model_displacement_data():
+    """
+    Fetches pairwise displacement data and binned co-ranking matrix data of DR model with specified ID as compact binary
+    payload (see Utils.encode_binary_columns()) instead of JSON records as in /get_dr_model_details.
+    GET parameters:
+        - "id" for ID of DR embedding.
+        - "max_pairs" for maximal number of record pairs for Shepard diagram. If there are more, pairs are sampled
+          uniformly (with a fixed seed). All pairs are returned if not set.
+    :return: Binary payload with header entries "num_records", "num_pairs" (number of pairs before sampling) and
+    "n_bins" (number of co-ranking matrix bins per axis) and columns:
+        - "source", "neighbour" (uint32), "high_dim_distance", "low_dim_distance" (float32): Record pairs for Shepard
+          diagram, ordered by source and neighbour.
+        - "coranking_bin_offsets" (uint32): Start of pairs in each co-ranking matrix bin, ordered by high- and then by
+          low-dimensional neighbour bin, followed by total number of pairs.
+        - "coranking_sources", "coranking_neighbours" (uint32): Record pairs grouped by co-ranking matrix bin.
+    """
+
+    embedding_id: int = int(request.args["id"])
+    max_pairs: int = int(request.args["max_pairs"]) if "max_pairs" in request.args else None
+
+    # Make sure all files exist.
+    missing_file_name: str = find_missing_dr_model_file()
+    if missing_file_name is not None:
+        return "File " + missing_file_name + " does not exist.", 400
+
+    config: dict = {**app.config, "EMBEDDING_METADATA": dict(app.config["EMBEDDING_METADATA"])}
+    if embedding_id not in config["EMBEDDING_METADATA"]["original"].index:
+        return "Model with ID " + str(embedding_id) + " does not exist.", 400
+
+    response: bytes = model_detail_cache.get(
+        get_model_detail_cache_key(config, embedding_id) + ("displacement", max_pairs),
+        partial(compute_dr_model_displacement_data, config, embedding_id, max_pairs)
+    )
+
+    return app.response_class(response, mimetype="application/octet-stream")
+
+
+def compute_dr_model_displacement_data(config: dict, embedding_id: int, max_pairs: int = None) -> bytes:
+    """
+    Computes pairwise displacement and co-ranking matrix data of DR model with specified ID.
+    :param config: Snapshot of app configuration.
+    :param embedding_id:
+    :param max_pairs: Maximal number of record pairs for Shepard diagram. See get_dr_model_displacement_data().
+    :return: Binary payload. See get_dr_model_displacement_data().
+    """
+
+    with h5_file_lock:
+        h5file: File = open_file(filename=config["FULL_FILE_NAME"], mode="r")
+        low_dim_projection: np.ndarray = EmbeddingFile(h5file).read_projection(embedding_id)
+        h5file.close()
+    # Same workaround for coordinates of very small magnitude as in compute_dr_model_details().
+    if abs(low_dim_projection.max()) < 0.001:
+        low_dim_projection = low_dim_projection * 10000
 
-    return jsonify(result)
+    pairwise_displacement_data: pd.DataFrame = compute_pairwise_displacement_data(config, low_dim_projection)
+
+    # Sample pairs for Shepard diagram.
+    num_pairs: int = len(pairwise_displacement_data)
+    pair_indices: np.ndarray = np.arange(num_pairs) if max_pairs is None or max_pairs >= num_pairs else np.sort(
+        np.random.default_rng(0).choice(num_pairs, size=max_pairs, replace=False)
+    )
+    shepard_data: pd.DataFrame = pairwise_displacement_data.iloc[pair_indices]
+
+    # Group pairs by co-ranking matrix bin.
+    n_bins: int = 10
+    coranking_bin_offsets, coranking_sources, coranking_neighbours = CorankingMatrix.bin_coranking_matrix_paths(
+        pairwise_displacement_data, n_bins
+    )
+
+    return Utils.encode_binary_columns(
+        {
+            "source": shepard_data.source.values.astype(np.uint32),
+            "neighbour": shepard_data.neighbour.values.astype(np.uint32),
+            "high_dim_distance": shepard_data.high_dim_distance.values.astype(np.float32),
+            "low_dim_distance": shepard_data.low_dim_distance.values.astype(np.float32),
+            "coranking_bin_offsets": coranking_bin_offsets.astype(np.uint32),
+            "coranking_sources": coranking_sources.astype(np.uint32),
+            "coranking_neighbours": coranking_neighbours.astype(np.uint32)
+        },
+        {"num_records": len(low_dim_projection), "num_pairs": num_pairs, "n_bins": n_bins}
+    )
 
 
 @app.route('/compute_correlation_strength', methods=["GET"])
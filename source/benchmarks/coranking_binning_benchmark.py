@@ -0,0 +1,116 @@
+"""
+Benchmarks binning record pairs for the co-ranking matrix view with CorankingMatrix.bin_coranking_matrix_paths() and
+CorankingMatrix.bin_coranking_matrix_data() against the original implementation based on pd.cut() and groupby(), and
+checks that results are identical.
+Both bin_coranking_matrix_data() and the original implementation build one Python tuple per record pair, which needs
+more than 100 bytes per pair. They are thus only run for up to MAX_OBJECT_SIZE records.
+Run from source/ with: python -m benchmarks.coranking_binning_benchmark [number of records, ...].
+"""
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from objectives.topology_preservation_objectives.CorankingMatrix import CorankingMatrix
+
+
+MAX_OBJECT_SIZE: int = 5000
+
+
+def bin_coranking_matrix_data_with_pandas(pairwise_displacement_data: pd.DataFrame, n_bins: int = 10) -> pd.DataFrame:
+    """
+    Original implementation of CorankingMatrix.bin_coranking_matrix_data().
+    :param pairwise_displacement_data:
+    :param n_bins:
+    :return:
+    """
+
+    df: pd.DataFrame = pairwise_displacement_data.copy()
+
+    df["high_dim_neighbour_bin"] = pd.cut(
+        df.high_dim_neighbour_rank, bins=n_bins, labels=[i for i in range(n_bins)]
+    )
+    df["low_dim_neighbour_bin"] = pd.cut(df.low_dim_neighbour_rank, bins=n_bins, labels=[i for i in range(n_bins)])
+
+    grouped = df.groupby(["high_dim_neighbour_bin", "low_dim_neighbour_bin"], observed=False)
+    res: pd.DataFrame = pd.DataFrame(
+        {"source": grouped["source"].apply(list), "neighbour": grouped["neighbour"].apply(list)}
+    )
+
+    res["paths"] = res.apply(
+        lambda x: list(
+            map(tuple, np.stack([x.source, x.neighbour], axis=1).tolist())
+        ) if type(x.source) == list else [],
+        axis=1
+    )
+
+    return res[["paths"]].reset_index()
+
+
+def generate_pairwise_displacement_data(n: int, rng: np.random.RandomState) -> pd.DataFrame:
+    """
+    Generates record pairs with neighbour ranks as produced by CorankingMatrix.compute_pairwise_displacement_data().
+    Low-dim. ranks are noisy versions of high-dim. ranks, so that pairs concentrate around the diagonal.
+    :param n: Number of records.
+    :param rng:
+    :return:
+    """
+
+    high_dim_ranks: np.ndarray = np.empty((n, n - 1), dtype=np.int32)
+    low_dim_ranks: np.ndarray = np.empty((n, n - 1), dtype=np.int32)
+    for i in range(n):
+        high_dim_ranks[i] = rng.permutation(n - 1) + 1
+        low_dim_ranks[i] = np.argsort(np.argsort(high_dim_ranks[i] + rng.normal(scale=n / 10, size=n - 1))) + 1
+
+    neighbours: np.ndarray = np.tile(np.arange(n - 1, dtype=np.int32), n)
+    sources: np.ndarray = np.repeat(np.arange(n, dtype=np.int32), n - 1)
+
+    return pd.DataFrame({
+        "source": sources,
+        # Skip auto-referential pairs.
+        "neighbour": neighbours + (neighbours >= sources),
+        "high_dim_neighbour_rank": high_dim_ranks.ravel(),
+        "low_dim_neighbour_rank": low_dim_ranks.ravel()
+    })
+
+
+if __name__ == '__main__':
+    sizes: list = [int(arg) for arg in sys.argv[1:]] if len(sys.argv) > 1 else [5000, 20000]
+    rng: np.random.RandomState = np.random.RandomState(42)
+
+    print(
+        "n".rjust(8), "pairs".rjust(12), "pandas [s]".rjust(11), "paths [s]".rjust(10), "data [s]".rjust(9),
+        "speedup".rjust(8), "identical".rjust(10)
+    )
+    for n in sizes:
+        pairwise_displacement_data: pd.DataFrame = generate_pairwise_displacement_data(n, rng)
+
+        start: float = time.time()
+        CorankingMatrix.bin_coranking_matrix_paths(pairwise_displacement_data)
+        runtime_paths: float = time.time() - start
+
+        runtime_data: float = None
+        runtime_pandas: float = None
+        identical: bool = None
+        if n <= MAX_OBJECT_SIZE:
+            start = time.time()
+            binned_data: pd.DataFrame = CorankingMatrix.bin_coranking_matrix_data(pairwise_displacement_data)
+            runtime_data = time.time() - start
+
+            start = time.time()
+            binned_data_pandas: pd.DataFrame = bin_coranking_matrix_data_with_pandas(pairwise_displacement_data)
+            runtime_pandas = time.time() - start
+
+            identical = binned_data.to_dict(orient="records") == binned_data_pandas.to_dict(orient="records")
+            del binned_data, binned_data_pandas
+
+        print(
+            str(n).rjust(8),
+            str(len(pairwise_displacement_data)).rjust(12),
+            ("%.3f" % runtime_pandas if runtime_pandas is not None else "-").rjust(11),
+            ("%.3f" % runtime_paths).rjust(10),
+            ("%.3f" % runtime_data if runtime_data is not None else "-").rjust(9),
+            ("%.1fx" % (runtime_pandas / runtime_data) if runtime_pandas is not None else "-").rjust(8),
+            str(identical if identical is not None else "-").rjust(10)
+        )
@@ -0,0 +1,49 @@
+"""
+Benchmarks construction of co-ranking matrices with np.bincount against the original np.histogram2d implementation.
+Run from source/ with: python -m benchmarks.coranking_matrix_benchmark [number of records, ...].
+"""
+
+import sys
+import time
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from objectives.topology_preservation_objectives.CorankingMatrix import CorankingMatrix
+
+
+if __name__ == '__main__':
+    sizes: list = [int(arg) for arg in sys.argv[1:]] if len(sys.argv) > 1 else [1000, 2000, 5000]
+    rng: np.random.RandomState = np.random.RandomState(42)
+
+    print("n".rjust(8), "histogram2d [s]".rjust(16), "bincount [s]".rjust(14), "speedup".rjust(9), "identical".rjust(10))
+    for n in sizes:
+        # Random high-dimensional data and a noisy linear projection as stand-in for an embedding.
+        high_dim_data: np.ndarray = rng.normal(size=(n, 20))
+        low_dim_data: np.ndarray = high_dim_data[:, :2] + rng.normal(scale=0.5, size=(n, 2))
+
+        high_dim_ranking: np.ndarray = CorankingMatrix.generate_neighbourhood_ranking(
+            cdist(high_dim_data, high_dim_data, "euclidean")
+        )
+        low_dim_ranking: np.ndarray = CorankingMatrix.generate_neighbourhood_ranking(
+            cdist(low_dim_data, low_dim_data, "euclidean")
+        )
+
+        start: float = time.time()
+        Q_histogram: np.ndarray = CorankingMatrix.compute_coranking_matrix(
+            high_dim_ranking, low_dim_ranking, method="histogram2d"
+        )
+        runtime_histogram: float = time.time() - start
+
+        start = time.time()
+        Q_bincount: np.ndarray = CorankingMatrix.compute_coranking_matrix(
+            high_dim_ranking, low_dim_ranking, method="bincount"
+        )
+        runtime_bincount: float = time.time() - start
+
+        print(
+            str(n).rjust(8),
+            ("%.3f" % runtime_histogram).rjust(16),
+            ("%.3f" % runtime_bincount).rjust(14),
+            ("%.1fx" % (runtime_histogram / runtime_bincount)).rjust(9),
+            str(np.array_equal(Q_histogram, Q_bincount)).rjust(10)
+        )
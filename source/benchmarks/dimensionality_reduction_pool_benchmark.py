@@ -0,0 +1,146 @@
+"""
+Benchmarks model generation with the process pool against the previous static split of parameter sets amongst threads.
+Run from source/ with:
+    python -m benchmarks.dimensionality_reduction_pool_benchmark dataset_name path_to_data_folder [kernel_name]
+    [number of parameter sets] [number of workers].
+Parameter sets are sampled from the kernel's grid (TSNE by default) with a fixed seed.
+Dataset name "synthetic" uses a random regression dataset with NUM_SYNTHETIC_RECORDS records instead of a dataset from
+raw_data/.
+The number of physical and logical cores is reported alongside the runtimes, since the speedup is bounded by the
+former - on a single core both variants are expected to perform alike.
+"""
+
+import sys
+import time
+import queue
+import random
+import platform
+import psutil
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_regression
+from sklearn.preprocessing import StandardScaler
+
+from generate_data import generate_instance
+from objectives.topology_preservation_objectives.CorankingMatrix import CorankingMatrix
+from data_generation.datasets import InputDataset
+from data_generation.dimensionality_reduction import DimensionalityReductionKernel
+from data_generation.dimensionality_reduction.DimensionalityReductionThread import DimensionalityReductionThread
+from data_generation.dimensionality_reduction.DimensionalityReductionProcessPool import \
+    DimensionalityReductionProcessPool
+
+
+NUM_SYNTHETIC_RECORDS: int = 1000
+
+
+class SyntheticDataset(InputDataset):
+    """
+    Random regression dataset, so that the benchmark can be run without the raw datasets.
+    """
+
+    def _load_data(self) -> dict:
+        features, labels = make_regression(
+            n_samples=NUM_SYNTHETIC_RECORDS, n_features=20, n_informative=10, noise=1, random_state=42
+        )
+
+        return {
+            "features": pd.DataFrame(features, columns=["feature_" + str(i) for i in range(features.shape[1])]),
+            "labels": pd.Series(labels)
+        }
+
+    def _preprocess_hd_features(self) -> np.ndarray:
+        return StandardScaler().fit_transform(self._data["features"].values)
+
+    def persist_records(self):
+        pass
+
+    def compute_hd_target_domain_performance(self) -> float:
+        return self._compute_target_domain_performance(self._preprocessed_hd_features, n_jobs=-1)
+
+    def compute_relative_target_domain_performance(self, features: np.ndarray) -> float:
+        return self._hd_target_domain_performance / self._compute_target_domain_performance(features)
+
+    @staticmethod
+    def get_attributes_data_types() -> dict:
+        return {}
+
+    @staticmethod
+    def sort_dataframe_columns_for_frontend(df: pd.DataFrame) -> pd.DataFrame:
+        return df
+
+
+if __name__ == '__main__':
+    assert len(sys.argv) >= 3, "Arguments to be specified: (1) Dataset name, (2) path to data folder."
+
+    dataset_name: str = sys.argv[1]
+    storage_path: str = sys.argv[2] + "/" + dataset_name
+    dim_red_kernel_name: str = sys.argv[3] if len(sys.argv) > 3 else "TSNE"
+    num_parameter_sets: int = int(sys.argv[4]) if len(sys.argv) > 4 else 48
+    n_jobs: int = int(sys.argv[5]) if len(sys.argv) > 5 else psutil.cpu_count(logical=True)
+
+    dataset: InputDataset = SyntheticDataset(storage_path=storage_path) if dataset_name == "synthetic" else \
+        generate_instance(instance_dataset_name=dataset_name, storage_path=storage_path)
+    distance_matrix: np.ndarray = dataset.compute_distance_matrix()
+    high_dim_neighbourhood_ranking: np.ndarray = CorankingMatrix.generate_neighbourhood_ranking(distance_matrix)
+
+    # Sample parameter sets from full grid. File path doesn't exist, hence no parameter sets are filtered.
+    parameter_sets, _ = DimensionalityReductionKernel.generate_parameter_sets_for_testing(
+        data_file_path="", dim_red_kernel_name=dim_red_kernel_name
+    )
+    random.Random(42).shuffle(parameter_sets)
+    parameter_sets = parameter_sets[:num_parameter_sets]
+
+    # Threads with contiguous split of parameter sets.
+    thread_results: list = []
+    start: float = time.time()
+    threads: list = []
+    num_sets_per_thread: int = int(len(parameter_sets) / n_jobs)
+    for i in range(0, n_jobs):
+        first_index: int = num_sets_per_thread * i
+        last_index: int = first_index + num_sets_per_thread if i < (n_jobs - 1) else len(parameter_sets)
+        threads.append(
+            DimensionalityReductionThread(
+                results=thread_results,
+                distance_matrix=distance_matrix,
+                parameter_sets=parameter_sets[first_index:last_index],
+                input_dataset=dataset,
+                high_dimensional_neighbourhood_ranking=high_dim_neighbourhood_ranking,
+                dim_red_kernel_name=dim_red_kernel_name
+            )
+        )
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    runtime_threads: float = time.time() - start
+
+    # Process pool with dynamic scheduling.
+    pool_results: queue.Queue = queue.Queue()
+    start = time.time()
+    DimensionalityReductionProcessPool(
+        results=pool_results,
+        distance_matrix=distance_matrix,
+        parameter_sets=parameter_sets,
+        input_dataset=dataset,
+        high_dimensional_neighbourhood_ranking=high_dim_neighbourhood_ranking,
+        dim_red_kernel_name=dim_red_kernel_name,
+        n_jobs=n_jobs
+    ).run()
+    runtime_pool: float = time.time() - start
+
+    assert len(thread_results) == pool_results.qsize() == len(parameter_sets)
+
+    print(
+        "platform: %s, physical cores: %s, logical cores: %s" %
+        (platform.platform(), psutil.cpu_count(logical=False), psutil.cpu_count(logical=True))
+    )
+    print("kernel".rjust(8), "models".rjust(8), "workers".rjust(8), "threads [s]".rjust(12),
+          "processes [s]".rjust(14), "speedup".rjust(9))
+    print(
+        dim_red_kernel_name.rjust(8),
+        str(len(parameter_sets)).rjust(8),
+        str(n_jobs).rjust(8),
+        ("%.1f" % runtime_threads).rjust(12),
+        ("%.1f" % runtime_pool).rjust(14),
+        ("%.1fx" % (runtime_threads / runtime_pool)).rjust(9)
+    )
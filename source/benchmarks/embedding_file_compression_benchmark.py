@@ -0,0 +1,93 @@
+"""
+Benchmarks compression codecs for embedding files: Write throughput, read latency for a single model (as in the model
+detail view) and file size.
+Run from source/ with: python -m benchmarks.embedding_file_compression_benchmark [path to .h5 embedding file]
+[compression, ...]. Embeddings are taken from the specified file (storage format v1 or v2); random embeddings of 1000
+records are used if no file is specified.
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from tables import *
+
+from data_generation.EmbeddingFile import EmbeddingFile
+
+
+def load_embeddings(file_path: str) -> dict:
+    """
+    Loads all embeddings and pointwise quality values from file.
+    :param file_path:
+    :return: Dictionary with model ID -> (projection, pointwise quality values).
+    """
+
+    if file_path is None:
+        rng: np.random.RandomState = np.random.RandomState(42)
+        return {
+            model_id: (rng.normal(size=(1000, 1 + model_id % 2)), rng.uniform(size=(1000, 1)))
+            for model_id in range(500)
+        }
+
+    h5file: File = open_file(file_path, mode="r")
+    embedding_file: EmbeddingFile = EmbeddingFile(h5file)
+    embeddings: dict = {
+        model_id: (embedding_file.read_projection(model_id), embedding_file.read_pointwise_quality(model_id))
+        for model_id in embedding_file.model_ids()
+    }
+    h5file.close()
+
+    return embeddings
+
+
+if __name__ == '__main__':
+    source_file_path: str = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1].endswith(".h5") else None
+    compressions: list = [arg for arg in sys.argv[1:] if not arg.endswith(".h5")] or [
+        "zlib:3", "blosc:lz4:5", "blosc:lz4hc:5", "blosc:zstd:3", "blosc:blosclz:5"
+    ]
+
+    embeddings: dict = load_embeddings(source_file_path)
+    model_ids: list = sorted(embeddings.keys())
+    num_records: int = embeddings[model_ids[0]][0].shape[0]
+    num_dimensions: int = max([embedding[0].shape[1] for embedding in embeddings.values()])
+    raw_size: int = sum([embedding[0].nbytes + embedding[1].nbytes for embedding in embeddings.values()])
+    read_ids: list = list(np.random.RandomState(0).choice(model_ids, size=min(100, len(model_ids)), replace=False))
+
+    print(str(len(model_ids)) + " models with " + str(num_records) + " records, " +
+          "%.1f MB uncompressed." % (raw_size / 1024 ** 2))
+    print("compression".rjust(16), "write [MB/s]".rjust(13), "read [ms]".rjust(10), "size [MB]".rjust(10),
+          "ratio".rjust(7))
+
+    with tempfile.TemporaryDirectory() as directory:
+        for compression in compressions:
+            file_path: str = os.path.join(directory, compression.replace(":", "_") + ".h5")
+
+            start: float = time.time()
+            h5file: File = open_file(file_path, mode="w")
+            embedding_file: EmbeddingFile = EmbeddingFile.initialize(
+                h5file, num_records, num_dimensions, EmbeddingFile.parse_filters(compression)
+            )
+            for model_id in model_ids:
+                embedding_file.append(model_id, *embeddings[model_id])
+            h5file.close()
+            runtime_write: float = time.time() - start
+
+            # Read single models in random order from freshly opened file, as done by the model detail view.
+            h5file = open_file(file_path, mode="r")
+            embedding_file = EmbeddingFile(h5file)
+            start = time.time()
+            for model_id in read_ids:
+                embedding_file.read_projection(model_id)
+                embedding_file.read_pointwise_quality(model_id)
+            runtime_read: float = (time.time() - start) / len(read_ids)
+            h5file.close()
+
+            file_size: int = os.path.getsize(file_path)
+            print(
+                compression.rjust(16),
+                ("%.1f" % (raw_size / 1024 ** 2 / runtime_write)).rjust(13),
+                ("%.2f" % (runtime_read * 1000)).rjust(10),
+                ("%.1f" % (file_size / 1024 ** 2)).rjust(10),
+                ("%.2f" % (raw_size / file_size)).rjust(7)
+            )
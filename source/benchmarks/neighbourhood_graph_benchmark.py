@@ -0,0 +1,70 @@
+"""
+Benchmarks recall and runtime of neighbourhood graphs against the dense high-dimensional neighbourhood ranking.
+Run from source/ with: python -m benchmarks.neighbourhood_graph_benchmark [max_k] [number of records, ...].
+Note that the first NN-descent run includes numba compilation of pynndescent.
+"""
+
+import sys
+import time
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from objectives.topology_preservation_objectives.CorankingMatrix import CorankingMatrix
+from objectives.topology_preservation_objectives.NeighbourhoodGraph import NeighbourhoodGraph
+
+
+def recall(neighbours: np.ndarray, reference_neighbours: np.ndarray) -> float:
+    """
+    Computes share of reference neighbours found in neighbours.
+    :param neighbours:
+    :param reference_neighbours:
+    :return:
+    """
+
+    n: int = len(reference_neighbours)
+    offsets: np.ndarray = np.arange(n)[:, None] * n
+
+    return len(np.intersect1d(neighbours + offsets, reference_neighbours + offsets)) / reference_neighbours.size
+
+
+if __name__ == '__main__':
+    max_k: int = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    sizes: list = [int(arg) for arg in sys.argv[2:]] if len(sys.argv) > 2 else [2000, 5000, 10000]
+    rng: np.random.RandomState = np.random.RandomState(42)
+
+    print("n".rjust(8), "method".rjust(12), "runtime [s]".rjust(12), "speedup".rjust(9), "recall".rjust(8))
+    for n in sizes:
+        # Clustered data to approximate intrinsic structure of real datasets.
+        centers: np.ndarray = rng.normal(scale=5, size=(20, 20))
+        data: np.ndarray = centers[rng.randint(0, len(centers), n)] + rng.normal(size=(n, 20))
+
+        # Dense reference: Distance matrix, full ranking and extraction of max_k nearest neighbours.
+        start: float = time.time()
+        ranking: np.ndarray = CorankingMatrix.generate_neighbourhood_ranking(cdist(data, data, "euclidean"))
+        reference_neighbours: np.ndarray = np.argsort(ranking, axis=1)[:, 1:max_k + 1]
+        runtime_dense: float = time.time() - start
+        del ranking
+
+        print(str(n).rjust(8), "dense".rjust(12), ("%.3f" % runtime_dense).rjust(12), "1.0x".rjust(9), "1.000".rjust(8))
+
+        for method in NeighbourhoodGraph.METHODS:
+            start = time.time()
+            if method == "exact":
+                graph: NeighbourhoodGraph = NeighbourhoodGraph.from_distance_matrix(
+                    cdist(data, data, "euclidean"), max_k
+                )
+            else:
+                try:
+                    graph = NeighbourhoodGraph.from_data(data, max_k, method)
+                except ImportError:
+                    print(str(n).rjust(8), method.rjust(12), "n/a".rjust(12))
+                    continue
+            runtime: float = time.time() - start
+
+            print(
+                str(n).rjust(8),
+                method.rjust(12),
+                ("%.3f" % runtime).rjust(12),
+                ("%.1fx" % (runtime_dense / runtime)).rjust(9),
+                ("%.3f" % recall(graph.neighbours(max_k), reference_neighbours)).rjust(8)
+            )
@@ -0,0 +1,42 @@
+"""
+Benchmarks the Silhouette score computed by SeparabilityEvaluator from cluster/label contingency counts against
+sklearn.metrics.silhouette_score() with Hamming distance on labels.
+Run from source/ with: python -m benchmarks.separability_benchmark [number of records, ...].
+"""
+
+import sys
+import time
+import numpy as np
+import sklearn.metrics
+
+from data_generation.datasets.SeparabilityEvaluator import SeparabilityEvaluator
+
+
+if __name__ == '__main__':
+    sizes: list = [int(arg) for arg in sys.argv[1:]] if len(sys.argv) > 1 else [1000, 2000, 4000]
+    rng: np.random.RandomState = np.random.RandomState(42)
+
+    print("n".rjust(8), "sklearn [s]".rjust(12), "evaluator [s]".rjust(14), "speedup".rjust(9), "abs. diff.".rjust(11))
+    for n in sizes:
+        # Random labels and clustering with noise (-1), as produced by HDBSCAN.
+        labels: np.ndarray = rng.randint(0, 5, n)
+        cluster_labels: np.ndarray = rng.randint(-1, n // 20, n)
+        separability_evaluator: SeparabilityEvaluator = SeparabilityEvaluator(labels)
+
+        start: float = time.time()
+        silhouette_score: float = sklearn.metrics.silhouette_score(
+            X=labels.reshape(-1, 1), labels=cluster_labels, metric="hamming"
+        )
+        runtime_sklearn: float = time.time() - start
+
+        start = time.time()
+        evaluator_silhouette_score: float = separability_evaluator.compute_silhouette_score(cluster_labels)
+        runtime_evaluator: float = time.time() - start
+
+        print(
+            str(n).rjust(8),
+            ("%.4f" % runtime_sklearn).rjust(12),
+            ("%.4f" % runtime_evaluator).rjust(14),
+            ("%.1fx" % (runtime_sklearn / runtime_evaluator)).rjust(9),
+            ("%.1e" % abs(silhouette_score - evaluator_silhouette_score)).rjust(11)
+        )
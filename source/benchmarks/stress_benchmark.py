@@ -0,0 +1,79 @@
+"""
+Benchmarks Kruskal's stress computed with StressEngine against the original Stress implementation, and compares
+estimates on sampled pairs (with 95% confidence intervals) to the exact value.
+Run from source/ with: python -m benchmarks.stress_benchmark [number of records, ...].
+"""
+
+import sys
+import time
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from objectives.distance_preservation_objectives import Stress, StressEngine
+
+
+if __name__ == '__main__':
+    sizes: list = [int(arg) for arg in sys.argv[1:]] if len(sys.argv) > 1 else [1000, 2000, 4000]
+    rng: np.random.RandomState = np.random.RandomState(42)
+
+    print(
+        "n".rjust(8), "setup [s]".rjust(10), "Stress [s]".rjust(11), "engine [s]".rjust(11), "speedup".rjust(9),
+        "abs. diff.".rjust(11)
+    )
+    for n in sizes:
+        # Random high-dimensional data and a noisy linear projection as stand-in for an embedding.
+        high_dim_data: np.ndarray = rng.normal(size=(n, 20))
+        low_dim_data: np.ndarray = high_dim_data[:, :2] + rng.normal(scale=0.5, size=(n, 2))
+
+        start: float = time.time()
+        stress_engine: StressEngine = StressEngine.from_high_dimensional_data(high_dim_data)
+        runtime_setup: float = time.time() - start
+
+        start = time.time()
+        stress: float = Stress(low_dimensional_data=low_dim_data, high_dimensional_data=high_dim_data).compute()
+        runtime_stress: float = time.time() - start
+
+        start = time.time()
+        engine_stress: float = stress_engine.compute(low_dim_data)
+        runtime_engine: float = time.time() - start
+
+        print(
+            str(n).rjust(8),
+            ("%.3f" % runtime_setup).rjust(10),
+            ("%.3f" % runtime_stress).rjust(11),
+            ("%.3f" % runtime_engine).rjust(11),
+            ("%.1fx" % (runtime_stress / runtime_engine)).rjust(9),
+            ("%.1e" % abs(stress - engine_stress)).rjust(11)
+        )
+
+    print()
+    print(
+        "n".rjust(8), "pairs".rjust(10), "exact".rjust(8), "estimate".rjust(9), "95% CI".rjust(18),
+        "exact [s]".rjust(10), "estimate [s]".rjust(13)
+    )
+    for n in sizes:
+        high_dim_data = rng.normal(size=(n, 20))
+        low_dim_data = high_dim_data[:, :2] + rng.normal(scale=0.5, size=(n, 2))
+        distance_matrix: np.ndarray = cdist(high_dim_data, high_dim_data)
+
+        stress_engine = StressEngine.from_distance_matrix(distance_matrix)
+        start = time.time()
+        stress = stress_engine.compute(low_dim_data)
+        runtime_exact: float = time.time() - start
+
+        # Sample a tenth of all pairs.
+        pair_budget: int = n * (n - 1) // 20
+        sampled_stress_engine: StressEngine = StressEngine.from_distance_matrix(distance_matrix, pair_budget)
+        start = time.time()
+        estimated_stress, lower_bound, upper_bound = sampled_stress_engine.estimate(low_dim_data)
+        runtime_estimate: float = time.time() - start
+
+        print(
+            str(n).rjust(8),
+            str(pair_budget).rjust(10),
+            ("%.4f" % stress).rjust(8),
+            ("%.4f" % estimated_stress).rjust(9),
+            ("[%.4f, %.4f]" % (lower_bound, upper_bound)).rjust(18),
+            ("%.3f" % runtime_exact).rjust(10),
+            ("%.3f" % runtime_estimate).rjust(13)
+        )
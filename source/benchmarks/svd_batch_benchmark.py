@@ -0,0 +1,58 @@
+"""
+Benchmarks computing all SVD parameter sets of the grid in groups with DimensionalityReductionKernel.run_group()
+against one TruncatedSVD per parameter set, and compares the resulting embeddings.
+Run from source/ with: python -m benchmarks.svd_batch_benchmark [number of records, ...].
+"""
+
+import sys
+import time
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from data_generation.dimensionality_reduction import DimensionalityReductionKernel
+
+
+if __name__ == '__main__':
+    sizes: list = [int(arg) for arg in sys.argv[1:]] if len(sys.argv) > 1 else [1000, 2000, 4000]
+    rng: np.random.RandomState = np.random.RandomState(42)
+    parameter_sets: list = DimensionalityReductionKernel.generate_parameter_sets_for_testing("", "SVD")[0]
+    parameter_set_groups: list = DimensionalityReductionKernel.group_parameter_sets(parameter_sets, "SVD")
+    dim_red_kernel: DimensionalityReductionKernel = DimensionalityReductionKernel("SVD")
+
+    print(
+        "n".rjust(8), "models".rjust(7), "groups".rjust(7), "separate [s]".rjust(13), "grouped [s]".rjust(12),
+        "speedup".rjust(8), "max. rel. diff.".rjust(16)
+    )
+    for n in sizes:
+        high_dim_data: np.ndarray = rng.normal(size=(n, 20))
+        distance_matrix: np.ndarray = cdist(high_dim_data, high_dim_data)
+
+        start: float = time.time()
+        separate_embeddings: list = [
+            dim_red_kernel.run(distance_matrix, parameter_set) for parameter_set in parameter_sets
+        ]
+        runtime_separate: float = time.time() - start
+
+        start = time.time()
+        grouped_embeddings: dict = {}
+        for parameter_set_group in parameter_set_groups:
+            for parameter_set, (embedding, _) in zip(
+                parameter_set_group, dim_red_kernel.run_group(distance_matrix, parameter_set_group)
+            ):
+                grouped_embeddings[parameter_set["id"]] = embedding
+        runtime_grouped: float = time.time() - start
+
+        max_relative_difference: float = max(
+            np.abs(grouped_embeddings[parameter_set["id"]] - embedding).max() / np.abs(embedding).max()
+            for parameter_set, embedding in zip(parameter_sets, separate_embeddings)
+        )
+
+        print(
+            str(n).rjust(8),
+            str(len(parameter_sets)).rjust(7),
+            str(len(parameter_set_groups)).rjust(7),
+            ("%.3f" % runtime_separate).rjust(13),
+            ("%.3f" % runtime_grouped).rjust(12),
+            ("%.1fx" % (runtime_separate / runtime_grouped)).rjust(8),
+            ("%.1e" % max_relative_difference).rjust(16)
+        )
@@ -0,0 +1,365 @@
+import numpy as np
+import tables
+from tables import *
+from typing import Tuple
+from data_generation.dimensionality_reduction.hdf5_descriptions import ModelIndexDescription, \
+    PointwiseQualityHistogramDescription
+
+
+class EmbeddingFile:
+    """
+    Wrapper for reading and writing embeddings and their pointwise qualities in .h5 files.
+    Supports two storage formats:
+        - v1: One CArray per model ("model<id>") in /projection_coordinates and /pointwise_quality.
+        - v2: One extendable array per group (/projection_coordinates/coordinates with shape models x records x
+          dimensions, /pointwise_quality/values with shape models x records) plus table /model_index mapping model IDs
+          to rows. Embeddings with fewer than the maximal number of dimensions are padded with NaNs.
+    In both formats, histograms of pointwise quality values are stored in table /pointwise_quality_histograms for each
+    number of bins in HISTOGRAM_NUMS_BINS when models are appended. Pointwise quality values lie in [0, 1], which is
+    split into bins of equal width.
+    """
+
+    FORMAT_VERSION: int = 2
+
+    # Numbers of bins histograms of pointwise quality values are stored for.
+    HISTOGRAM_NUMS_BINS: tuple = (10,)
+
+    # Filters used by previous versions and if no filters are specified.
+    DEFAULT_FILTERS: Filters = Filters(complevel=3, complib='zlib')
+
+    def __init__(self, h5file: tables.File, filters: Filters = None):
+        """
+        Wraps opened .h5 file.
+        :param h5file:
+        :param filters: Filters to apply to arrays created for new models in files in storage format v1.
+        """
+
+        self._h5file: tables.File = h5file
+        self._filters: Filters = filters if filters is not None else EmbeddingFile.DEFAULT_FILTERS
+        self._format_version: int = EmbeddingFile.read_format_version(h5file)
+        # Row and number of dimensions per model ID. Only used for v2.
+        self._model_rows: dict = {}
+        self._model_dimensions: dict = {}
+
+        if self._format_version == 2:
+            for row in h5file.root.model_index.read():
+                self._model_rows[int(row["id"])] = int(row["row"])
+                self._model_dimensions[int(row["id"])] = int(row["num_dimensions"])
+
+    @property
+    def format_version(self) -> int:
+        return self._format_version
+
+    @staticmethod
+    def read_format_version(h5file: tables.File) -> int:
+        """
+        Determines storage format of file. Files without format version were written before v2 was introduced.
+        :param h5file:
+        :return:
+        """
+
+        return int(h5file.root._v_attrs.format_version) if "format_version" in h5file.root._v_attrs else 1
+
+    @staticmethod
+    def read_max_k(h5file: tables.File) -> int:
+        """
+        Determines maximal neighbourhood size topology-based objectives of models in file were computed for.
+        :param h5file:
+        :return: max_k; None if full neighbourhood rankings were used.
+        """
+
+        return int(h5file.root._v_attrs.max_k) if "max_k" in h5file.root._v_attrs else None
+
+    @staticmethod
+    def write_max_k(h5file: tables.File, max_k: int):
+        """
+        Stores maximal neighbourhood size topology-based objectives of models in file are computed for, so that readers
+        know whether to use the dataset's neighbourhood ranking or its neighbourhood graph.
+        :param h5file: File opened in a writable mode.
+        :param max_k: None if full neighbourhood rankings are used.
+        """
+
+        if max_k is not None:
+            h5file.root._v_attrs.max_k = int(max_k)
+        elif "max_k" in h5file.root._v_attrs:
+            del h5file.root._v_attrs.max_k
+
+    @staticmethod
+    def parse_filters(compression: str) -> Filters:
+        """
+        Creates filters from compression specification.
+        :param compression: Specification as complib[:complevel], with complib being one of the libraries supported by
+        PyTables (e. g. zlib, blosc:lz4, blosc:zstd). complevel defaults to 3.
+        :return: Filters. Byte shuffling is enabled, which groups bytes of same significance in floating point values
+        and makes them considerably more compressible.
+        """
+
+        complib, _, complevel = compression.rpartition(":")
+        if not complevel.isdigit():
+            complib, complevel = compression, "3"
+        assert complib in tables.filters.all_complibs, "Compression library " + complib + " not supported."
+
+        return Filters(complevel=int(complevel), complib=complib, shuffle=True)
+
+    @staticmethod
+    def initialize(
+            h5file: tables.File, num_records: int, num_dimensions: int, filters: Filters = None
+    ) -> "EmbeddingFile":
+        """
+        Creates groups and arrays for storage format v2 in new file.
+        Arrays are chunked by model, since embeddings are written and - in the model detail view - read one at a time.
+        :param h5file: Newly created file.
+        :param num_records: Number of records per embedding.
+        :param num_dimensions: Maximal number of dimensions of embeddings.
+        :param filters: Filters to apply to arrays.
+        :return: Wrapper for initialized file.
+        """
+
+        filters = filters if filters is not None else EmbeddingFile.DEFAULT_FILTERS
+
+        h5file.create_group(h5file.root, "projection_coordinates", title="Low-dimensional coordinates")
+        h5file.create_group(h5file.root, "pointwise_quality", title="Pointwise embedding quality")
+
+        h5file.create_earray(
+            h5file.root.projection_coordinates,
+            name="coordinates",
+            atom=Float64Atom(dflt=np.nan),
+            shape=(0, num_records, num_dimensions),
+            title="Low dimensional coordinates per model",
+            filters=filters,
+            chunkshape=(1, num_records, num_dimensions)
+        )
+        h5file.create_earray(
+            h5file.root.pointwise_quality,
+            name="values",
+            atom=Float64Atom(),
+            shape=(0, num_records),
+            title="Pointwise quality values per model",
+            filters=filters,
+            chunkshape=(1, num_records)
+        )
+        h5file.create_table(
+            where=h5file.root,
+            name="model_index",
+            description=ModelIndexDescription,
+            title="Rows of models in consolidated arrays"
+        ).flush()
+
+        h5file.root._v_attrs.format_version = EmbeddingFile.FORMAT_VERSION
+
+        return EmbeddingFile(h5file, filters)
+
+    def model_ids(self) -> list:
+        """
+        Returns IDs of all models with stored embeddings.
+        :return:
+        """
+
+        if self._format_version == 2:
+            return list(self._model_rows.keys())
+
+        return [
+            int(leaf._v_name[5:])
+            for leaf in self._h5file.walk_nodes("/projection_coordinates/", classname="CArray")
+        ]
+
+    def append(self, model_id: int, low_dimensional_projection: np.ndarray, pointwise_quality: np.ndarray):
+        """
+        Appends embedding and its pointwise quality values. Call flush() to make sure data is stored in file.
+        :param model_id:
+        :param low_dimensional_projection: num_records x num_dimensions array.
+        :param pointwise_quality: num_records x 1 array.
+        """
+
+        if self._format_version == 1:
+            for group, obj, title in (
+                (self._h5file.root.projection_coordinates, low_dimensional_projection, "Low dimensional coordinates"),
+                (self._h5file.root.pointwise_quality, pointwise_quality, "Pointwise quality values")
+            ):
+                self._h5file.create_carray(
+                    group,
+                    name="model" + str(model_id),
+                    obj=obj,
+                    title=title + " for model #" + str(model_id),
+                    filters=self._filters
+                )
+            self._append_pointwise_quality_histograms(model_id, pointwise_quality)
+            return
+
+        coordinates: EArray = self._h5file.root.projection_coordinates.coordinates
+        padded_projection: np.ndarray = np.full(coordinates.shape[1:], np.nan)
+        padded_projection[:, :low_dimensional_projection.shape[1]] = low_dimensional_projection
+
+        row: int = coordinates.nrows
+        coordinates.append(padded_projection[np.newaxis])
+        self._h5file.root.pointwise_quality.values.append(pointwise_quality.reshape((1, -1)))
+        self._append_pointwise_quality_histograms(model_id, pointwise_quality)
+
+        model_index: Table = self._h5file.root.model_index
+        model_index.append([(model_id, row, low_dimensional_projection.shape[1])])
+        self._model_rows[model_id] = row
+        self._model_dimensions[model_id] = low_dimensional_projection.shape[1]
+
+    def _append_pointwise_quality_histograms(self, model_id: int, pointwise_quality: np.ndarray):
+        """
+        Appends histograms of model's pointwise quality values. Creates histogram table if it doesn't exist yet.
+        :param model_id:
+        :param pointwise_quality:
+        """
+
+        if "pointwise_quality_histograms" not in self._h5file.root:
+            self._h5file.create_table(
+                where=self._h5file.root,
+                name="pointwise_quality_histograms",
+                description=PointwiseQualityHistogramDescription,
+                title="Histograms of pointwise quality values per model"
+            )
+
+        self._h5file.root.pointwise_quality_histograms.append([
+            (model_id, nbins, bin_index, count)
+            for nbins in EmbeddingFile.HISTOGRAM_NUMS_BINS
+            for bin_index, count in enumerate(
+                EmbeddingFile.compute_pointwise_quality_histograms(pointwise_quality.reshape((1, -1)), nbins)[0]
+            )
+        ])
+
+    @staticmethod
+    def compute_pointwise_quality_histograms(pointwise_qualities: np.ndarray, nbins: int) -> np.ndarray:
+        """
+        Computes histograms of pointwise quality values with bins of equal width in [0, 1]. Like np.histogram(), bins
+        are half-open except for the last one; values outside of [0, 1] are ignored.
+        :param pointwise_qualities: num_models x num_records array.
+        :param nbins:
+        :return: num_models x nbins array with counts.
+        """
+
+        edges: np.ndarray = np.linspace(0, 1, nbins + 1)
+        bin_indices: np.ndarray = np.minimum(np.searchsorted(edges, pointwise_qualities, side="right") - 1, nbins - 1)
+        in_range: np.ndarray = (pointwise_qualities >= 0) & (pointwise_qualities <= 1)
+        model_indices: np.ndarray = np.broadcast_to(
+            np.arange(len(pointwise_qualities))[:, np.newaxis], pointwise_qualities.shape
+        )
+
+        return np.bincount(
+            (model_indices * nbins + bin_indices)[in_range], minlength=len(pointwise_qualities) * nbins
+        ).reshape((len(pointwise_qualities), nbins))
+
+    def read_pointwise_quality_histograms(self, nbins: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reads histograms of pointwise quality values of all models. Histograms not stored in file (other numbers of
+        bins, models appended before histograms were introduced) are computed from pointwise quality values.
+        :param nbins:
+        :return: Model IDs in ascending order; num_models x nbins array with counts in the same sequence.
+        """
+
+        model_ids: np.ndarray = np.sort(np.asarray(self.model_ids(), dtype=int))
+        counts: np.ndarray = np.zeros((len(model_ids), nbins), dtype=np.int64)
+        is_stored: np.ndarray = np.zeros(len(model_ids), dtype=bool)
+
+        if "pointwise_quality_histograms" in self._h5file.root:
+            histograms: np.ndarray = self._h5file.root.pointwise_quality_histograms.read_where("nbins == " + str(nbins))
+            histograms = histograms[np.isin(histograms["id"], model_ids)]
+            model_indices: np.ndarray = np.searchsorted(model_ids, histograms["id"])
+            counts[model_indices, histograms["bin"]] = histograms["count"]
+            is_stored[model_indices] = True
+
+        if not is_stored.all():
+            all_model_ids, pointwise_qualities = self.read_all_pointwise_qualities()
+            counts[~is_stored] = EmbeddingFile.compute_pointwise_quality_histograms(
+                pointwise_qualities[np.argsort(all_model_ids)][~is_stored], nbins
+            )
+
+        return model_ids, counts
+
+    def roll_back(self, committed_model_ids: set):
+        """
+        Removes embeddings of all models not in committed_model_ids, e. g. ones written by an interrupted run. In
+        storage format v2, these have to be the last ones appended.
+        :param committed_model_ids:
+        """
+
+        if "pointwise_quality_histograms" in self._h5file.root:
+            histograms: Table = self._h5file.root.pointwise_quality_histograms
+            uncommitted_rows: np.ndarray = np.flatnonzero(
+                ~np.isin(histograms.col("id").astype(int), np.asarray(list(committed_model_ids), dtype=int))
+            )
+            # Remove from the end, so row numbers of remaining rows don't change.
+            for row in uncommitted_rows[::-1]:
+                histograms.remove_row(int(row))
+
+        if self._format_version == 1:
+            for model_id in set(self.model_ids()) - set(committed_model_ids):
+                for group in (self._h5file.root.projection_coordinates, self._h5file.root.pointwise_quality):
+                    if "model" + str(model_id) in group:
+                        group._f_get_child("model" + str(model_id))._f_remove()
+            self.flush()
+            return
+
+        model_index: Table = self._h5file.root.model_index
+        num_committed_rows: int = 0
+        while num_committed_rows < model_index.nrows and \
+                int(model_index[num_committed_rows]["id"]) in committed_model_ids:
+            num_committed_rows += 1
+        assert all(
+            model_id not in committed_model_ids for model_id in model_index.col("id")[num_committed_rows:]
+        ), "Uncommitted models have to be stored after committed ones."
+
+        # Arrays may hold more rows than the model index if the run was interrupted while appending.
+        model_index.truncate(num_committed_rows)
+        self._h5file.root.projection_coordinates.coordinates.truncate(num_committed_rows)
+        self._h5file.root.pointwise_quality.values.truncate(num_committed_rows)
+        self._model_rows = {model_id: row for model_id, row in self._model_rows.items() if row < num_committed_rows}
+        self._model_dimensions = {model_id: self._model_dimensions[model_id] for model_id in self._model_rows}
+        self.flush()
+
+    def flush(self):
+        """
+        Flushes all buffers to file.
+        """
+
+        self._h5file.flush()
+
+    def read_projection(self, model_id: int) -> np.ndarray:
+        """
+        Reads low-dimensional coordinates of model.
+        :param model_id:
+        :return: num_records x num_dimensions array.
+        """
+
+        if self._format_version == 1:
+            return self._h5file.root.projection_coordinates._f_get_child("model" + str(model_id)).read()
+
+        return self._h5file.root.projection_coordinates.coordinates[
+            self._model_rows[model_id], :, :self._model_dimensions[model_id]
+        ]
+
+    def read_pointwise_quality(self, model_id: int) -> np.ndarray:
+        """
+        Reads pointwise quality values of model.
+        :param model_id:
+        :return: num_records x 1 array.
+        """
+
+        if self._format_version == 1:
+            return self._h5file.root.pointwise_quality._f_get_child("model" + str(model_id)).read()
+
+        return self._h5file.root.pointwise_quality.values[self._model_rows[model_id]].reshape((-1, 1))
+
+    def read_all_pointwise_qualities(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reads pointwise quality values of all models.
+        :return: Model IDs; num_models x num_records array with pointwise quality values in the same sequence.
+        """
+
+        if self._format_version == 1:
+            model_ids: list = []
+            values: list = []
+            for leaf in self._h5file.walk_nodes("/pointwise_quality/", classname="CArray"):
+                model_ids.append(int(leaf._v_name[5:]))
+                values.append(leaf.read().flatten())
+
+            return np.asarray(model_ids, dtype=int), np.asarray(values)
+
+        model_index: np.ndarray = self._h5file.root.model_index.read()
+
+        return model_index["id"].astype(int), self._h5file.root.pointwise_quality.values[:][model_index["row"]]
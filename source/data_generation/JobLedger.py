@@ -0,0 +1,162 @@
+import hashlib
+import json
+import numpy as np
+import tables
+from tables import *
+from data_generation.dimensionality_reduction.hdf5_descriptions import JobLedgerDescription
+
+
+class JobLedger:
+    """
+    Ledger of completed models in an .h5 file with embeddings, stored in table /job_ledger. Models are identified by a
+    hash of their canonicalized parameter set, so finding out whether a parameter set was processed already is a
+    dictionary lookup.
+    Entries are written after a model's metadata and embedding and flushed last, so the ledger acts as commit record:
+    Metadata rows and embeddings of models without ledger entry stem from an interrupted run and are rolled back (see
+    EmbeddingFile.roll_back()) before generation resumes.
+    """
+
+    # Number of significant digits numeric parameter values are compared with. Tolerates values stored with single
+    # precision.
+    NUM_SIGNIFICANT_DIGITS: int = 6
+
+    def __init__(self, h5file: tables.File, parameter_config: list):
+        """
+        Wraps ledger in opened .h5 file. Files created before the ledger was introduced get a ledger listing all models
+        in their metadata table.
+        :param h5file: File opened in a writable mode, containing the metadata table.
+        :param parameter_config: Parameter configuration of DR kernel (see DimensionalityReductionKernel).
+        """
+
+        self._h5file: tables.File = h5file
+        self._parameter_config: list = parameter_config
+        self._model_ids: dict = JobLedger.read_model_ids(h5file, parameter_config)
+
+        if "job_ledger" not in h5file.root:
+            job_ledger: Table = h5file.create_table(
+                where=h5file.root,
+                name="job_ledger",
+                description=JobLedgerDescription,
+                title="Parameter hashes of completed models"
+            )
+            if len(self._model_ids):
+                job_ledger.append([
+                    (parameter_hash.encode(), model_id) for parameter_hash, model_id in self._model_ids.items()
+                ])
+            self.commit()
+
+    @staticmethod
+    def hash_parameter_set(parameter_set: dict, parameter_config: list) -> str:
+        """
+        Computes hash of parameter set. Numeric values are compared up to NUM_SIGNIFICANT_DIGITS significant digits,
+        irrespective of their type (e. g. 1, 1.0 and np.int32(1) are equal). Categorical values may be str or bytes.
+        Parameters not in parameter_config (e. g. the model ID) are ignored.
+        :param parameter_set:
+        :param parameter_config: Parameter configuration of DR kernel.
+        :return: SHA-1 hash as hex string.
+        """
+
+        canonical_values: list = []
+        for param_config in parameter_config:
+            value = parameter_set[param_config["name"]]
+
+            if param_config["type"] == "categorical":
+                value = value.decode("utf-8") if isinstance(value, bytes) else str(value)
+            else:
+                value = float(value)
+                value = str(int(value)) if value.is_integer() else \
+                    "%.*g" % (JobLedger.NUM_SIGNIFICANT_DIGITS, value)
+            canonical_values.append([param_config["name"], value])
+
+        return hashlib.sha1(json.dumps(canonical_values).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def read_model_ids(h5file: tables.File, parameter_config: list) -> dict:
+        """
+        Reads IDs of completed models from ledger. For files without ledger, all models in the metadata table are
+        considered complete.
+        :param h5file:
+        :param parameter_config: Parameter configuration of DR kernel.
+        :return: Dictionary with model ID per parameter hash.
+        """
+
+        if "job_ledger" in h5file.root:
+            return {
+                row["parameter_hash"].decode(): int(row["id"]) for row in h5file.root.job_ledger.read()
+            }
+
+        return {
+            JobLedger.hash_parameter_set(row, parameter_config): int(row["id"]) for row in h5file.root.metadata.read()
+        }
+
+    @staticmethod
+    def assign_model_ids(parameter_sets: list, model_ids: dict, parameter_config: list) -> list:
+        """
+        Picks parameter sets not completed yet and assigns deterministic model IDs to them: A parameter set's position
+        in the grid, unless that ID is taken already (possible in files created before the ledger was introduced), in
+        which case IDs after the largest one in use are assigned in grid order.
+        :param parameter_sets: All parameter sets in grid order.
+        :param model_ids: Dictionary with model ID per parameter hash of completed models.
+        :param parameter_config: Parameter configuration of DR kernel.
+        :return: List of parameter sets to process, each with its model ID as "id".
+        """
+
+        used_model_ids: set = set(model_ids.values())
+        next_free_model_id: int = max(len(parameter_sets), max(used_model_ids, default=-1) + 1)
+        pending_parameter_sets: list = []
+
+        for i, parameter_set in enumerate(parameter_sets):
+            if JobLedger.hash_parameter_set(parameter_set, parameter_config) in model_ids:
+                continue
+
+            if i in used_model_ids:
+                parameter_set["id"] = next_free_model_id
+                next_free_model_id += 1
+            else:
+                parameter_set["id"] = i
+            pending_parameter_sets.append(parameter_set)
+
+        return pending_parameter_sets
+
+    @property
+    def model_ids(self) -> dict:
+        """
+        Returns IDs of completed models.
+        :return: Dictionary with model ID per parameter hash.
+        """
+        return self._model_ids
+
+    def record(self, parameter_set: dict, model_id: int):
+        """
+        Records model as completed. Only takes effect once commit() is called.
+        :param parameter_set:
+        :param model_id:
+        """
+
+        parameter_hash: str = JobLedger.hash_parameter_set(parameter_set, self._parameter_config)
+        self._h5file.root.job_ledger.append([(parameter_hash.encode(), model_id)])
+        self._model_ids[parameter_hash] = model_id
+
+    def commit(self):
+        """
+        Writes recorded entries to file. Call after all data of the recorded models has been flushed.
+        """
+
+        self._h5file.root.job_ledger.flush()
+        self._h5file.flush()
+
+    def roll_back_metadata(self):
+        """
+        Removes metadata rows of models without ledger entry.
+        """
+
+        metadata_table: Table = self._h5file.root.metadata
+        committed_model_ids: np.ndarray = np.asarray(list(self._model_ids.values()), dtype=int)
+        uncommitted_rows: np.ndarray = np.flatnonzero(
+            ~np.isin(metadata_table.col("id").astype(int), committed_model_ids)
+        )
+
+        # Remove from the end, so row numbers of remaining rows don't change.
+        for row in uncommitted_rows[::-1]:
+            metadata_table.remove_row(int(row))
+        metadata_table.flush()
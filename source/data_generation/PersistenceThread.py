@@ -1,5 +1,5 @@
 import threading
-import time
+import queue
 
 from tables import *
 import tables
@@ -7,44 +7,64 @@ import os
 from tqdm import tqdm
 from data_generation.dimensionality_reduction import DimensionalityReductionKernel
 from data_generation.dimensionality_reduction.hdf5_descriptions import TSNEDescription
+from data_generation.EmbeddingFile import EmbeddingFile
+from data_generation.JobLedger import JobLedger
 from utils import Utils
 
 
 class PersistenceThread(threading.Thread):
     """
-    Checks whether threads calculating t-SNE generated new output. If so, new output is stored in file.
+    Waits for results of threads or processes calculating embeddings and stores them in file.
+    Results are consumed from a bounded queue: Producers block while the queue is full, so results never pile up in
+    memory faster than they can be written. If writing fails, the thread closes the file and terminates; the exception
+    is available as exception. Producers should check whether the thread is still alive while waiting for space in the
+    queue.
     """
 
+    # Put into results queue to stop thread before all expected results have arrived, e. g. if producers failed.
+    STOP_SIGNAL = None
+
     def __init__(
             self,
-            results: list,
+            results: queue.Queue,
             expected_number_of_results: int,
             total_number_of_results: int,
             dataset_name: str,
             dim_red_kernel_name: str,
             storage_path: str,
-            checking_interval: int = 20
+            batch_size: int = 10,
+            filters: Filters = None,
+            max_k: int = None
     ):
         """
         Initializes thread for ensuring persistence of t-SNE results calculated by other threads.
-        :param results: List of calculated results.
+        :param results: Queue of calculated results. Should be bounded to apply back-pressure on producers.
         :param expected_number_of_results: Expected number of datasets to be produced.
         :param total_number_of_results: Number of all results, including already generated ones.
         :param dataset_name: Suffix of dataset to be created.
         :param dim_red_kernel_name: Name of dimensionality reduction kernel used.
         :param storage_path: Path of directory holding data.
-        :param checking_interval: Intervals in seconds in which thread checks for new models.
+        :param batch_size: Maximal number of results written before flushing file. Writing starts as soon as at least
+        one result is available.
+        :param filters: Filters to apply to embedding arrays. See EmbeddingFile.parse_filters().
+        :param max_k: Maximal neighbourhood size topology-based objectives are computed for. None if full neighbourhood
+        rankings are used. Stored in file, see EmbeddingFile.write_max_k().
         """
         threading.Thread.__init__(self)
 
-        self._results: list = results
+        self._results: queue.Queue = results
         self._expected_number_of_results: int = expected_number_of_results
         self._total_number_of_results: int = total_number_of_results
         self._dataset_name: str = dataset_name
         self._dim_red_kernel_name: str = dim_red_kernel_name
-        self._checking_interval: int = checking_interval
-        self._ids_to_process: list = None
+        self._batch_size: int = batch_size
+        self._filters: Filters = filters
+        self._stop_signal_received: bool = False
+        self._embedding_file: EmbeddingFile = None
+        self._job_ledger: JobLedger = None
         self._storage_path: str = storage_path
+        self._max_k: int = max_k
+        self._exception: BaseException = None
 
         # Fetch .h5 file handle.
         self._h5file: File = self._open_pytables_file()
@@ -56,8 +76,87 @@ class PersistenceThread(threading.Thread):
 
     def run(self):
         """
-        Persistence thread starts to monitor shared list object holding results. If new elements are added, changes are
-        pushed to disk.
+        Persistence thread waits for new results in queue and pushes them to disk in batches.
+        :return:
+        """
+
+        try:
+            num_of_results_so_far: int = 0
+            while num_of_results_so_far < self._expected_number_of_results:
+                batch: list = self._next_batch(self._expected_number_of_results - num_of_results_so_far)
+                if not batch:
+                    break
+
+                self._persist_batch(batch)
+                num_of_results_so_far += len(batch)
+                self._progress_bar.update(len(batch))
+
+                # Release results' arrays now that they are on disk.
+                for result in batch:
+                    result.clear()
+                del batch
+
+        except BaseException as exception:
+            self._exception = exception
+
+        finally:
+            # Wrap up progress bar display.
+            self._progress_bar.close()
+
+            # Close file.
+            self._h5file.close()
+
+    @property
+    def exception(self) -> BaseException:
+        """
+        Returns exception that terminated thread, if any.
+        :return:
+        """
+        return self._exception
+
+    def stop(self):
+        """
+        Signals thread to terminate once all results put into queue so far are written. Doesn't block if thread has
+        terminated already, even if the queue is full.
+        """
+
+        while self.is_alive():
+            try:
+                self._results.put(PersistenceThread.STOP_SIGNAL, timeout=1)
+                return
+            except queue.Full:
+                pass
+
+    def _next_batch(self, max_batch_size: int) -> list:
+        """
+        Blocks until at least one result is available, then collects all available results up to the batch size.
+        :param max_batch_size: Number of results still expected.
+        :return: List of results. Empty if stop signal was received before any result.
+        """
+
+        batch: list = []
+        if self._stop_signal_received:
+            return batch
+
+        result: dict = self._results.get()
+        while result is not PersistenceThread.STOP_SIGNAL:
+            batch.append(result)
+            if len(batch) >= min(self._batch_size, max_batch_size):
+                return batch
+
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                return batch
+
+        self._stop_signal_received = True
+
+        return batch
+
+    def _persist_batch(self, batch: list):
+        """
+        Writes batch of results to file.
+        :param batch:
         :return:
         """
 
@@ -66,88 +165,76 @@ class PersistenceThread(threading.Thread):
         # Get configuration of this DR kernel's parameter set.
         parameter_config: dict = DimensionalityReductionKernel.DIM_RED_KERNELS[self._dim_red_kernel_name]["parameters"]
 
-        # Check on new arrivals every self._checking_interval seconds.
-        last_processed_index: int = -1
-        num_of_results_so_far: int = 0
-        while num_of_results_so_far < self._expected_number_of_results:
-            # Check how many results are available so far.
-            num_of_results_so_far = len(self._results)
-
-            # If number of records has changed: Add to file.
-            if num_of_results_so_far > last_processed_index + 1:
-                # If new records are available since last loop iteration: Update progress bar.
-                self._progress_bar.update(num_of_results_so_far - last_processed_index - 1)
-
-                # Loop through all entries.
-                for result in self._results[last_processed_index + 1:num_of_results_so_far]:
-                    ######################################################
-                    # 1. Add metadata (hyperparameter + objectives).
-                    ######################################################
-
-                    # Fetch next viable model ID.
-                    valid_model_id: int = self._ids_to_process.pop()
-
-                    # Generic metadata.
-                    metadata_row["id"] = valid_model_id
-                    metadata_row["num_records"] = result["low_dimensional_projection"].shape[0]
-
-                    # Hyperparameter.
-                    result_hyperparam: dict = result["parameter_set"]
-
-                    # Add hyperparameter values.
-                    for param_config in parameter_config:
-                        metadata_row[param_config["name"]] = result_hyperparam[param_config["name"]]
-
-                    # Objectives.
-                    result_objectives: dict = result["objectives"]
-                    metadata_row["runtime"] = result_objectives["runtime"]
-                    metadata_row["r_nx"] = result_objectives["r_nx"]
-                    metadata_row["b_nx"] = result_objectives["b_nx"]
-                    metadata_row["stress"] = result_objectives["stress"]
-                    metadata_row["target_domain_performance"] = result_objectives["target_domain_performance"]
-                    metadata_row["separability_metric"] = result_objectives["separability_metric"]
-
-                    # Append row to file.
-                    metadata_row.append()
-
-                    ######################################################
-                    # 2. Add low-dimensional projections.
-                    ######################################################
-
-                    self._h5file.create_carray(
-                        self._h5file.root.projection_coordinates,
-                        name="model" + str(valid_model_id),
-                        obj=result["low_dimensional_projection"],
-                        title="Low dimensional coordinates for model #" + str(valid_model_id),
-                        filters=Filters(complevel=3, complib='zlib')
-                    )
-
-                    ######################################################
-                    # 3. Add pointwise quality critera values.
-                    ######################################################
-
-                    self._h5file.create_carray(
-                        self._h5file.root.pointwise_quality,
-                        name="model" + str(valid_model_id),
-                        obj=result_objectives["pointwise_quality_values"],
-                        title="Pointwise quality values for model #" + str(valid_model_id),
-                        filters=Filters(complevel=3, complib='zlib')
-                    )
-
-                # Flush buffer, make sure data is stored in file.
-                metadata_table.flush()
-
-                # Keep track of which records are already saved to disk.
-                last_processed_index = num_of_results_so_far - 1
-
-            # Wait a few seconds before checking whether any new elements have been added.
-            time.sleep(self._checking_interval)
-
-        # Wrap up progress bar display.
-        self._progress_bar.close()
-
-        # Close file.
-        self._h5file.close()
+        # Create consolidated arrays in new files once number of records is known.
+        if self._embedding_file is None:
+            self._embedding_file = EmbeddingFile.initialize(
+                self._h5file,
+                num_records=batch[0]["low_dimensional_projection"].shape[0],
+                num_dimensions=max([
+                    max(param_config["values"])
+                    for param_config in parameter_config if param_config["name"] == "n_components"
+                ]),
+                filters=self._filters
+            )
+
+        for result in batch:
+            ######################################################
+            # 1. Add metadata (hyperparameter + objectives).
+            ######################################################
+
+            # Model IDs are assigned deterministically when generating parameter sets. See JobLedger.
+            valid_model_id: int = result["parameter_set"]["id"]
+
+            # Generic metadata.
+            metadata_row["id"] = valid_model_id
+            metadata_row["num_records"] = result["low_dimensional_projection"].shape[0]
+
+            # Hyperparameter.
+            result_hyperparam: dict = result["parameter_set"]
+
+            # Add hyperparameter values.
+            for param_config in parameter_config:
+                metadata_row[param_config["name"]] = result_hyperparam[param_config["name"]]
+
+            # Objectives.
+            result_objectives: dict = result["objectives"]
+            metadata_row["runtime"] = result_objectives["runtime"]
+            metadata_row["r_nx"] = result_objectives["r_nx"]
+            metadata_row["b_nx"] = result_objectives["b_nx"]
+            metadata_row["stress"] = result_objectives["stress"]
+            metadata_row["target_domain_performance"] = result_objectives["target_domain_performance"]
+            metadata_row["separability_metric"] = result_objectives["separability_metric"]
+
+            # Runtimes per intermediate and objective. Files created before they were recorded don't have these
+            # columns. Intermediates not needed for this model get a runtime of 0.
+            stage_runtimes: dict = {**result["intermediate_runtimes"], **result["objective_runtimes"]}
+            for col_name in metadata_table.colnames:
+                if col_name.startswith("runtime_"):
+                    metadata_row[col_name] = stage_runtimes.get(col_name[len("runtime_"):], 0)
+
+            # Append row to file.
+            metadata_row.append()
+
+            ######################################################
+            # 2. Add low-dimensional projection and pointwise
+            # quality critera values.
+            ######################################################
+
+            self._embedding_file.append(
+                model_id=valid_model_id,
+                low_dimensional_projection=result["low_dimensional_projection"],
+                pointwise_quality=result_objectives["pointwise_quality_values"]
+            )
+
+        # Flush buffers, make sure data is stored in file.
+        metadata_table.flush()
+        self._embedding_file.flush()
+
+        # Mark models as completed only once all their data is stored. Models written without being recorded in the
+        # ledger are rolled back when the file is opened next time.
+        for result in batch:
+            self._job_ledger.record(result["parameter_set"], result["parameter_set"]["id"])
+        self._job_ledger.commit()
 
     def _open_pytables_file(self) -> tables.file.File:
         """
@@ -155,7 +242,7 @@ class PersistenceThread(threading.Thread):
         :return: File handle of newly created .h5 file.
         """
 
-        self._ids_to_process: set = {i for i in range(0, self._total_number_of_results)}
+        parameter_config: list = DimensionalityReductionKernel.DIM_RED_KERNELS[self._dim_red_kernel_name]["parameters"]
         file_name: str = (
                 self._storage_path + "/embedding_" + self._dim_red_kernel_name.lower() + ".h5"
         )
@@ -163,19 +250,24 @@ class PersistenceThread(threading.Thread):
         # If file exists: Return handle to existing file (assuming file is not corrupt).
         if os.path.isfile(file_name):
             h5file: File = open_file(filename=file_name, mode="r+")
-            # Determine highest ID of available nodes.
-            for low_dim_leaf in h5file.walk_nodes("/projection_coordinates/", classname="CArray"):
-                self._ids_to_process.remove(int(low_dim_leaf._v_name[5:]))
+
+            # Roll back models written by an interrupted run, but not recorded as completed.
+            self._job_ledger = JobLedger(h5file, parameter_config)
+            self._job_ledger.roll_back_metadata()
+
+            # Files in storage format v1 are extended in the same format. If no embeddings were stored yet, arrays are
+            # created with first results.
+            if "projection_coordinates" in h5file.root:
+                self._embedding_file = EmbeddingFile(h5file, self._filters)
+                self._embedding_file.roll_back(set(self._job_ledger.model_ids.values()))
+            EmbeddingFile.write_max_k(h5file, self._max_k)
 
             return h5file
 
-        # If file doesn't exist yet: Initialize new file.
+        # If file doesn't exist yet: Initialize new file. Arrays for embedding coordinates and embedding qualities of
+        # each point are created with first results.
         h5file: File = open_file(filename=file_name, mode="w")
 
-        # Create groups in new file (embedding coordinates and embedding qualities of each point).
-        h5file.create_group(h5file.root, "projection_coordinates", title="Low-dimensional coordinates")
-        h5file.create_group(h5file.root, "pointwise_quality", title="Pointwise embedding quality")
-
         # Create table.
         metadata_table = h5file.create_table(
             where=h5file.root,
@@ -184,5 +276,7 @@ class PersistenceThread(threading.Thread):
             title="Metadata for t-SNE models"
         )
         metadata_table.flush()
+        self._job_ledger = JobLedger(h5file, parameter_config)
+        EmbeddingFile.write_max_k(h5file, self._max_k)
 
         return h5file
@@ -7,8 +7,6 @@ import pandas as pd
 import numpy as np
 import re
 from sklearn.preprocessing import StandardScaler
-import sklearn
-import xgboost
 from data_generation.datasets import InputDataset
 
 
@@ -20,10 +18,22 @@ class HappinessDataset(InputDataset):
 
     # Measured TDP for Happiness dataset with regression task in terms of RMSE.
     high_dim_TDP = 0.31
-
-    def __init__(self, storage_path: str):
+    # Small dataset, hence TDP is averaged over many splits.
+    TDP_NUM_SPLITS: int = 100
+    TDP_TEST_SIZE: float = 0.5
+
+    def __init__(
+            self,
+            storage_path: str,
+            target_domain_performance_regressor: str = "knn",
+            target_domain_performance_n_jobs: int = 1
+    ):
         self._df: pd.DataFrame = None
-        super().__init__(storage_path=storage_path)
+        super().__init__(
+            storage_path=storage_path,
+            target_domain_performance_regressor=target_domain_performance_regressor,
+            target_domain_performance_n_jobs=target_domain_performance_n_jobs
+        )
 
     def _load_data(self) -> dict:
         df = pd.read_csv(
@@ -55,42 +65,9 @@ class HappinessDataset(InputDataset):
             df["record_name"] = df.index.values
             df.to_csv(path_or_buf=filepath, index=False)
 
-    def _compute_target_domain_performance(self, features: np.ndarray) -> float:
-        """
-        Auxiliary function providing TDP computation for both HD/original and relative case, since for HappinessDataset
-        both implementations are identical (both rely exclusively on numerical features).
-        :param features: Feature matrix as numeric numpy array.
-        :return: Target domain performance.
-        """
-
-        labels: np.ndarray = np.reshape(self.labels().values, (-1, 1))
-
-        # Loop through stratified splits, average prediction accuracy over all splits.
-        accuracy: float = 0
-        n_splits: int = 100
-
-        # Apply boosting w/o further preprocessing to predict target values.
-        reg: xgboost.XGBRegressor = xgboost.XGBRegressor(
-            objective='reg:squarederror',
-            n_estimators=100,
-            learning_rate=0.08,
-            subsample=0.75,
-            colsample_bytree=1,
-            max_depth=7
-        )
-
-        for i in range(0, n_splits):
-            x_train, x_test, y_train, y_test = sklearn.model_selection.train_test_split(features, labels, test_size=0.5)
-            reg.fit(x_train, y_train)
-
-            # Measure accuracy.
-            y_pred: np.ndarray = np.reshape(reg.predict(x_test), (-1, 1))
-            accuracy += np.sqrt(sklearn.metrics.mean_squared_error(y_test, y_pred)) / np.mean(y_pred)
-
-        return accuracy / n_splits
-
     def compute_hd_target_domain_performance(self) -> float:
-        return self._compute_target_domain_performance(self._preprocessed_hd_features)
+        # Computed once before models are generated, hence on all CPUs.
+        return self._compute_target_domain_performance(self._preprocessed_hd_features, n_jobs=-1)
 
     def compute_relative_target_domain_performance(self, features: np.ndarray) -> float:
         # TDP is measured as relative error here, so we divide performance in HD by that in LD space.
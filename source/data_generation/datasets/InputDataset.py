@@ -6,6 +6,9 @@ import sklearn.metrics
 import hdbscan
 import pandas as pd
 from utils import Utils
+from objectives.topology_preservation_objectives.NeighbourhoodGraph import NeighbourhoodGraph
+from data_generation.datasets.TargetDomainPerformanceEvaluator import TargetDomainPerformanceEvaluator
+from data_generation.datasets.SeparabilityEvaluator import SeparabilityEvaluator
 import logging
 from enum import Enum
 
@@ -25,11 +28,25 @@ class InputDataset:
         DISCRETE = "discrete"
         NOMINAL = "nominal"
 
-    def __init__(self, storage_path: str):
+    # Number of train/test splits and share of test records for measuring target domain performance.
+    TDP_NUM_SPLITS: int = 3
+    TDP_TEST_SIZE: float = 0.3
+
+    def __init__(
+            self,
+            storage_path: str,
+            target_domain_performance_regressor: str = "knn",
+            target_domain_performance_n_jobs: int = 1
+    ):
         """
         Defines variables to be used in inheriting classes.
         Takes some variable speeding up cloning an instance.
         :param storage_path: Path to folder storing data.
+        :param target_domain_performance_regressor: Regressor used for measuring target domain performance. See
+        TargetDomainPerformanceEvaluator.REGRESSORS.
+        :param target_domain_performance_n_jobs: Number of threads evaluating train/test splits for target domain
+        performance of embeddings in parallel. Target domain performance of the high-dimensional data is computed once
+        when the dataset is created, using all logical CPUs.
         """
 
         # Get logger.
@@ -44,6 +61,17 @@ class InputDataset:
         # Preprocess features.
         self._preprocessed_hd_features: np.ndarray = self._preprocess_hd_features()
 
+        # Set up evaluator for target domain performance, reused for all embeddings.
+        self._target_domain_performance_evaluator: TargetDomainPerformanceEvaluator = TargetDomainPerformanceEvaluator(
+            labels=self.labels().values,
+            n_splits=self.TDP_NUM_SPLITS,
+            test_size=self.TDP_TEST_SIZE,
+            regressor=target_domain_performance_regressor,
+            n_jobs=target_domain_performance_n_jobs
+        )
+        # Set up evaluator for separability metric, reused for all embeddings.
+        self._separability_evaluator: SeparabilityEvaluator = SeparabilityEvaluator(labels=self.labels().values)
+
         # Calculate accuracy for HD space, if not done yet.
         self._hd_target_domain_performance: float = self.compute_hd_target_domain_performance()
 
@@ -143,6 +171,16 @@ class InputDataset:
             "PQM": {"supertype": supertypes.NUMERICAL.value, "type": subtypes.DISCRETE.value}
         }
 
+    def _compute_target_domain_performance(self, features: np.ndarray, n_jobs: int = None) -> float:
+        """
+        Computes target domain performance for feature matrix as relative prediction error for this dataset's labels.
+        :param features: Feature matrix as numeric numpy array.
+        :param n_jobs: Number of threads evaluating splits in parallel. Defaults to the number set for this dataset.
+        :return: Target domain performance.
+        """
+
+        return self._target_domain_performance_evaluator.compute(features, n_jobs)
+
     def compute_hd_target_domain_performance(self) -> float:
         """
         Calculates target domain performance for feature matrix in original, high-dimensional dataset.
@@ -166,6 +204,25 @@ class InputDataset:
 
         return cdist(self._preprocessed_hd_features, self._preprocessed_hd_features, "euclidean")
 
+    def compute_neighbourhood_graph(
+            self, max_k: int, method: str = "balltree", distance_matrix: np.ndarray = None
+    ) -> NeighbourhoodGraph:
+        """
+        Computes graph of each record's max_k nearest neighbours in high-dimensional dataset.
+        :param max_k: Number of neighbours per record.
+        :param method: One of NeighbourhoodGraph.METHODS. "exact" uses distance matrix, others index preprocessed
+        features.
+        :param distance_matrix: Precomputed distance matrix. Computed if not supplied and needed.
+        :return: Neighbourhood graph.
+        """
+
+        if method == "exact":
+            return NeighbourhoodGraph.from_distance_matrix(
+                distance_matrix if distance_matrix is not None else self.compute_distance_matrix(), max_k
+            )
+
+        return NeighbourhoodGraph.from_data(self._preprocessed_hd_features, max_k, method, "euclidean")
+
     def compute_separability_metric(
             self,
             features: np.ndarray,
@@ -183,6 +240,10 @@ class InputDataset:
         :return: Normalized score between 0 and 1 indicating cluster consistency in feature space.
         """
 
+        # Hamming distance on labels with default clustering settings is handled by the reusable evaluator.
+        if (cluster_metric, silhouette_metric, min_cluster_size) == ("euclidean", "hamming", 2):
+            return self._separability_evaluator.compute(features)
+
         ########################################################################
         # 1. Cluster projection with number of classes.
         ########################################################################
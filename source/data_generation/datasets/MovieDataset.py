@@ -6,11 +6,10 @@ from scipy.spatial.distance import cdist
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
-import sklearn
 from data_generation.datasets import InputDataset
-import xgboost
 import ast
 import datetime
+from objectives.topology_preservation_objectives.NeighbourhoodGraph import NeighbourhoodGraph
 
 
 class MovieDataset(InputDataset):
@@ -23,11 +22,20 @@ class MovieDataset(InputDataset):
         'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction', 'TV Movie', 'Thriller', 'War', 'Western'
     ]
 
-    def __init__(self, storage_path: str):
+    def __init__(
+            self,
+            storage_path: str,
+            target_domain_performance_regressor: str = "knn",
+            target_domain_performance_n_jobs: int = 1
+    ):
         self._df: pd.DataFrame = None
         self._preprocessed_feature_cols: list = None
 
-        super().__init__(storage_path=storage_path)
+        super().__init__(
+            storage_path=storage_path,
+            target_domain_performance_regressor=target_domain_performance_regressor,
+            target_domain_performance_n_jobs=target_domain_performance_n_jobs
+        )
 
     def _load_data(self):
         target_col: str = "vote_average"
@@ -125,42 +133,9 @@ class MovieDataset(InputDataset):
                 path_or_buf=filepath, index=False
             )
 
-    def _compute_target_domain_performance(self, features: np.ndarray) -> float:
-        """
-        Auxiliary function providing TDP computation for both HD/original and relative case, since for HappinessDataset
-        both implementations are identical (both rely exclusively on numerical features).
-        :param features: Feature matrix as numeric numpy array.
-        :return: Target domain performance.
-        """
-
-        labels: np.ndarray = np.reshape(self.labels().values, (-1, 1))
-
-        # Loop through stratified splits, average prediction accuracy over all splits.
-        relative_error: float = 0
-        n_splits: int = 3
-
-        # Apply boosting w/o further preprocessing to predict target values.
-        reg: xgboost.XGBRegressor = xgboost.XGBRegressor(
-            objective='reg:squarederror',
-            n_estimators=100,
-            learning_rate=0.08,
-            subsample=0.75,
-            colsample_bytree=1,
-            max_depth=7
-        )
-
-        for i in range(0, n_splits):
-            x_train, x_test, y_train, y_test = sklearn.model_selection.train_test_split(features, labels, test_size=0.3)
-            reg.fit(x_train, y_train)
-
-            # Measure accuracy.
-            y_pred: np.ndarray = np.reshape(reg.predict(x_test), (-1, 1))
-            relative_error += np.sqrt(sklearn.metrics.mean_squared_error(y_test, y_pred)) / y_pred.mean()
-
-        return relative_error / n_splits
-
     def compute_hd_target_domain_performance(self) -> float:
-        return self._compute_target_domain_performance(np.nan_to_num(self._preprocessed_hd_features))
+        # Computed once before models are generated, hence on all CPUs.
+        return self._compute_target_domain_performance(np.nan_to_num(self._preprocessed_hd_features), n_jobs=-1)
 
     def compute_relative_target_domain_performance(self, features: np.ndarray):
         # TDP is measured as relative error here, so we divide performance in HD by that in LD space.
@@ -207,6 +182,24 @@ class MovieDataset(InputDataset):
 
         return distances
 
+    def compute_neighbourhood_graph(
+            self, max_k: int, method: str = "exact", distance_matrix: np.ndarray = None
+    ) -> NeighbourhoodGraph:
+        """
+        Computes graph of each record's max_k nearest neighbours in high-dimensional dataset.
+        Note that neighbourhoods are always determined exactly, since the weighted mix of metrics in
+        compute_distance_matrix() can't be indexed by a ball tree or NN-descent.
+        :param max_k: Number of neighbours per record.
+        :param method: Ignored, "exact" is used in any case.
+        :param distance_matrix: Precomputed distance matrix. Computed if not supplied.
+        :return: Neighbourhood graph.
+        """
+
+        if method != "exact":
+            self._logger.warning("Neighbourhood graph method " + method + " not supported by dataset, using exact.")
+
+        return super().compute_neighbourhood_graph(max_k, "exact", distance_matrix)
+
     @staticmethod
     def get_attributes_data_types() -> dict:
         supertypes: Enum = InputDataset.DataSupertypes
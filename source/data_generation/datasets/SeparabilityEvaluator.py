@@ -0,0 +1,125 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import hdbscan
+
+
+class SeparabilityEvaluator:
+    """
+    Measures separability of feature matrices - usually embeddings - as Silhouette score of an HDBSCAN clustering
+    w.r.t. a dataset's labels, with the Hamming distance between labels (0 if labels are equal, 1 otherwise) as
+    distance between records.
+    Since this distance only depends on whether labels are equal, the Silhouette score follows from the contingency
+    table of clusters and labels. It's computed in O(n + clusters * labels) instead of building an n x n distance matrix
+    of labels for every embedding. Results are identical to sklearn.metrics.silhouette_score() with metric="hamming".
+    Results are memoized by a hash of the feature matrix.
+    """
+
+    def __init__(
+            self,
+            labels: np.ndarray,
+            cluster_metric: str = "euclidean",
+            min_cluster_size: int = 2,
+            cache_size: int = 1024
+    ):
+        """
+        Initializes evaluator and encodes labels.
+        :param labels: Ground truth labels.
+        :param cluster_metric: Metric to use in clustering.
+        :param min_cluster_size: Minimal number of records in cluster.
+        :param cache_size: Maximal number of memoized results.
+        """
+
+        # Label codes 0...m - 1 per record.
+        self._label_codes: np.ndarray = np.unique(np.asarray(labels).ravel(), return_inverse=True)[1].ravel()
+        self._num_labels: int = int(self._label_codes.max()) + 1 if len(self._label_codes) else 0
+        self._cluster_metric: str = cluster_metric
+        self._min_cluster_size: int = min_cluster_size
+        self._cache_size: int = cache_size
+        self._cache: OrderedDict = OrderedDict()
+
+    def compute(self, features: np.ndarray) -> float:
+        """
+        Clusters feature matrix and computes separability metric.
+        :param features: Coordinates of low-dimensional projection.
+        :return: Normalized score between 0 and 1 indicating cluster consistency in feature space.
+        """
+
+        features = np.ascontiguousarray(features, dtype=float)
+        key: str = hashlib.sha1(features.tobytes() + str(features.shape).encode()).hexdigest()
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        # noinspection PyTypeChecker
+        clusterer: hdbscan.HDBSCAN = hdbscan.HDBSCAN(
+            alpha=1.0,
+            metric=self._cluster_metric,
+            min_cluster_size=self._min_cluster_size,
+            min_samples=None,
+            # Embeddings are evaluated in worker processes already, so don't spawn further ones for core distances.
+            core_dist_n_jobs=1
+        ).fit(features)
+
+        # Silhouette score fails with less than two or as many clusters as records. Workaround: Set silhouette score to
+        # worst possible value in this case. Actual solution: Force at least two clusters - diff. clustering algorithm?
+        # See https://github.com/rmitsch/DROP/issues/49.
+        silhouette_score: float = self.compute_silhouette_score(clusterer.labels_)
+        silhouette_score = -1 if silhouette_score is None or np.isnan(silhouette_score) else silhouette_score
+
+        # Normalize to 0 <= x <= 1.
+        separability_metric: float = (silhouette_score + 1) / 2.0
+
+        self._cache[key] = separability_metric
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+        return separability_metric
+
+    def compute_silhouette_score(self, cluster_labels: np.ndarray) -> float:
+        """
+        Computes mean Silhouette coefficient of clustering with Hamming distance between labels. Like sklearn, noise
+        records (cluster label -1) are treated as a cluster of their own and records in singleton clusters have a
+        coefficient of 0.
+        :param cluster_labels: Cluster label per record.
+        :return: Silhouette score. None if number of clusters isn't between 2 and number of records - 1.
+        """
+
+        num_records: int = len(self._label_codes)
+        cluster_codes: np.ndarray = np.unique(cluster_labels, return_inverse=True)[1].ravel()
+        num_clusters: int = int(cluster_codes.max()) + 1 if num_records else 0
+
+        if not 2 <= num_clusters <= num_records - 1:
+            return None
+
+        # Number of records per cluster and label.
+        counts: np.ndarray = np.bincount(
+            cluster_codes * self._num_labels + self._label_codes, minlength=num_clusters * self._num_labels
+        ).reshape(num_clusters, self._num_labels).astype(float)
+        cluster_sizes: np.ndarray = counts.sum(axis=1)
+
+        # Mean distance of a record with label l to records of cluster c: Share of records in c not labelled l.
+        mean_distances: np.ndarray = 1 - counts / cluster_sizes[:, None]
+
+        # Mean intra-cluster distance, excluding the record itself: (size - count) / (size - 1).
+        with np.errstate(divide="ignore", invalid="ignore"):
+            intra_distances: np.ndarray = (cluster_sizes[:, None] - counts) / (cluster_sizes[:, None] - 1)
+
+        # Mean distance to nearest other cluster: Smallest mean distance per label over all clusters, or the second
+        # smallest one for the cluster with the smallest one.
+        nearest_clusters: np.ndarray = np.argmin(mean_distances, axis=0)
+        sorted_mean_distances: np.ndarray = np.sort(mean_distances, axis=0)
+        inter_distances: np.ndarray = np.where(
+            np.arange(num_clusters)[:, None] == nearest_clusters[None, :],
+            sorted_mean_distances[1][None, :],
+            sorted_mean_distances[0][None, :]
+        )
+
+        # Coefficients per combination of cluster and label, weighted by number of records with this combination.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            coefficients: np.ndarray = np.nan_to_num(
+                (inter_distances - intra_distances) / np.maximum(intra_distances, inter_distances)
+            )
+
+        return float((coefficients * counts).sum() / num_records)
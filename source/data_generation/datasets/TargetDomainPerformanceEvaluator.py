@@ -0,0 +1,112 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.model_selection import ShuffleSplit
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.ensemble import HistGradientBoostingRegressor
+from sklearn.base import RegressorMixin
+
+
+class TargetDomainPerformanceEvaluator:
+    """
+    Measures target domain performance (TDP) of feature matrices - embeddings or the original high-dimensional data -
+    as relative prediction error of a regressor for a dataset's labels.
+    Train/test splits are drawn once, so all feature matrices are evaluated on the same splits. Results are memoized
+    by a hash of the feature matrix.
+    Supported regressors:
+        - "knn": k-nearest neighbour regression. Cheap to fit on low-dimensional embeddings.
+        - "hist_gradient_boosting": Histogram-based gradient boosting.
+    """
+
+    REGRESSORS: tuple = ("knn", "hist_gradient_boosting")
+
+    def __init__(
+            self,
+            labels: np.ndarray,
+            n_splits: int,
+            test_size: float,
+            regressor: str = "knn",
+            n_neighbors: int = 10,
+            n_jobs: int = 1,
+            seed: int = 0,
+            cache_size: int = 1024
+    ):
+        """
+        Initializes evaluator and draws train/test splits.
+        :param labels: Labels to predict.
+        :param n_splits: Number of train/test splits to average error over.
+        :param test_size: Share of records in test set.
+        :param regressor: One of TargetDomainPerformanceEvaluator.REGRESSORS.
+        :param n_neighbors: Number of neighbours for kNN regression.
+        :param n_jobs: Number of threads evaluating splits in parallel. Note that evaluators are copied into each worker
+        process generating models, so values above 1 multiply with the number of workers.
+        :param seed: Seed for drawing splits.
+        :param cache_size: Maximal number of memoized results.
+        """
+
+        assert regressor in TargetDomainPerformanceEvaluator.REGRESSORS, "Regressor " + regressor + " not supported."
+
+        self._labels: np.ndarray = np.asarray(labels, dtype=float).ravel()
+        self._splits: list = list(
+            ShuffleSplit(n_splits=n_splits, test_size=test_size, random_state=seed).split(self._labels)
+        )
+        self._regressor: str = regressor
+        self._n_neighbors: int = n_neighbors
+        self._n_jobs: int = n_jobs
+        self._cache_size: int = cache_size
+        self._cache: OrderedDict = OrderedDict()
+
+    def compute(self, features: np.ndarray, n_jobs: int = None) -> float:
+        """
+        Computes TDP of feature matrix as root mean squared error relative to mean prediction, averaged over all splits.
+        :param features: Feature matrix with one row per record.
+        :param n_jobs: Number of threads evaluating splits in parallel. Defaults to evaluator's n_jobs.
+        :return: Relative error; lower is better.
+        """
+
+        features = np.ascontiguousarray(features, dtype=float)
+        key: str = hashlib.sha1(features.tobytes() + str(features.shape).encode()).hexdigest()
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        relative_errors: list = Parallel(n_jobs=n_jobs if n_jobs is not None else self._n_jobs, prefer="threads")(
+            delayed(self._compute_relative_error)(features, train_indices, test_indices)
+            for train_indices, test_indices in self._splits
+        )
+        relative_error: float = float(np.mean(relative_errors))
+
+        self._cache[key] = relative_error
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+        return relative_error
+
+    def _compute_relative_error(self, features: np.ndarray, train_indices: np.ndarray, test_indices: np.ndarray):
+        """
+        Fits regressor on training set and computes relative error on test set.
+        :param features:
+        :param train_indices:
+        :param test_indices:
+        :return: Root mean squared error divided by mean prediction.
+        """
+
+        y_pred: np.ndarray = self._create_regressor(len(train_indices)).fit(
+            features[train_indices], self._labels[train_indices]
+        ).predict(features[test_indices])
+
+        return np.sqrt(np.mean(np.square(self._labels[test_indices] - y_pred))) / y_pred.mean()
+
+    def _create_regressor(self, num_training_records: int) -> RegressorMixin:
+        """
+        Creates unfitted regressor.
+        :param num_training_records:
+        :return:
+        """
+
+        if self._regressor == "knn":
+            return KNeighborsRegressor(n_neighbors=min(self._n_neighbors, num_training_records), weights="distance")
+
+        return HistGradientBoostingRegressor(learning_rate=0.08, max_depth=7)
@@ -1,3 +1,5 @@
+from data_generation.datasets.TargetDomainPerformanceEvaluator import TargetDomainPerformanceEvaluator
+from data_generation.datasets.SeparabilityEvaluator import SeparabilityEvaluator
 from data_generation.datasets.InputDataset import InputDataset
 from data_generation.datasets.HappinessDataset import HappinessDataset
 from data_generation.datasets.MovieDataset import MovieDataset
@@ -0,0 +1,176 @@
+import os
+import numpy as np
+import pandas as pd
+from tables import *
+from typing import Tuple
+from data_generation.JobLedger import JobLedger
+from .DimensionalityReductionKernel import DimensionalityReductionKernel
+from utils import Utils
+
+
+class AdaptiveParameterSearch:
+    """
+    Proposes parameter sets for a DR kernel in rounds instead of enumerating its Cartesian grid. Parameters are sampled
+    from the ranges spanned by the grid values in DIM_RED_KERNELS_PARAMETERS (log-uniformly for ranges covering at least
+    one order of magnitude), so the search covers the space between grid points as well.
+    Once enough models are available, surrogate models (see Utils.fit_surrogate_regressor()) are fit on bootstrap
+    samples of the generated models. Candidates are scored by how much this ensemble disagrees on their objectives, and
+    parameter sets are picked as best of a random group of candidates each. This prioritizes regions where surrogates
+    are uncertain while keeping proposals spread out.
+    """
+
+    def __init__(
+            self,
+            dim_red_kernel_name: str,
+            data_file_path: str,
+            num_candidates_per_parameter_set: int = 20,
+            ensemble_size: int = 5,
+            min_num_models: int = 20,
+            seed: int = 0
+    ):
+        """
+        Initializes search.
+        :param dim_red_kernel_name: Name of DR kernel to search parameters for.
+        :param data_file_path: Path to .h5 file generated models are stored in.
+        :param num_candidates_per_parameter_set: Number of sampled candidates to pick each parameter set from.
+        :param ensemble_size: Number of surrogate models per objective used for estimating uncertainty.
+        :param min_num_models: Number of models required before surrogates are used. Candidates are picked at random
+        until then.
+        :param seed: Seed for sampling candidates.
+        """
+
+        self._dim_red_kernel_config: dict = DimensionalityReductionKernel.DIM_RED_KERNELS[dim_red_kernel_name]
+        self._parameter_config: list = self._dim_red_kernel_config["parameters"]
+        self._column_kinds: dict = {
+            name: col.kind for name, col in self._dim_red_kernel_config["hdf5_description"].columns.items()
+        }
+        self._data_file_path: str = data_file_path
+        self._num_candidates_per_parameter_set: int = num_candidates_per_parameter_set
+        self._ensemble_size: int = ensemble_size
+        self._min_num_models: int = min_num_models
+        self._rng: np.random.RandomState = np.random.RandomState(seed)
+
+    def propose(self, num_parameter_sets: int) -> Tuple[list, int]:
+        """
+        Proposes new parameter sets based on models generated so far.
+        :param num_parameter_sets: Number of parameter sets to propose.
+        :return: List of parameter sets with model ID as "id"; number of parameter sets in total (including already
+        generated ones).
+        """
+
+        metadata, completed_model_ids = self._read_models()
+
+        # Sample candidates, drop duplicates and already generated ones.
+        candidates: dict = {}
+        for candidate in self._sample_candidates(num_parameter_sets * self._num_candidates_per_parameter_set):
+            parameter_hash: str = JobLedger.hash_parameter_set(candidate, self._parameter_config)
+            if parameter_hash not in completed_model_ids:
+                candidates[parameter_hash] = candidate
+        candidates: list = list(candidates.values())
+        num_parameter_sets = min(num_parameter_sets, len(candidates))
+
+        # Score candidates by surrogate uncertainty. Without enough models, all candidates are equally uncertain.
+        scores: np.ndarray = self._rng.uniform(size=len(candidates)) if len(metadata) < self._min_num_models else \
+            self._estimate_uncertainty(metadata, candidates)
+
+        # Pick best candidate per random group.
+        groups: list = np.array_split(self._rng.permutation(len(candidates)), num_parameter_sets)
+        parameter_sets: list = [candidates[group[np.argmax(scores[group])]] for group in groups]
+
+        # Assign IDs after the largest one in use.
+        next_model_id: int = max(completed_model_ids.values(), default=-1) + 1
+        for i, parameter_set in enumerate(parameter_sets):
+            parameter_set["id"] = next_model_id + i
+
+        return parameter_sets, len(parameter_sets) + len(completed_model_ids)
+
+    def _read_models(self) -> Tuple[pd.DataFrame, dict]:
+        """
+        Reads metadata and IDs of completed models.
+        :return: Metadata of completed models; dictionary with model ID per parameter hash of completed models.
+        """
+
+        if not os.path.isfile(self._data_file_path):
+            return pd.DataFrame(), {}
+
+        h5file: File = open_file(filename=self._data_file_path, mode="r")
+        completed_model_ids: dict = JobLedger.read_model_ids(h5file, self._parameter_config)
+        metadata: pd.DataFrame = pd.DataFrame(h5file.root.metadata[:])
+        h5file.close()
+
+        # Only consider models completed according to ledger.
+        metadata = metadata[metadata.id.isin(list(completed_model_ids.values()))].set_index("id")
+
+        return metadata, completed_model_ids
+
+    def _sample_candidates(self, num_candidates: int) -> list:
+        """
+        Samples parameter sets from the ranges spanned by the configured parameter values.
+        :param num_candidates:
+        :return: List of parameter sets.
+        """
+
+        values: dict = {}
+        for param_config in self._parameter_config:
+            name: str = param_config["name"]
+
+            if param_config["type"] == "categorical":
+                values[name] = self._rng.choice(param_config["values"], size=num_candidates)
+                continue
+
+            low, high = min(param_config["values"]), max(param_config["values"])
+            if low > 0 and high / low >= 10:
+                samples: np.ndarray = np.exp(self._rng.uniform(np.log(low), np.log(high), size=num_candidates))
+            else:
+                samples = self._rng.uniform(low, high, size=num_candidates)
+
+            values[name] = np.clip(np.round(samples), low, high).astype(int) \
+                if self._column_kinds[name] in ("int", "uint") else samples
+
+        return [
+            {name: values[name][i].item() for name in values}
+            for i in range(num_candidates)
+        ]
+
+    def _estimate_uncertainty(self, metadata: pd.DataFrame, candidates: list) -> np.ndarray:
+        """
+        Estimates uncertainty of surrogate models' predictions for candidates as the spread of predictions of surrogates
+        fit on bootstrap samples, relative to the spread of observed values and summed over all objectives.
+        :param metadata: Metadata of generated models.
+        :param candidates: Candidate parameter sets.
+        :return: Uncertainty score per candidate.
+        """
+
+        metadata_template: dict = Utils.get_metadata_template(self._dim_red_kernel_config)
+        objectives: list = metadata_template["objectives"]
+        num_models: int = len(metadata)
+
+        # Preprocess models and candidates together, so categorical values are encoded consistently.
+        candidates_df: pd.DataFrame = pd.DataFrame(candidates)
+        candidates_df.index = np.arange(num_models, num_models + len(candidates))
+        for param_config in self._parameter_config:
+            if param_config["type"] == "categorical":
+                candidates_df[param_config["name"]] = candidates_df[param_config["name"]].str.encode("utf-8")
+        combined_df: pd.DataFrame = pd.concat([metadata.reset_index(drop=True), candidates_df])
+        combined_df.index.name = "id"
+        features_df, labels_df, _ = Utils.preprocess_embedding_metadata_for_predictor(metadata_template, combined_df)
+        candidate_features_df: pd.DataFrame = features_df.iloc[num_models:]
+
+        predictions: dict = {objective: [] for objective in objectives}
+        for _ in range(self._ensemble_size):
+            sample: np.ndarray = self._rng.randint(0, num_models, size=num_models)
+            # Use positions as IDs, since bootstrap samples contain models multiple times.
+            sample_features_df: pd.DataFrame = features_df.iloc[sample].reset_index(drop=True)
+            sample_labels_df: pd.DataFrame = labels_df.iloc[sample].reset_index(drop=True)
+            sample_features_df.index.name = sample_labels_df.index.name = "id"
+
+            surrogate_models: dict = Utils.fit_surrogate_regressor(
+                metadata_template, sample_features_df, sample_labels_df
+            )
+            for objective in objectives:
+                predictions[objective].append(surrogate_models[objective].predict(candidate_features_df))
+
+        return np.sum([
+            np.std(predictions[objective], axis=0) / max(labels_df[objective].iloc[:num_models].std(), 1e-12)
+            for objective in objectives
+        ], axis=0)
@@ -0,0 +1,195 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+import numpy as np
+from typing import Tuple
+
+
+class AffinityCache:
+    """
+    Cache for affinity inputs of DR kernels that only depend on the dataset and few hyperparameters, so that they are
+    computed once per dataset instead of once per model.
+    Currently holds nearest neighbours for UMAP (keyed by n_neighbors), which UMAP consumes as precomputed_knn.
+    Neighbours cached for a larger n_neighbors are sliced for smaller ones.
+    Entries are kept in memory up to a size bound and evicted in least-recently-used order. If a spill directory is
+    set, computed entries are also written to .npy files and memory-mapped if requested again after eviction. Files are
+    named after a hash of the distance matrix, so they are shared by worker processes and runs on the same dataset.
+    """
+
+    def __init__(self, max_size: int = 256 * 1024 ** 2, spill_path: str = None):
+        """
+        Initializes empty cache.
+        :param max_size: Maximal size of entries kept in memory in bytes.
+        :param spill_path: Path to directory to spill evicted entries to. Evicted entries are discarded if not set.
+        """
+
+        self._max_size: int = max_size
+        self._spill_path: str = spill_path
+        self._entries: OrderedDict = OrderedDict()
+        self._size: int = 0
+        # Hash of distance matrix entries were computed for.
+        self._distance_matrix_id: int = None
+        self._distance_matrix_hash: str = None
+
+    def get_umap_knn(
+            self, distance_matrix: np.ndarray, n_neighbors: int, num_neighbors_to_compute: int = None
+    ) -> Tuple[np.ndarray, np.ndarray, None]:
+        """
+        Returns nearest neighbours of all records, including records themselves, as expected by UMAP's precomputed_knn.
+        :param distance_matrix: Square distance matrix of dataset.
+        :param n_neighbors:
+        :param num_neighbors_to_compute: Number of neighbours to compute if not cached yet, so that requests for up to
+        this many neighbours are served from the same entry. Defaults to n_neighbors.
+        :return: Indices of neighbours, distances to neighbours, search index (always None).
+        """
+
+        n_neighbors = min(int(n_neighbors), len(distance_matrix))
+        num_neighbors_to_compute = min(
+            max(int(num_neighbors_to_compute or 0), n_neighbors), len(distance_matrix)
+        )
+        self._check_distance_matrix(distance_matrix)
+
+        # Reuse neighbours computed for a larger n_neighbors.
+        for key in list(self._entries.keys()):
+            if key[0] == "umap_knn" and key[1] >= n_neighbors:
+                knn_indices, knn_dists = self._get(key)
+                return knn_indices[:, :n_neighbors], knn_dists[:, :n_neighbors], None
+
+        key, entry = self._load_spilled("umap_knn", n_neighbors)
+        if entry is None:
+            key = ("umap_knn", num_neighbors_to_compute)
+            entry = AffinityCache.compute_knn(distance_matrix, num_neighbors_to_compute)
+            self._spill(key, entry)
+        self._put(key, entry)
+
+        return entry[0][:, :n_neighbors], entry[1][:, :n_neighbors], None
+
+    @staticmethod
+    def compute_knn(distance_matrix: np.ndarray, n_neighbors: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Computes nearest neighbours from distance matrix. Ties are broken by index.
+        :param distance_matrix:
+        :param n_neighbors:
+        :return: Indices of neighbours ordered by distance, distances to neighbours.
+        """
+
+        knn_indices: np.ndarray = np.empty((len(distance_matrix), n_neighbors), dtype=np.int32)
+        knn_dists: np.ndarray = np.empty((len(distance_matrix), n_neighbors), dtype=np.float32)
+
+        # Process in chunks of rows to bound memory needed for partitioning.
+        chunk_size: int = max(1, 2 ** 24 // max(len(distance_matrix), 1))
+        for start in range(0, len(distance_matrix), chunk_size):
+            rows: np.ndarray = np.asarray(distance_matrix[start:start + chunk_size])
+            candidates: np.ndarray = np.argpartition(rows, n_neighbors - 1, axis=1)[:, :n_neighbors] \
+                if n_neighbors < rows.shape[1] else np.tile(np.arange(rows.shape[1]), (len(rows), 1))
+            candidate_dists: np.ndarray = np.take_along_axis(rows, candidates, axis=1)
+            order: np.ndarray = np.lexsort((candidates, candidate_dists), axis=1)
+
+            knn_indices[start:start + chunk_size] = np.take_along_axis(candidates, order, axis=1)
+            knn_dists[start:start + chunk_size] = np.take_along_axis(candidate_dists, order, axis=1)
+
+        return knn_indices, knn_dists
+
+    def _check_distance_matrix(self, distance_matrix: np.ndarray):
+        """
+        Clears cache if distance matrix differs from the one entries were computed for.
+        :param distance_matrix:
+        """
+
+        if self._distance_matrix_id == id(distance_matrix):
+            return
+
+        distance_matrix_hash: str = hashlib.sha1(
+            np.ascontiguousarray(distance_matrix).view(np.uint8).ravel()
+        ).hexdigest()
+        if distance_matrix_hash != self._distance_matrix_hash:
+            self._entries.clear()
+            self._size = 0
+
+        self._distance_matrix_id = id(distance_matrix)
+        self._distance_matrix_hash = distance_matrix_hash
+
+    def _get(self, key: tuple) -> tuple:
+        """
+        Returns entry in memory and marks it as recently used.
+        :param key:
+        :return:
+        """
+
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def _put(self, key: tuple, entry: tuple):
+        """
+        Adds entry, evicts least recently used ones if size bound is exceeded. Entries in memory for a smaller
+        n_neighbors of the same type are superseded and dropped.
+        :param key:
+        :param entry: Tuple of arrays.
+        """
+
+        for superseded_key in [k for k in self._entries if k[0] == key[0] and k[1] < key[1]]:
+            self._size -= sum(array.nbytes for array in self._entries.pop(superseded_key))
+
+        self._entries[key] = entry
+        self._size += sum(array.nbytes for array in entry)
+
+        # Keep the most recently added entry even if it exceeds the bound on its own.
+        while self._size > self._max_size and len(self._entries) > 1:
+            self._size -= sum(array.nbytes for array in self._entries.popitem(last=False)[1])
+
+    def _spill(self, key: tuple, entry: tuple):
+        """
+        Writes entry to spill directory, if set.
+        :param key:
+        :param entry: Tuple of arrays.
+        """
+
+        if self._spill_path is None:
+            return
+
+        os.makedirs(self._spill_path, exist_ok=True)
+        for i, array in enumerate(entry):
+            # Write to temporary file first, so other processes never read partially written files.
+            file_descriptor, temp_file_path = tempfile.mkstemp(dir=self._spill_path, suffix=".tmp")
+            with os.fdopen(file_descriptor, "wb") as file:
+                np.save(file, array)
+            os.replace(temp_file_path, self._spill_file_path(key, i))
+
+    def _load_spilled(self, kind: str, n_neighbors: int) -> Tuple[tuple, tuple]:
+        """
+        Loads spilled entry with smallest number of neighbours not smaller than n_neighbors as memory-mapped arrays.
+        :param kind: Type of entry, e. g. "umap_knn".
+        :param n_neighbors:
+        :return: Key and entry; None, None if no such entry was spilled.
+        """
+
+        if self._spill_path is None or not os.path.isdir(self._spill_path):
+            return None, None
+
+        # Entries are spilled as <hash>_<kind>_<number of neighbours>_<index of array>.npy.
+        prefix: str = self._distance_matrix_hash[:16] + "_" + kind + "_"
+        spilled_n_neighbors: list = sorted({
+            int(file_name[len(prefix):].split("_")[0]) for file_name in os.listdir(self._spill_path)
+            if file_name.startswith(prefix) and file_name.endswith("_1.npy")
+        })
+
+        for num_spilled_neighbors in spilled_n_neighbors:
+            if num_spilled_neighbors >= n_neighbors:
+                key: tuple = (kind, num_spilled_neighbors)
+                return key, tuple(np.load(self._spill_file_path(key, i), mmap_mode="r") for i in range(2))
+
+        return None, None
+
+    def _spill_file_path(self, key: tuple, index: int) -> str:
+        """
+        Returns path of file holding an array of a spilled entry.
+        :param key:
+        :param index: Index of array in entry.
+        :return:
+        """
+
+        return os.path.join(
+            self._spill_path,
+            self._distance_matrix_hash[:16] + "_" + "_".join(str(part) for part in key) + "_" + str(index) + ".npy"
+        )
@@ -1,52 +1,71 @@
 import os
+import time
 import itertools
 from sklearn.decomposition import TruncatedSVD
+from sklearn.utils.extmath import randomized_svd, svd_flip
 import numpy as np
 from tables import *
 from MulticoreTSNE import MulticoreTSNE
 import umap
 from .DimensionalityReductionKernelParameters import DIM_RED_KERNELS_PARAMETERS
+from .AffinityCache import AffinityCache
 
 
 from . import hdf5_descriptions
 from typing import Tuple
+from data_generation.JobLedger import JobLedger
 
 
 class DimensionalityReductionKernel:
     """
     Represents an instance of a dimensionality reduction method.
     Currently supported: TSNE, SVD and UMAP.
+    Parameter sets differing only in their kernel's group parameter can be computed together with run_group(). For SVD,
+    this yields the same results as computing them separately. For t-SNE and UMAP, results are approximations (see
+    run_group()), so grouping is opt-in.
     """
 
     # Supported dimensionality reduction algorithms and their parameters.
     DIM_RED_KERNELS = {
         "TSNE": {
             "parameters": DIM_RED_KERNELS_PARAMETERS["TSNE"],
-            "hdf5_description": hdf5_descriptions.TSNEDescription
+            "hdf5_description": hdf5_descriptions.TSNEDescription,
+            "group_parameter": "n_iter",
+            "exact_groups": False
         },
         "SVD": {
             "parameters": DIM_RED_KERNELS_PARAMETERS["SVD"],
-            "hdf5_description": hdf5_descriptions.SVDDescription
+            "hdf5_description": hdf5_descriptions.SVDDescription,
+            "group_parameter": "n_components",
+            "exact_groups": True
         },
         "UMAP": {
             "parameters": DIM_RED_KERNELS_PARAMETERS["UMAP"],
-            "hdf5_description": hdf5_descriptions.UMAPDescription
+            "hdf5_description": hdf5_descriptions.UMAPDescription,
+            "group_parameter": "n_epochs",
+            "exact_groups": False
         }
     }
 
+    # Number of iterations t-SNE spends in early exaggeration phase (default of MulticoreTSNE).
+    TSNE_NUM_EARLY_EXAGGERATION_ITERATIONS: int = 250
+
     # Define which runtimes are not bounded by [0, 1] intervals.
     # Note that we assume all objectives to start with 0, their upper bound might vary though.
     OBJECTIVES_WO_UPPER_BOUND = {"runtime", "target_domain_performance"}
 
-    def __init__(self, dim_red_kernel_name: str):
+    def __init__(self, dim_red_kernel_name: str, affinity_cache: AffinityCache = None):
         """
         Initializes new DimensionalityReductionKernel.
         :param dim_red_kernel_name:
+        :param affinity_cache: Cache for affinity inputs shared by all models computed with this kernel. UMAP's nearest
+        neighbours are computed for each model if not set.
         """
 
         self._dim_red_kernel_name = dim_red_kernel_name
         self._high_dim_data = None
         self._parameter_set = None
+        self._affinity_cache: AffinityCache = affinity_cache
 
     def run(self, high_dim_data: np.ndarray, parameter_set: dict):
         """
@@ -64,21 +83,7 @@ class DimensionalityReductionKernel:
         ###################################################
 
         if self._dim_red_kernel_name == "TSNE":
-            return MulticoreTSNE(
-                n_components=parameter_set["n_components"],
-                perplexity=parameter_set["perplexity"],
-                early_exaggeration=parameter_set["early_exaggeration"],
-                learning_rate=parameter_set["learning_rate"],
-                n_iter=parameter_set["n_iter"],
-                angle=parameter_set["angle"],
-                # Always set metric to 'precomputed', since distance matrices are calculated previously. If other
-                # metrics are desired, the corresponding preprocessing step has to be extended.
-                metric='precomputed',
-                method='barnes_hut' if parameter_set["n_components"] < 4 else 'exact',
-                # Set n_jobs to 1, since we parallelize at a higher level by splitting up model parametrizations amongst
-                # threads.
-                n_jobs=1
-            ).fit_transform(high_dim_data)
+            return DimensionalityReductionKernel._fit_tsne(high_dim_data, parameter_set)
 
         elif self._dim_red_kernel_name == "SVD":
             return TruncatedSVD(
@@ -92,21 +97,11 @@ class DimensionalityReductionKernel:
             res: np.ndarray = None
             valid_res: bool = False
 
+            precomputed_knn: tuple = self._get_umap_knn(high_dim_data, parameter_set)
+
             def fit_umap(init: str = "random") -> np.ndarray:
-                return umap.UMAP(
-                    n_components=parameter_set["n_components"],
-                    n_neighbors=parameter_set["n_neighbors"],
-                    n_epochs=parameter_set["n_epochs"],
-                    learning_rate=parameter_set["learning_rate"],
-                    min_dist=parameter_set["min_dist"],
-                    # Note: Recommended approach to keep spread and min_dist proportional - since original ration of
-                    # min_dist:spread is 1:10, we follow this ratio.
-                    spread=parameter_set["min_dist"] * 10,
-                    local_connectivity=parameter_set["local_connectivity"],
-                    # Always set metric to 'precomputed', since distance matrices are calculated previously. If
-                    # other metrics are desired, the corresponding preprocessing step has to be extended.
-                    metric='precomputed',
-                    init=init
+                return DimensionalityReductionKernel._create_umap(
+                    parameter_set, init, precomputed_knn
                 ).fit_transform(high_dim_data)
 
             while not valid_res:
@@ -122,37 +117,235 @@ class DimensionalityReductionKernel:
 
         return None
 
+    def run_group(self, high_dim_data: np.ndarray, parameter_sets: list) -> list:
+        """
+        Computes embeddings for parameter sets differing only in the kernel's group parameter (see
+        group_parameter_sets()) together, instead of running each from scratch:
+            - SVD: One decomposition with the largest number of components, sliced for all other numbers of components.
+            Components are computed and sign-corrected independently from each other, so results are the same as with
+            separate decompositions (up to the randomness of the randomized SVD).
+            - UMAP: One fit with all numbers of epochs, embeddings are taken from umap.UMAP.embedding_list_.
+            Note that UMAP's learning rate decays over the largest number of epochs, so checkpoints differ from
+            embeddings trained for fewer epochs from scratch.
+            - t-SNE: Chain of fits, each continuing from the previous embedding for the remaining iterations. The early
+            exaggeration phase is split across fits so that it ends after the same number of iterations as in a run
+            from scratch. MulticoreTSNE resets gains and momentum between fits.
+        Falls back to run() for single parameter sets.
+        :param high_dim_data:
+        :param parameter_sets: Parameter sets differing only in the kernel's group parameter.
+        :return: List of tuples with low-dimensional projection and runtime in seconds, in order of parameter_sets.
+        For t-SNE and UMAP, runtime is the time until the checkpoint was reached (prorated by number of epochs for
+        UMAP). For SVD, it's the time needed for the shared decomposition.
+        """
+
+        if len(parameter_sets) == 1:
+            start: float = time.time()
+            return [(self.run(high_dim_data, parameter_sets[0]), time.time() - start)]
+
+        group_parameter: str = self.DIM_RED_KERNELS[self._dim_red_kernel_name]["group_parameter"]
+        self._high_dim_data = high_dim_data
+        order: np.ndarray = np.argsort([parameter_set[group_parameter] for parameter_set in parameter_sets])
+        group_values: list = [int(parameter_sets[i][group_parameter]) for i in order]
+        assert len(set(group_values)) == len(group_values), "Values of group parameter have to be unique in group."
+        results: list = [None] * len(parameter_sets)
+
+        if self._dim_red_kernel_name == "SVD":
+            start: float = time.time()
+            # Use same decomposition as TruncatedSVD.
+            u, _, vt = randomized_svd(
+                high_dim_data, group_values[-1], n_iter=int(parameter_sets[0]["n_iter"]), flip_sign=False
+            )
+            _, vt = svd_flip(u, vt, u_based_decision=False)
+            projection: np.ndarray = np.asarray(high_dim_data) @ vt.T
+            runtime: float = time.time() - start
+
+            for i, n_components in zip(order, group_values):
+                results[i] = (np.ascontiguousarray(projection[:, :n_components]), runtime)
+
+        elif self._dim_red_kernel_name == "TSNE":
+            embedding: np.ndarray = None
+            runtime: float = 0
+            num_iterations_done: int = 0
+
+            for i, n_iter in zip(order, group_values):
+                start: float = time.time()
+                embedding = DimensionalityReductionKernel._fit_tsne(
+                    high_dim_data,
+                    {**parameter_sets[i], "n_iter": n_iter - num_iterations_done},
+                    init=embedding,
+                    n_iter_early_exag=max(
+                        DimensionalityReductionKernel.TSNE_NUM_EARLY_EXAGGERATION_ITERATIONS - num_iterations_done, 0
+                    )
+                )
+                runtime += time.time() - start
+                num_iterations_done = n_iter
+                results[i] = (embedding, runtime)
+
+        elif self._dim_red_kernel_name == "UMAP":
+            embeddings: list = None
+            start: float = time.time()
+            precomputed_knn: tuple = self._get_umap_knn(high_dim_data, parameter_sets[0])
+
+            # Repeat until valid results are produced, see run().
+            while embeddings is None or any(np.count_nonzero(np.isnan(embedding)) for embedding in embeddings):
+                reducer: umap.UMAP = DimensionalityReductionKernel._create_umap(
+                    {**parameter_sets[order[-1]], "n_epochs": group_values}, precomputed_knn=precomputed_knn
+                )
+                try:
+                    final_embedding: np.ndarray = reducer.fit_transform(high_dim_data)
+                except ValueError:
+                    reducer = DimensionalityReductionKernel._create_umap(
+                        {**parameter_sets[order[-1]], "n_epochs": group_values}, precomputed_knn=precomputed_knn
+                    )
+                    final_embedding = reducer.fit_transform(high_dim_data)
+                # Intermediate embeddings are listed in order of epochs, followed by the final embedding.
+                embeddings = [*reducer.embedding_list_[:len(group_values) - 1], final_embedding]
+
+            runtime: float = time.time() - start
+            for i, n_epochs, embedding in zip(order, group_values, embeddings):
+                results[i] = (embedding, runtime * n_epochs / group_values[-1])
+
+        return results
+
+    @staticmethod
+    def group_parameter_sets(parameter_sets: list, dim_red_kernel_name: str, warm_start: bool = False) -> list:
+        """
+        Groups parameter sets sharing all hyperparameters except for the kernel's group parameter, so that they can be
+        computed with run_group().
+        :param parameter_sets:
+        :param dim_red_kernel_name:
+        :param warm_start: Whether to group parameter sets of kernels for which run_group() only approximates separate
+        computations (t-SNE, UMAP). If not, these kernels get one group per parameter set.
+        :return: List of lists of parameter sets, in order of first occurrence of each group.
+        """
+
+        kernel_config: dict = DimensionalityReductionKernel.DIM_RED_KERNELS[dim_red_kernel_name]
+        group_parameter: str = kernel_config["group_parameter"]
+        if not (kernel_config["exact_groups"] or warm_start):
+            return [[parameter_set] for parameter_set in parameter_sets]
+
+        groups: dict = {}
+        for parameter_set in parameter_sets:
+            key: str = JobLedger.hash_parameter_set(
+                parameter_set,
+                [
+                    param_config for param_config in
+                    DimensionalityReductionKernel.DIM_RED_KERNELS[dim_red_kernel_name]["parameters"]
+                    if param_config["name"] != group_parameter
+                ]
+            )
+            groups.setdefault(key, []).append(parameter_set)
+
+        return list(groups.values())
+
+    @staticmethod
+    def _fit_tsne(
+            high_dim_data: np.ndarray, parameter_set: dict, init: np.ndarray = None, n_iter_early_exag: int = None
+    ) -> np.ndarray:
+        """
+        Fits t-SNE.
+        :param high_dim_data:
+        :param parameter_set:
+        :param init: Initial embedding. Random if not set.
+        :param n_iter_early_exag: Number of iterations in early exaggeration phase. MulticoreTSNE's default if not set.
+        :return: Low-dimensional projection.
+        """
+
+        return MulticoreTSNE(
+            n_components=parameter_set["n_components"],
+            perplexity=parameter_set["perplexity"],
+            early_exaggeration=parameter_set["early_exaggeration"],
+            learning_rate=parameter_set["learning_rate"],
+            n_iter=parameter_set["n_iter"],
+            n_iter_early_exag=(
+                n_iter_early_exag if n_iter_early_exag is not None else
+                DimensionalityReductionKernel.TSNE_NUM_EARLY_EXAGGERATION_ITERATIONS
+            ),
+            angle=parameter_set["angle"],
+            # Always set metric to 'precomputed', since distance matrices are calculated previously. If other
+            # metrics are desired, the corresponding preprocessing step has to be extended.
+            metric='precomputed',
+            method='barnes_hut' if parameter_set["n_components"] < 4 else 'exact',
+            init=init if init is not None else "random",
+            # Set n_jobs to 1, since we parallelize at a higher level by splitting up model parametrizations amongst
+            # threads.
+            n_jobs=1
+        ).fit_transform(high_dim_data)
+
+    def _get_umap_knn(self, high_dim_data: np.ndarray, parameter_set: dict) -> tuple:
+        """
+        Fetches UMAP's nearest neighbours from affinity cache. Neighbours are computed for the largest configured
+        n_neighbors once and sliced for all parameter sets.
+        :param high_dim_data: Distance matrix.
+        :param parameter_set:
+        :return: Nearest neighbours as expected by UMAP's precomputed_knn; None if no affinity cache is set.
+        """
+
+        if self._affinity_cache is None:
+            return None
+
+        return self._affinity_cache.get_umap_knn(
+            high_dim_data,
+            parameter_set["n_neighbors"],
+            max(next(
+                param_config["values"] for param_config in self.DIM_RED_KERNELS["UMAP"]["parameters"]
+                if param_config["name"] == "n_neighbors"
+            ))
+        )
+
+    @staticmethod
+    def _create_umap(parameter_set: dict, init: str = "random", precomputed_knn: tuple = None) -> umap.UMAP:
+        """
+        Creates UMAP instance for parameter set.
+        :param parameter_set:
+        :param init:
+        :param precomputed_knn: Nearest neighbours (see AffinityCache.get_umap_knn()). Computed by UMAP if not set.
+        :return:
+        """
+
+        # UMAP ignores precomputed neighbours for small datasets unless forced to use its approximate code path.
+        precomputed_knn_kwargs: dict = {} if precomputed_knn is None else {
+            "precomputed_knn": precomputed_knn, "force_approximation_algorithm": True
+        }
+
+        return umap.UMAP(
+            n_components=parameter_set["n_components"],
+            n_neighbors=parameter_set["n_neighbors"],
+            n_epochs=parameter_set["n_epochs"],
+            learning_rate=parameter_set["learning_rate"],
+            min_dist=parameter_set["min_dist"],
+            # Note: Recommended approach to keep spread and min_dist proportional - since original ration of
+            # min_dist:spread is 1:10, we follow this ratio.
+            spread=parameter_set["min_dist"] * 10,
+            local_connectivity=parameter_set["local_connectivity"],
+            # Always set metric to 'precomputed', since distance matrices are calculated previously. If
+            # other metrics are desired, the corresponding preprocessing step has to be extended.
+            metric='precomputed',
+            init=init,
+            **precomputed_knn_kwargs
+        )
+
     @staticmethod
     def generate_parameter_sets_for_testing(data_file_path: str, dim_red_kernel_name: str) -> Tuple[list, int]:
         """
         Generates parameter sets for testing. Intervals and records are hardcoded.
-        Ignores records already in specified file.
+        Ignores records already completed in specified file (see JobLedger).
         :param data_file_path: Path to file holding all records generated so far.
         :param dim_red_kernel_name: Name of dimensionality reduction kernel used for file.
-        :return: List of parameter sets; number of parameter sets in total (including already generated ones).
+        :return: List of parameter sets with model ID as "id"; number of parameter sets in total (including already
+        generated ones).
         """
 
-        parameter_sets: list = []
         parameter_config: dict = DimensionalityReductionKernel.DIM_RED_KERNELS[dim_red_kernel_name]["parameters"]
-        existent_parameter_sets: list = []
+        completed_model_ids: dict = {}
 
         ###############################################
-        # 1. Load already existent parameter sets.
+        # 1. Load hashes of completed parameter sets.
         ###############################################
 
         if os.path.isfile(data_file_path):
-            h5file = open_file(filename=data_file_path, mode="r+")
-            # Note: We don't use the model ID here, since that would never lead to comparison hits.
-            existent_parameter_sets: list = [
-                {
-                    # Parse as UTF-8 string, if parameter is categorical.
-                    param_config["name"]:
-                        row[param_config["name"]] if param_config["type"] is not "categorical"
-                        else str(row[param_config["name"]], "utf-8")
-                    for param_config in parameter_config
-                }
-                for row in h5file.root.metadata
-            ]
+            h5file = open_file(filename=data_file_path, mode="r")
+            completed_model_ids = JobLedger.read_model_ids(h5file, parameter_config)
             # Close file after reading parameter set data.
             h5file.close()
 
@@ -169,25 +362,17 @@ class DimensionalityReductionKernel:
 
         ###############################################
         # 3. Recast paramter combination lists as
-        #    dicts.
+        #    dicts, filter out completed ones.
         ###############################################
 
-        current_id = 0
-        for parameter_combination in parameter_combinations:
-            parameter_set = {
-                parameter_config[i]["name"]: parameter_combination[i]
-                for i in range(0, len(parameter_combination))
-            }
-
-            # Filter out already existing model parametrizations.
-            if parameter_set not in existent_parameter_sets:
-                parameter_set["id"] = current_id
-                parameter_sets.append(parameter_set)
+        parameter_sets: list = [
+            {parameter_config[i]["name"]: parameter_combination[i] for i in range(0, len(parameter_combination))}
+            for parameter_combination in parameter_combinations
+        ]
 
-            # Keep track of number of generated parameter sets.
-            current_id += 1
+        pending_parameter_sets: list = JobLedger.assign_model_ids(parameter_sets, completed_model_ids, parameter_config)
 
-        return parameter_sets, len(parameter_sets) + len(existent_parameter_sets)
+        return pending_parameter_sets, len(pending_parameter_sets) + len(completed_model_ids)
 
     @staticmethod
     def check_kernel_name(parameter: str):
@@ -0,0 +1,259 @@
+import concurrent.futures
+import threading
+import queue
+from multiprocessing import shared_memory
+import psutil
+import numpy as np
+from typing import Tuple
+from data_generation import InputDataset
+from .DimensionalityReductionKernel import DimensionalityReductionKernel
+from .AffinityCache import AffinityCache
+from .DimensionalityReductionThread import DimensionalityReductionThread
+from objectives.distance_preservation_objectives import StressEngine
+
+# State of worker process, set up once per worker by _initialize_worker().
+_worker_state: dict = {}
+
+
+def _initialize_worker(
+        shared_array_descriptors: dict,
+        input_dataset: InputDataset,
+        dim_red_kernel_name: str,
+        max_k: int,
+        affinity_cache: AffinityCache = None
+):
+    """
+    Attaches worker process to shared arrays and sets up state reused for all tasks processed by it.
+    :param shared_array_descriptors: Descriptors of shared arrays as created by
+    DimensionalityReductionProcessPool.share_array().
+    :param input_dataset:
+    :param dim_red_kernel_name:
+    :param max_k:
+    :param affinity_cache: Affinity cache used by worker's DR kernel. Each worker holds its own copy.
+    """
+
+    _worker_state["input_dataset"] = input_dataset
+    _worker_state["dim_red_kernel"] = DimensionalityReductionKernel(dim_red_kernel_name, affinity_cache)
+    _worker_state["max_k"] = max_k
+    # Keep references to shared memory blocks, since arrays are invalidated once blocks are garbage-collected.
+    _worker_state["shared_memory_blocks"] = []
+    _worker_state["arrays"] = {}
+
+    for array_name, descriptor in shared_array_descriptors.items():
+        block, array = DimensionalityReductionProcessPool.attach_array(descriptor)
+        if block is not None:
+            _worker_state["shared_memory_blocks"].append(block)
+        _worker_state["arrays"][array_name] = array
+
+    _worker_state["stress_engine"] = StressEngine(
+        _worker_state["arrays"]["stress_distances"], _worker_state["arrays"].get("stress_pair_indices")
+    ) if "stress_distances" in _worker_state["arrays"] else None
+
+
+def _evaluate_parameter_sets(parameter_sets: list) -> list:
+    """
+    Evaluates group of parameter sets in worker process. Groups with more than one parameter set are computed
+    together, see DimensionalityReductionThread.evaluate_parameter_set_group().
+    :param parameter_sets:
+    :return: List of results as returned by DimensionalityReductionThread.evaluate_parameter_set().
+    """
+
+    arrays: dict = _worker_state["arrays"]
+
+    return DimensionalityReductionThread.evaluate_parameter_set_group(
+        dim_red_kernel=_worker_state["dim_red_kernel"],
+        parameter_sets=parameter_sets,
+        distance_matrix=arrays["distance_matrix"],
+        input_dataset=_worker_state["input_dataset"],
+        high_dimensional_neighbourhood_ranking=arrays.get("high_dimensional_neighbourhood_ranking"),
+        high_dimensional_neighbours=arrays.get("high_dimensional_neighbours"),
+        max_k=_worker_state["max_k"],
+        stress_engine=_worker_state["stress_engine"]
+    )
+
+
+class DimensionalityReductionProcessPool:
+    """
+    Pool of worker processes executing DR method of choice on a specific dataset with a set of parametrizations.
+    Parameter sets are scheduled dynamically, one per task, so that workers finishing early pick up remaining sets.
+    Parameter sets that can be computed together (see DimensionalityReductionKernel.group_parameter_sets()) are
+    scheduled as one task instead, e. g. SVD with different numbers of components or - with warm starts - t-SNE/UMAP
+    with different numbers of iterations.
+    Results are put into a queue consumed by PersistenceThread.
+    High-dimensional distance matrix and neighbourhood data are memory-mapped from their .npy files or placed in shared
+    memory once instead of being copied into every worker.
+    """
+
+    def __init__(
+            self,
+            results: queue.Queue,
+            distance_matrix: np.ndarray,
+            parameter_sets: list,
+            input_dataset: InputDataset,
+            high_dimensional_neighbourhood_ranking: np.ndarray,
+            dim_red_kernel_name: str,
+            high_dimensional_neighbours: np.ndarray = None,
+            max_k: int = None,
+            n_jobs: int = None,
+            stress_engine: StressEngine = None,
+            warm_start: bool = False,
+            affinity_cache: AffinityCache = None,
+            results_consumer: threading.Thread = None
+    ):
+        """
+        Initializes process pool. See DimensionalityReductionThread for a description of parameters.
+        :param results: Queue results are put into as they arrive. If bounded, workers pause while it's full.
+        :param distance_matrix:
+        :param parameter_sets:
+        :param input_dataset:
+        :param high_dimensional_neighbourhood_ranking:
+        :param dim_red_kernel_name:
+        :param high_dimensional_neighbours:
+        :param max_k:
+        :param n_jobs: Number of worker processes. Defaults to number of logical CPUs.
+        :param stress_engine: Engine for Kruskal's stress. Its arrays are shared with and wrapped in a new engine by
+        each worker. Stress is computed without engine if not supplied.
+        :param warm_start: Whether to compute t-SNE/UMAP parameter sets differing only in their number of iterations as
+        checkpoints of one optimization.
+        :param affinity_cache: Empty affinity cache to be copied to each worker (see AffinityCache). Entries spilled to
+        disk are shared by workers.
+        :param results_consumer: Thread consuming results queue. If set, run() fails instead of waiting forever for
+        space in a full results queue once this thread has terminated.
+        """
+
+        self._results: queue.Queue = results
+        self._distance_matrix: np.ndarray = distance_matrix
+        self._parameter_sets: list = parameter_sets
+        self._input_dataset: InputDataset = input_dataset
+        self._high_dimensional_neighbourhood_ranking: np.ndarray = high_dimensional_neighbourhood_ranking
+        self._dim_red_kernel_name: str = dim_red_kernel_name
+        self._high_dimensional_neighbours: np.ndarray = high_dimensional_neighbours
+        self._max_k: int = max_k
+        self._n_jobs: int = n_jobs if n_jobs is not None else psutil.cpu_count(logical=True)
+        self._stress_engine: StressEngine = stress_engine
+        self._warm_start: bool = warm_start
+        self._affinity_cache: AffinityCache = affinity_cache
+        self._results_consumer: threading.Thread = results_consumer
+
+    def run(self):
+        """
+        Calculates and evaluates models for all parameter sets. Blocks until all results have been put into the results
+        queue. Exceptions raised while evaluating parameter sets are re-raised, the death of a worker process raises
+        concurrent.futures.process.BrokenProcessPool.
+        """
+
+        shared_memory_blocks: list = []
+        shared_array_descriptors: dict = {}
+
+        try:
+            for array_name, array in (
+                ("distance_matrix", self._distance_matrix),
+                ("high_dimensional_neighbourhood_ranking", self._high_dimensional_neighbourhood_ranking),
+                ("high_dimensional_neighbours", self._high_dimensional_neighbours),
+                ("stress_distances", self._stress_engine.high_dimensional_distances if self._stress_engine else None),
+                ("stress_pair_indices", self._stress_engine.pair_indices if self._stress_engine else None)
+            ):
+                if array is not None:
+                    block, shared_array_descriptors[array_name] = DimensionalityReductionProcessPool.share_array(array)
+                    if block is not None:
+                        shared_memory_blocks.append(block)
+
+            # Unlike multiprocessing.Pool, the executor fails all pending tasks with BrokenProcessPool if a worker
+            # process dies (e. g. killed for running out of memory) instead of silently replacing it.
+            executor: concurrent.futures.ProcessPoolExecutor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self._n_jobs,
+                initializer=_initialize_worker,
+                initargs=(
+                    shared_array_descriptors,
+                    self._input_dataset,
+                    self._dim_red_kernel_name,
+                    self._max_k,
+                    self._affinity_cache
+                )
+            )
+            # Limit number of tasks submitted but not yet handed over to results queue, so that no new tasks are
+            # started while the results queue is full.
+            pending_tasks: set = set()
+
+            try:
+                for parameter_set_group in DimensionalityReductionKernel.group_parameter_sets(
+                    self._parameter_sets, self._dim_red_kernel_name, self._warm_start
+                ):
+                    while len(pending_tasks) >= 2 * self._n_jobs:
+                        self._hand_over_completed_tasks(pending_tasks)
+                    pending_tasks.add(executor.submit(_evaluate_parameter_sets, parameter_set_group))
+
+                while pending_tasks:
+                    self._hand_over_completed_tasks(pending_tasks)
+
+            finally:
+                # Don't start remaining tasks if a task failed. Tasks already running are waited for.
+                for task in pending_tasks:
+                    task.cancel()
+                executor.shutdown(wait=True)
+
+        finally:
+            for block in shared_memory_blocks:
+                block.close()
+                block.unlink()
+
+    def _hand_over_completed_tasks(self, pending_tasks: set):
+        """
+        Waits for at least one pending task to complete and puts results of completed tasks into results queue.
+        Completed tasks are removed from pending_tasks.
+        :param pending_tasks: Futures of submitted tasks not handed over yet.
+        """
+
+        completed_tasks, _ = concurrent.futures.wait(pending_tasks, return_when=concurrent.futures.FIRST_COMPLETED)
+        for task in completed_tasks:
+            pending_tasks.remove(task)
+            # Re-raises exception raised by task or BrokenProcessPool if a worker process died.
+            self._hand_over_results(task.result())
+
+    def _hand_over_results(self, results: list):
+        """
+        Puts results of task into results queue. Waits while the queue is full, unless its consumer has terminated.
+        :param results: List of results returned by task.
+        """
+
+        for result in results:
+            while True:
+                try:
+                    self._results.put(result, timeout=1)
+                    break
+                except queue.Full:
+                    if self._results_consumer is not None and not self._results_consumer.is_alive():
+                        raise RuntimeError("Consumer of results terminated before all results were handed over.")
+
+    @staticmethod
+    def share_array(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, dict]:
+        """
+        Shares array with worker processes. Arrays memory-mapped from .npy files (see Utils.persist_array()) are mapped
+        by workers directly, all other arrays are copied into a new shared memory block.
+        :param array:
+        :return: Shared memory block (to be closed and unlinked by caller; None for memory-mapped arrays), descriptor
+        for attaching to array.
+        """
+
+        if isinstance(array, np.memmap) and array.filename is not None and array.filename.endswith(".npy"):
+            return None, {"file_path": array.filename}
+
+        block: shared_memory.SharedMemory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+
+        return block, {"name": block.name, "shape": array.shape, "dtype": array.dtype.str}
+
+    @staticmethod
+    def attach_array(descriptor: dict) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+        """
+        Attaches to array shared with share_array().
+        :param descriptor:
+        :return: Shared memory block (to be kept alive while array is used; None for memory-mapped arrays), array.
+        """
+
+        if "file_path" in descriptor:
+            return None, np.load(descriptor["file_path"], mmap_mode="r")
+
+        block: shared_memory.SharedMemory = shared_memory.SharedMemory(name=descriptor["name"])
+
+        return block, np.ndarray(descriptor["shape"], dtype=np.dtype(descriptor["dtype"]), buffer=block.buf)
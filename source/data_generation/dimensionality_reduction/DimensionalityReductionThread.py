@@ -4,6 +4,7 @@ import numpy as np
 from data_generation import InputDataset
 from objectives.topology_preservation_objectives import *
 from objectives.distance_preservation_objectives import *
+from objectives import ObjectivePipeline, EmbeddingIntermediates
 from .DimensionalityReductionKernel import DimensionalityReductionKernel
 
 
@@ -19,7 +20,10 @@ class DimensionalityReductionThread(threading.Thread):
             parameter_sets: list,
             input_dataset: InputDataset,
             high_dimensional_neighbourhood_ranking: np.ndarray,
-            dim_red_kernel_name: str
+            dim_red_kernel_name: str,
+            high_dimensional_neighbours: np.ndarray = None,
+            max_k: int = None,
+            stress_engine: StressEngine = None
     ):
         """
         Initializes thread instance that will calculate the low-dimensional representation of the specified distance
@@ -31,6 +35,11 @@ class DimensionalityReductionThread(threading.Thread):
         :param high_dimensional_neighbourhood_ranking: Neighbourhood rankings in original high-dimensional space. Dict.
         with one entry per distance metric.
         :param dim_red_kernel_name: Name of dimensionality reduction algorithm to apply.
+        :param high_dimensional_neighbours: Indices of nearest neighbours in original high-dimensional space. Used
+        instead of high_dimensional_neighbourhood_ranking if max_k is set.
+        :param max_k: If set, topology-based objectives only consider neighbourhoods up to this size. See
+        CorankingMatrix.
+        :param stress_engine: Engine with precomputed high-dimensional distances for Kruskal's stress. Optional.
         """
         threading.Thread.__init__(self)
 
@@ -39,6 +48,9 @@ class DimensionalityReductionThread(threading.Thread):
         self._results: list = results
         self._input_dataset: InputDataset = input_dataset
         self._high_dimensional_neighbourhood_ranking: np.ndarray = high_dimensional_neighbourhood_ranking
+        self._high_dimensional_neighbours: np.ndarray = high_dimensional_neighbours
+        self._max_k: int = max_k
+        self._stress_engine: StressEngine = stress_engine
         self._dim_red_kernel: DimensionalityReductionKernel = DimensionalityReductionKernel(dim_red_kernel_name)
 
     def run(self):
@@ -47,96 +59,161 @@ class DimensionalityReductionThread(threading.Thread):
         :return: List of 2D ndarrays containing coordinates of instances in low-dimensional space.
         """
 
+        for parameter_set in self._parameter_sets:
+            # Store parameter set, objective set, low dimensional projection and pointwise quality criterion values in
+            # globally shared object.
+            self._results.append(
+                DimensionalityReductionThread.evaluate_parameter_set(
+                    dim_red_kernel=self._dim_red_kernel,
+                    parameter_set=parameter_set,
+                    distance_matrix=self._distance_matrix,
+                    input_dataset=self._input_dataset,
+                    high_dimensional_neighbourhood_ranking=self._high_dimensional_neighbourhood_ranking,
+                    high_dimensional_neighbours=self._high_dimensional_neighbours,
+                    max_k=self._max_k,
+                    stress_engine=self._stress_engine
+                )
+            )
+
+    @staticmethod
+    def evaluate_parameter_set(
+            dim_red_kernel: DimensionalityReductionKernel,
+            parameter_set: dict,
+            distance_matrix: np.ndarray,
+            input_dataset: InputDataset,
+            high_dimensional_neighbourhood_ranking: np.ndarray,
+            high_dimensional_neighbours: np.ndarray = None,
+            max_k: int = None,
+            stress_engine: StressEngine = None,
+            objective_pipeline: ObjectivePipeline = None
+    ) -> dict:
+        """
+        Calculates embedding for one parameter set and evaluates all objectives on it.
+        :param dim_red_kernel: DR kernel to apply.
+        :param parameter_set:
+        :param distance_matrix:
+        :param input_dataset:
+        :param high_dimensional_neighbourhood_ranking:
+        :param high_dimensional_neighbours:
+        :param max_k:
+        :param stress_engine:
+        :param objective_pipeline: Pipeline evaluating objectives. Defaults to pipeline with all registered objectives.
+        :return: Dictionary with parameter set, objectives, runtime per objective and intermediate and low-dimensional
+        projection.
+        """
+
         ###################################################
         # 1. Calculate embedding for each distance metric.
         ###################################################
 
-        for parameter_set in self._parameter_sets:
-            # Calculate t-SNE. Supress output while doing so.
-            start: float = time.time()
-            low_dimensional_projection: np.ndarry = self._dim_red_kernel.run(
-                high_dim_data=self._distance_matrix,
-                parameter_set=parameter_set
-            )
-
-            ###################################################
-            # 2. Calculate objectives.
-            ###################################################
+        # Calculate t-SNE. Supress output while doing so.
+        start: float = time.time()
+        low_dimensional_projection: np.ndarry = dim_red_kernel.run(
+            high_dim_data=distance_matrix,
+            parameter_set=parameter_set
+        )
 
-            # Start measuring runtime.
-            runtime: float = time.time() - start
+        ###################################################
+        # 2. Calculate objectives.
+        ###################################################
 
-            ############################################
-            # 2. a. Topology-based metrics.
-            ############################################
+        return DimensionalityReductionThread.evaluate_embedding(
+            parameter_set=parameter_set,
+            low_dimensional_projection=low_dimensional_projection,
+            runtime=time.time() - start,
+            distance_matrix=distance_matrix,
+            input_dataset=input_dataset,
+            high_dimensional_neighbourhood_ranking=high_dimensional_neighbourhood_ranking,
+            high_dimensional_neighbours=high_dimensional_neighbours,
+            max_k=max_k,
+            stress_engine=stress_engine,
+            objective_pipeline=objective_pipeline
+        )
+
+    @staticmethod
+    def evaluate_parameter_set_group(
+            dim_red_kernel: DimensionalityReductionKernel,
+            parameter_sets: list,
+            distance_matrix: np.ndarray,
+            input_dataset: InputDataset,
+            high_dimensional_neighbourhood_ranking: np.ndarray,
+            high_dimensional_neighbours: np.ndarray = None,
+            max_k: int = None,
+            stress_engine: StressEngine = None,
+            objective_pipeline: ObjectivePipeline = None
+    ) -> list:
+        """
+        Calculates embeddings for a group of parameter sets differing only in the kernel's group parameter together (see
+        DimensionalityReductionKernel.run_group()) and evaluates all objectives on each of them.
+        See evaluate_parameter_set() for a description of parameters.
+        :return: List of results as returned by evaluate_parameter_set(), in order of parameter_sets.
+        """
 
-            # Create coranking matrix for topology-based objectives.
-            coranking_matrix: CorankingMatrix = CorankingMatrix(
-                low_dimensional_data=low_dimensional_projection,
-                high_dimensional_neighbourhood_ranking=self._high_dimensional_neighbourhood_ranking
+        return [
+            DimensionalityReductionThread.evaluate_embedding(
+                parameter_set=parameter_set,
+                low_dimensional_projection=low_dimensional_projection,
+                runtime=runtime,
+                distance_matrix=distance_matrix,
+                input_dataset=input_dataset,
+                high_dimensional_neighbourhood_ranking=high_dimensional_neighbourhood_ranking,
+                high_dimensional_neighbours=high_dimensional_neighbours,
+                max_k=max_k,
+                stress_engine=stress_engine,
+                objective_pipeline=objective_pipeline
             )
-
-            r_nx: float = CorankingMatrixQualityCriterion(
-                low_dimensional_data=low_dimensional_projection,
-                coranking_matrix=coranking_matrix
-            ).compute()
-
-            b_nx: float = CorankingMatrixBehaviourCriterion(
-                low_dimensional_data=low_dimensional_projection,
-                coranking_matrix=coranking_matrix
-            ).compute()
-
-            # Pointwise Q_nx -> q_nx.
-            q_nx_i: np.ndarray = PointwiseCorankingMatrixQualityCriterion(
-                low_dimensional_data=low_dimensional_projection,
-                coranking_matrix=coranking_matrix
-            ).compute()
-
-            ############################################
-            # 2. b. Distance-based metrics.
-            ############################################
-
-            stress: float = Stress(
-                high_dimensional_data=self._distance_matrix,
-                low_dimensional_data=low_dimensional_projection,
-                use_geodesic_distances=False
-            ).compute()
-
-            ############################################
-            # 2. c. Information-preserving metrics.
-            ############################################
-
-            rtdp: float = self._input_dataset.compute_relative_target_domain_performance(
-                features=low_dimensional_projection
+            for parameter_set, (low_dimensional_projection, runtime) in zip(
+                parameter_sets, dim_red_kernel.run_group(distance_matrix, parameter_sets)
             )
+        ]
+
+    @staticmethod
+    def evaluate_embedding(
+            parameter_set: dict,
+            low_dimensional_projection: np.ndarray,
+            runtime: float,
+            distance_matrix: np.ndarray,
+            input_dataset: InputDataset,
+            high_dimensional_neighbourhood_ranking: np.ndarray,
+            high_dimensional_neighbours: np.ndarray = None,
+            max_k: int = None,
+            stress_engine: StressEngine = None,
+            objective_pipeline: ObjectivePipeline = None
+    ) -> dict:
+        """
+        Evaluates all objectives on embedding. See evaluate_parameter_set() for a description of parameters.
+        :param parameter_set:
+        :param low_dimensional_projection:
+        :param runtime: Time in seconds needed to compute embedding.
+        :return: Result as returned by evaluate_parameter_set().
+        """
 
-            ############################################
-            # 2. d. Separability metrics.
-            ############################################
+        # Evaluate all registered objectives (R_nx, B_nx, q_nx, stress, RTDP, separability) with shared intermediates.
+        # Time spent on each objective and each intermediate (co-ranking matrix, ...) is recorded separately.
+        intermediates: EmbeddingIntermediates = EmbeddingIntermediates(
+            low_dimensional_data=low_dimensional_projection,
+            high_dimensional_distance_matrix=distance_matrix,
+            high_dimensional_neighbourhood_ranking=high_dimensional_neighbourhood_ranking,
+            high_dimensional_neighbours=high_dimensional_neighbours,
+            max_k=max_k,
+            stress_engine=stress_engine,
+            input_dataset=input_dataset
+        )
+        objective_values, objective_runtimes = (
+            objective_pipeline if objective_pipeline is not None else ObjectivePipeline()
+        ).evaluate(intermediates)
 
-            separability_metric: float = self._input_dataset.compute_separability_metric(
-                features=low_dimensional_projection
-            )
+        ###################################################
+        # 3. Collect data, terminate.
+        ###################################################
 
-            ###################################################
-            # 3. Collect data, terminate.
-            ###################################################
-
-            # Append runtime to set of objectives.
-            objectives: dict = {
-                "runtime": runtime,
-                "r_nx": r_nx,
-                "b_nx": b_nx,
-                "stress": stress,
-                "target_domain_performance": rtdp,
-                "separability_metric": separability_metric,
-                "pointwise_quality_values": q_nx_i
-            }
+        # Append runtime to set of objectives.
+        objectives: dict = {"runtime": runtime, **objective_values}
 
-            # Store parameter set, objective set, low dimensional projection and pointwise quality criterion values in
-            # globally shared object.
-            self._results.append({
-                "parameter_set": parameter_set,
-                "objectives": objectives,
-                "low_dimensional_projection": low_dimensional_projection
-            })
+        return {
+            "parameter_set": parameter_set,
+            "objectives": objectives,
+            "objective_runtimes": objective_runtimes,
+            "intermediate_runtimes": intermediates.runtimes,
+            "low_dimensional_projection": low_dimensional_projection
+        }
@@ -1,3 +1,5 @@
+from .AffinityCache import AffinityCache
 from .DimensionalityReductionKernel import DimensionalityReductionKernel
 from .DimensionalityReductionThread import DimensionalityReductionThread
+from .DimensionalityReductionProcessPool import DimensionalityReductionProcessPool
 import data_generation.dimensionality_reduction.hdf5_descriptions
@@ -7,8 +7,8 @@ class DRDescription(IsDescription):
     Objectives are defined here, all hyperparameters in subclasses.
     """
 
-    id = Int16Col(pos=1)
-    num_records = Int16Col(pos=2)
+    id = Int32Col(pos=1)
+    num_records = Int32Col(pos=2)
 
     # Objectives for faithfulness of dimensionality-reduced projection.
     # Same for every DR method.
@@ -18,3 +18,15 @@ class DRDescription(IsDescription):
     target_domain_performance = Float32Col(pos=6)
     separability_metric = Float32Col(pos=7)
     runtime = Float32Col(pos=8)
+
+    # Time needed to compute each intermediate and to evaluate each objective on top of them (see ObjectivePipeline).
+    runtime_low_dimensional_distances = Float32Col()
+    runtime_low_dimensional_ranking = Float32Col()
+    runtime_low_dimensional_neighbours = Float32Col()
+    runtime_coranking_matrix = Float32Col()
+    runtime_r_nx = Float32Col()
+    runtime_b_nx = Float32Col()
+    runtime_pointwise_quality_values = Float32Col()
+    runtime_stress = Float32Col()
+    runtime_target_domain_performance = Float32Col()
+    runtime_separability_metric = Float32Col()
@@ -0,0 +1,10 @@
+from tables import *
+
+
+class JobLedgerDescription(IsDescription):
+    """
+    Class used as representation for recording completed models in .h5 files. See JobLedger.
+    """
+
+    parameter_hash = StringCol(40, pos=1)
+    id = Int32Col(pos=2)
@@ -0,0 +1,11 @@
+from tables import *
+
+
+class ModelIndexDescription(IsDescription):
+    """
+    Class used as representation for mapping model IDs to rows of consolidated arrays in .h5 files (storage format v2).
+    """
+
+    id = Int32Col(pos=1)
+    row = Int32Col(pos=2)
+    num_dimensions = Int8Col(pos=3)
@@ -0,0 +1,13 @@
+from tables import *
+
+
+class PointwiseQualityHistogramDescription(IsDescription):
+    """
+    Class used as representation for histograms of models' pointwise quality values in .h5 files, with one row per
+    model, number of bins and bin. See EmbeddingFile.
+    """
+
+    id = Int32Col(pos=1)
+    nbins = UInt16Col(pos=2)
+    bin = UInt16Col(pos=3)
+    count = UInt32Col(pos=4)
@@ -1,3 +1,6 @@
 from .TSNEDescription import TSNEDescription
 from .SVDDescription import SVDDescription
 from .UMAPDescription import UMAPDescription
+from .ModelIndexDescription import ModelIndexDescription
+from .JobLedgerDescription import JobLedgerDescription
+from .PointwiseQualityHistogramDescription import PointwiseQualityHistogramDescription
@@ -1,34 +1,56 @@
 from random import shuffle
+import queue
 import psutil
-import pickle
 import numpy as np
 import logging
-import sys
+import argparse
 import numba
 
 from data_generation.explanations_generation import compute_and_persist_explainer_values
 from objectives.topology_preservation_objectives.CorankingMatrix import CorankingMatrix
+from objectives.topology_preservation_objectives.NeighbourhoodGraph import NeighbourhoodGraph
+from objectives.distance_preservation_objectives.StressEngine import StressEngine
 from data_generation.PersistenceThread import PersistenceThread
+from data_generation.EmbeddingFile import EmbeddingFile
 from data_generation.datasets import *
+from data_generation.datasets.TargetDomainPerformanceEvaluator import TargetDomainPerformanceEvaluator
 from data_generation.dimensionality_reduction import DimensionalityReductionKernel
-from data_generation.dimensionality_reduction.DimensionalityReductionThread import DimensionalityReductionThread
+from data_generation.dimensionality_reduction.AdaptiveParameterSearch import AdaptiveParameterSearch
+from data_generation.dimensionality_reduction.AffinityCache import AffinityCache
+from data_generation.dimensionality_reduction.DimensionalityReductionProcessPool import DimensionalityReductionProcessPool
 from utils import Utils
 
 
-def generate_instance(instance_dataset_name: str, storage_path: str) -> InputDataset:
+def generate_instance(
+        instance_dataset_name: str,
+        storage_path: str,
+        target_domain_performance_regressor: str = "knn",
+        target_domain_performance_n_jobs: int = 1
+) -> InputDataset:
     """
     Generates and returns dataset instance of specified type.
     :param instance_dataset_name:
     :param storage_path: Path to folder holding files.
+    :param target_domain_performance_regressor: Regressor used for measuring target domain performance.
+    :param target_domain_performance_n_jobs: Number of threads evaluating train/test splits for target domain
+    performance in parallel.
     :return:
     """
 
     assert instance_dataset_name in ("movie", "happiness"), 'Dataset ' + instance_dataset_name + ' not supported.'
 
     if instance_dataset_name == "happiness":
-        return HappinessDataset(storage_path=storage_path)
+        return HappinessDataset(
+            storage_path=storage_path,
+            target_domain_performance_regressor=target_domain_performance_regressor,
+            target_domain_performance_n_jobs=target_domain_performance_n_jobs
+        )
     elif instance_dataset_name == "movie":
-        return MovieDataset(storage_path=storage_path)
+        return MovieDataset(
+            storage_path=storage_path,
+            target_domain_performance_regressor=target_domain_performance_regressor,
+            target_domain_performance_n_jobs=target_domain_performance_n_jobs
+        )
 
 
 if __name__ == '__main__':
@@ -39,20 +61,87 @@ if __name__ == '__main__':
     # 1. Generate parameter sets, store in file.
     ######################################################
 
-    assert len(sys.argv) == 4, "Arguments to be specified: (1) Dataset name, (2) DR kernel name, (3) path to data folder."
+    argument_parser: argparse.ArgumentParser = argparse.ArgumentParser()
+    argument_parser.add_argument("dataset_name", help="Dataset name.")
+    argument_parser.add_argument("dim_red_kernel_name", help="DR kernel name.")
+    argument_parser.add_argument("data_path", help="Path to data folder.")
+    argument_parser.add_argument(
+        "max_k", type=int, nargs="?", default=None,
+        help="Maximal neighbourhood size for topology-based objectives. If set, only neighbourhoods up to this size are "
+             "evaluated, which avoids ranking all pairs of records."
+    )
+    argument_parser.add_argument(
+        "neighbourhood_graph_method", nargs="?", default="balltree", choices=NeighbourhoodGraph.METHODS,
+        help="Method for building the neighbourhood graph if max_k is set."
+    )
+    argument_parser.add_argument(
+        "--compression", default="blosc:lz4:5",
+        help="Compression of embedding arrays as complib[:complevel], e. g. zlib:3, blosc:lz4:5 or blosc:zstd:3."
+    )
+    argument_parser.add_argument(
+        "--stress_pair_budget", type=int, default=StressEngine.DEFAULT_PAIR_BUDGET,
+        help="Number of sampled pairs stress is estimated on for datasets with more than " +
+             str(StressEngine.MAX_EXACT_RECORDS) + " records."
+    )
+    argument_parser.add_argument(
+        "--tdp_regressor", default="knn", choices=TargetDomainPerformanceEvaluator.REGRESSORS,
+        help="Regressor used for measuring target domain performance."
+    )
+    argument_parser.add_argument(
+        "--tdp_n_jobs", type=int, default=1,
+        help="Number of threads each worker process evaluates train/test splits for target domain performance with. "
+             "Workers already run on all logical CPUs, so values above 1 only pay off if fewer models than CPUs are "
+             "generated at a time (e. g. small adaptive search rounds)."
+    )
+    argument_parser.add_argument(
+        "--search", default="grid", choices=("grid", "adaptive"),
+        help="Generate models for all parameter sets in the kernel's grid or search parameters adaptively (see "
+             "AdaptiveParameterSearch)."
+    )
+    argument_parser.add_argument(
+        "--budget", type=int, default=None,
+        help="Number of models to generate with adaptive search. Defaults to the size of the kernel's grid."
+    )
+    argument_parser.add_argument(
+        "--round_size", type=int, default=None,
+        help="Number of models generated per round of adaptive search. Defaults to four per worker process."
+    )
+    argument_parser.add_argument(
+        "--warm_start", action="store_true",
+        help="Compute t-SNE/UMAP models differing only in their number of iterations as checkpoints of one "
+             "optimization instead of from scratch. Faster, but checkpoints only approximate models trained from "
+             "scratch."
+    )
+    argument_parser.add_argument(
+        "--affinity_cache_size", type=int, default=256,
+        help="Size of in-memory cache for affinity inputs (UMAP's nearest neighbours) per worker process in MB. "
+             "Evicted entries are spilled to disk. 0 disables the cache."
+    )
+    args: argparse.Namespace = argument_parser.parse_args()
 
     # Define name of dataset to use (appended to file name).
-    dataset_name: str = sys.argv[1]
+    dataset_name: str = args.dataset_name
     # Define DR method to use.
-    dim_red_kernel_name: str = sys.argv[2]
+    dim_red_kernel_name: str = args.dim_red_kernel_name
     # Get storage path.
-    storage_path: str = sys.argv[3] + "/" + dataset_name
+    storage_path: str = args.data_path + "/" + dataset_name
+    # Get maximal neighbourhood size.
+    max_k: int = args.max_k
+    # Get method for building neighbourhood graph, if neighbourhoods are truncated.
+    neighbourhood_graph_method: str = args.neighbourhood_graph_method
+
+    data_file_path: str = storage_path + "/embedding_" + dim_red_kernel_name.lower() + ".h5"
 
-    # Get all parameter configurations (to avoid duplicate model generations).
+    # Get all parameter configurations (to avoid duplicate model generations). With adaptive search, parameter sets are
+    # proposed in rounds instead.
     parameter_sets, num_param_sets = DimensionalityReductionKernel.generate_parameter_sets_for_testing(
-        data_file_path=storage_path + "/embedding_" + dim_red_kernel_name.lower() + ".h5",
+        data_file_path=data_file_path,
         dim_red_kernel_name=dim_red_kernel_name
     )
+    adaptive_parameter_search: AdaptiveParameterSearch = None
+    if args.search == "adaptive":
+        adaptive_parameter_search = AdaptiveParameterSearch(dim_red_kernel_name, data_file_path)
+        num_models_to_generate: int = args.budget if args.budget is not None else num_param_sets
 
     ######################################################
     # 2. Load high-dimensional data.
@@ -61,7 +150,12 @@ if __name__ == '__main__':
     logger.info("Creating dataset.")
 
     # Load dataset.
-    high_dim_dataset: InputDataset = generate_instance(instance_dataset_name=dataset_name, storage_path=storage_path)
+    high_dim_dataset: InputDataset = generate_instance(
+        instance_dataset_name=dataset_name,
+        storage_path=storage_path,
+        target_domain_performance_regressor=args.tdp_regressor,
+        target_domain_performance_n_jobs=args.tdp_n_jobs
+    )
 
     # Persist dataset's records as representation in frontend.
     high_dim_dataset.persist_records()
@@ -75,76 +169,134 @@ if __name__ == '__main__':
     distance_metric: str = "euclidean"
     distance_matrix: np.ndarray = high_dim_dataset.compute_distance_matrix()
 
-    # Generate neighbourhood ranking for high dimensional data w.r.t. all used distance metrics.
-    logger.info("Generating neighbourhood rankings.")
-    high_dim_neighbourhood_ranking: np.ndarray = CorankingMatrix.generate_neighbourhood_ranking(
-        distance_matrix=distance_matrix
-    )
+    high_dim_neighbourhood_ranking: np.ndarray = None
+    high_dim_neighbours: np.ndarray = None
+    if max_k is None:
+        # Generate neighbourhood ranking for high dimensional data w.r.t. all used distance metrics.
+        logger.info("Generating neighbourhood rankings.")
+        high_dim_neighbourhood_ranking = CorankingMatrix.generate_neighbourhood_ranking(
+            distance_matrix=distance_matrix
+        )
+        # Store ranking as memory-mappable .npy file, so that worker processes and frontend share it without copies.
+        high_dim_neighbourhood_ranking = Utils.persist_array(
+            storage_path + "/neighbourhood_ranking.npy", high_dim_neighbourhood_ranking
+        )
+
+    else:
+        # Load neighbourhood graph stored with dataset, if it was built from the same data with a compatible method and
+        # covers max_k neighbours. Build and store it otherwise.
+        logger.info("Loading or generating neighbourhood graph with max_k = " + str(max_k) + ".")
+        neighbourhood_graph: NeighbourhoodGraph = NeighbourhoodGraph.load_or_build(
+            file_path=storage_path + "/neighbourhood_graph.npz",
+            max_k=max_k,
+            method=neighbourhood_graph_method,
+            # Ties graph to this version of the dataset.
+            fingerprint=NeighbourhoodGraph.compute_fingerprint(distance_matrix),
+            build=lambda: high_dim_dataset.compute_neighbourhood_graph(
+                max_k=max_k, method=neighbourhood_graph_method, distance_matrix=distance_matrix
+            )
+        )
+        high_dim_neighbours = neighbourhood_graph.neighbours(max_k)
+
+    # Store high-dimensional distance matrix as memory-mappable .npy file. Single precision halves its footprint; it's
+    # only downcast after neighbourhoods have been determined with full precision.
+    distance_matrix = Utils.persist_array(storage_path + "/distance_matrix.npy", distance_matrix, np.float32)
 
-    # Store high-dimensional distances matrices and neighbourhood rankings.
-    with open(storage_path + "/" + "distance_matrix.pkl", "wb") as file:
-        pickle.dump(distance_matrix, file)
-    with open(storage_path + "/" + "neighbourhood_ranking.pkl", "wb") as file:
-        pickle.dump(high_dim_neighbourhood_ranking, file)
+    # Gather high-dimensional distances used for Kruskal's stress once instead of for every model. For large datasets,
+    # stress is estimated on a sample of pairs.
+    logger.info("Gathering high-dimensional distances for stress.")
+    stress_engine: StressEngine = StressEngine.from_distance_matrix(
+        distance_matrix,
+        pair_budget=args.stress_pair_budget if len(distance_matrix) > StressEngine.MAX_EXACT_RECORDS else None
+    )
+    stress_engine = StressEngine(
+        Utils.persist_array(storage_path + "/stress_distances.npy", stress_engine.high_dimensional_distances),
+        Utils.persist_array(storage_path + "/stress_pair_indices.npy", stress_engine.pair_indices)
+        if stress_engine.is_subsampled else None
+    )
 
     ######################################################
-    # 4. Set up multithreading.
+    # 4. Set up multiprocessing.
     ######################################################
 
     # Adjust threading layer if UMAP is used to avoid multiprocessing deadlock.
     if dim_red_kernel_name == "UMAP":
         numba.config.THREADING_LAYER = 'tbb'
 
-    # Shuffle list with parameter sets so that they are kinda evenly distributed.
-    shuffle(parameter_sets)
     # Determine number of workers.
     n_jobs: int = psutil.cpu_count(logical=True)
-    threads: list = []
-    # Shared list holding results.
-    results: list = []
-
-    # Split parameter sets amongst workers.
-    logger.info("Generating dimensionality reduction models with " + str(n_jobs) + " threads.")
-    num_parameter_sets: int = int(len(parameter_sets) / n_jobs)
-
-    for i in range(0, n_jobs):
-        first_index: int = num_parameter_sets * i
-        # Add normal number of parameter sets, if this isn't the last job. Otherwise add all remaining sets.
-        last_index: int = first_index + num_parameter_sets if i < (n_jobs - 1) else len(parameter_sets)
-
-        # Instantiate thread.
-        threads.append(
-            DimensionalityReductionThread(
-                results=results,
-                distance_matrix=distance_matrix,
-                parameter_sets=parameter_sets[first_index:last_index],
-                input_dataset=high_dim_dataset,
-                high_dimensional_neighbourhood_ranking=high_dim_neighbourhood_ranking,
-                dim_red_kernel_name=dim_red_kernel_name
+    round_size: int = args.round_size if args.round_size is not None else 4 * n_jobs
+
+    ######################################################
+    # 5. Calculate low-dim. represenatations.
+    ######################################################
+
+    # Grid search generates all models in one round. Adaptive search proposes parameter sets based on all models
+    # generated in previous rounds.
+    num_models_generated: int = 0
+    while True:
+        if adaptive_parameter_search is not None:
+            if num_models_generated >= num_models_to_generate:
+                break
+            parameter_sets, num_param_sets = adaptive_parameter_search.propose(
+                min(round_size, num_models_to_generate - num_models_generated)
             )
-        )
+            if not len(parameter_sets):
+                break
+
+        # Shuffle list with parameter sets so that they are kinda evenly distributed.
+        shuffle(parameter_sets)
+        # Shared queue holding results. Bounded, so that workers pause if results can't be written fast enough.
+        results: queue.Queue = queue.Queue(maxsize=2 * n_jobs)
 
-    # Create thread ensuring persistence of results.
-    threads.append(
-        PersistenceThread(
+        # Create thread ensuring persistence of results.
+        persistence_thread: PersistenceThread = PersistenceThread(
             results=results,
             expected_number_of_results=len(parameter_sets),
             total_number_of_results=num_param_sets,
             dataset_name=dataset_name,
             dim_red_kernel_name=dim_red_kernel_name,
-            checking_interval=10,
-            storage_path=storage_path
+            storage_path=storage_path,
+            batch_size=n_jobs,
+            filters=EmbeddingFile.parse_filters(args.compression),
+            max_k=max_k
         )
-    )
 
-    ######################################################
-    # 5. Calculate low-dim. represenatations.
-    ######################################################
+        # Parameter sets are distributed dynamically amongst worker processes.
+        logger.info(
+            "Generating " + str(len(parameter_sets)) + " dimensionality reduction models with " + str(n_jobs) +
+            " processes."
+        )
+        persistence_thread.start()
+        try:
+            DimensionalityReductionProcessPool(
+                results=results,
+                distance_matrix=distance_matrix,
+                parameter_sets=parameter_sets,
+                input_dataset=high_dim_dataset,
+                high_dimensional_neighbourhood_ranking=high_dim_neighbourhood_ranking,
+                dim_red_kernel_name=dim_red_kernel_name,
+                high_dimensional_neighbours=high_dim_neighbours,
+                max_k=max_k,
+                n_jobs=n_jobs,
+                stress_engine=stress_engine,
+                warm_start=args.warm_start,
+                affinity_cache=AffinityCache(
+                    max_size=args.affinity_cache_size * 1024 ** 2, spill_path=storage_path + "/affinity_cache"
+                ) if args.affinity_cache_size > 0 else None,
+                results_consumer=persistence_thread
+            ).run()
+        finally:
+            # Make sure persistence thread terminates if model generation failed. No-op if all results were written.
+            persistence_thread.stop()
+            persistence_thread.join()
+            # Errors while writing results take precedence, since they cause model generation to fail as well.
+            if persistence_thread.exception is not None:
+                raise persistence_thread.exception
 
-    for thread in threads:
-        thread.start()
-    for thread in threads:
-        thread.join()
+        num_models_generated += len(parameter_sets)
+        if adaptive_parameter_search is None:
+            break
 
     ######################################################
     # 6. Compute explainer values for all embeddings.
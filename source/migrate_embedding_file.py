@@ -0,0 +1,59 @@
+import os
+import sys
+from tables import *
+from tqdm import tqdm
+
+from data_generation.EmbeddingFile import EmbeddingFile
+from utils import Utils
+
+
+def migrate_embedding_file(file_path: str, target_file_path: str):
+    """
+    Converts .h5 file with embeddings from storage format v1 (one CArray per model) to v2 (one array per group, see
+    EmbeddingFile).
+    :param file_path: Path to file in storage format v1.
+    :param target_file_path: Path of file to create.
+    """
+
+    source_file: File = open_file(filename=file_path, mode="r")
+    assert EmbeddingFile.read_format_version(source_file) == 1, "File " + file_path + " is not in storage format v1."
+    source: EmbeddingFile = EmbeddingFile(source_file)
+    model_ids: list = sorted(source.model_ids())
+
+    target_file: File = open_file(filename=target_file_path, mode="w")
+    source_file.root.metadata.copy(target_file.root)
+
+    if len(model_ids):
+        # Pad all embeddings to highest number of dimensions.
+        projections: dict = {model_id: source.read_projection(model_id) for model_id in model_ids}
+        target: EmbeddingFile = EmbeddingFile.initialize(
+            target_file,
+            num_records=projections[model_ids[0]].shape[0],
+            num_dimensions=max([projection.shape[1] for projection in projections.values()])
+        )
+
+        for model_id in tqdm(model_ids):
+            target.append(model_id, projections.pop(model_id), source.read_pointwise_quality(model_id))
+        target.flush()
+
+    source_file.close()
+    target_file.close()
+
+
+if __name__ == '__main__':
+    logger = Utils.create_logger()
+
+    assert len(sys.argv) in (2, 3), \
+        "Arguments to be specified: (1) Path to .h5 file in storage format v1, optionally (2) path to file to create. " \
+        "If (2) is not specified, the original file is replaced and kept with suffix .v1.h5."
+
+    file_path: str = sys.argv[1]
+    target_file_path: str = sys.argv[2] if len(sys.argv) == 3 else os.path.splitext(file_path)[0] + ".v2.h5"
+
+    logger.info("Migrating " + file_path + " to storage format v2.")
+    migrate_embedding_file(file_path, target_file_path)
+
+    if len(sys.argv) == 2:
+        os.rename(file_path, os.path.splitext(file_path)[0] + ".v1.h5")
+        os.rename(target_file_path, file_path)
+    logger.info("Done.")
@@ -0,0 +1,231 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class ModelDetailCache:
+    """
+    Two-tier cache for serialized responses of /get_dr_model_details and related endpoints.
+    Responses are kept in memory up to a size bound and evicted in least-recently-used order. If a cache directory is
+    set, responses are also written to files named after their key, which serve as second tier after eviction and across
+    restarts of the app. Keys are tuples of dataset name, DR kernel name, model ID, an integer version of the data
+    (e. g. the modification time of the .h5 file) and optional further parts, so responses for regenerated data are
+    never served. Versions have to increase with each regeneration: Files of older versions of a dataset and kernel
+    are deleted once a response for a newer version is stored. The size of the second tier is bounded as well, files
+    are deleted in least-recently-used order.
+    A background thread computes responses for models the user is likely to look at next (see prefetch()). Requests for
+    a response being computed wait for that computation instead of starting another one.
+    """
+
+    def __init__(self, max_size: int = 256 * 1024 ** 2, cache_path: str = None, max_disk_size: int = 4 * 1024 ** 3):
+        """
+        Initializes empty cache and starts prefetching thread.
+        :param max_size: Maximal size of responses kept in memory in bytes.
+        :param cache_path: Path to directory for second tier. Responses are only kept in memory if not set.
+        :param max_disk_size: Maximal size of responses kept in second tier in bytes.
+        """
+
+        self._max_size: int = max_size
+        self._cache_path: str = cache_path
+        self._max_disk_size: int = max_disk_size
+        self._entries: OrderedDict = OrderedDict()
+        self._size: int = 0
+        # Events set once responses being computed are available.
+        self._pending: dict = {}
+        self._lock: threading.Lock = threading.Lock()
+
+        self._prefetch_queue: queue.Queue = queue.Queue()
+        self._prefetch_thread: threading.Thread = threading.Thread(target=self._run_prefetching, daemon=True)
+        self._prefetch_thread.start()
+
+    def get(self, key: tuple, compute) -> bytes:
+        """
+        Returns response for key. Computes and stores it if not cached yet.
+        :param key: Tuple of dataset name, DR kernel name, model ID and data version.
+        :param compute: Function without arguments returning serialized response as bytes.
+        :return: Serialized response.
+        """
+
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key]
+
+                pending: threading.Event = self._pending.get(key)
+                if pending is None:
+                    pending = self._pending[key] = threading.Event()
+                    break
+
+            # Wait for other thread computing this response, then look it up again.
+            pending.wait()
+
+        try:
+            response: bytes = self._load(key)
+            if response is None:
+                response = compute()
+                self._store(key, response)
+
+            with self._lock:
+                self._put(key, response)
+
+            return response
+
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+
+    def prefetch(self, keys_and_computations: list):
+        """
+        Schedules responses to be computed in background, replacing all responses scheduled before and not computed
+        yet. Responses cached already are skipped.
+        :param keys_and_computations: List of tuples with key and compute function (see get()), in order of priority.
+        """
+
+        self.cancel_prefetching()
+        for key, compute in keys_and_computations:
+            self._prefetch_queue.put((key, compute))
+
+    def cancel_prefetching(self):
+        """
+        Drops responses scheduled for prefetching and not being computed yet, e. g. after switching datasets.
+        """
+
+        try:
+            while True:
+                self._prefetch_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _run_prefetching(self):
+        """
+        Computes scheduled responses one after another.
+        """
+
+        while True:
+            key, compute = self._prefetch_queue.get()
+            with self._lock:
+                if key in self._entries or key in self._pending:
+                    continue
+
+            try:
+                self.get(key, compute)
+            except Exception:
+                # Failed prefetches are recomputed - and raise - when actually requested.
+                pass
+
+    def _put(self, key: tuple, response: bytes):
+        """
+        Adds response to memory tier, evicts least recently used ones if size bound is exceeded. Call with lock held.
+        :param key:
+        :param response:
+        """
+
+        if key in self._entries:
+            return
+
+        self._entries[key] = response
+        self._size += len(response)
+
+        while self._size > self._max_size and len(self._entries) > 1:
+            self._size -= len(self._entries.popitem(last=False)[1])
+
+    def _file_path(self, key: tuple) -> str:
+        """
+        Returns path of file holding response in second tier. Files are grouped in directories per dataset and kernel
+        and per version.
+        :param key:
+        :return:
+        """
+
+        return os.path.join(
+            self._cache_path,
+            str(key[0]) + "_" + str(key[1]),
+            str(key[3]),
+            "_".join(str(part) for part in (key[2],) + tuple(key[4:])) + ".response"
+        )
+
+    def _load(self, key: tuple) -> bytes:
+        """
+        Loads response from second tier.
+        :param key:
+        :return: Serialized response; None if not available.
+        """
+
+        if self._cache_path is None:
+            return None
+
+        try:
+            with open(self._file_path(key), "rb") as file:
+                response: bytes = file.read()
+            # Mark file as recently used.
+            os.utime(self._file_path(key))
+
+            return response
+
+        # Files may be deleted concurrently when bounding the second tier.
+        except FileNotFoundError:
+            return None
+
+    def _store(self, key: tuple, response: bytes):
+        """
+        Writes response to second tier, if cache directory is set. Deletes files of older versions and least recently
+        used files exceeding the size bound afterwards.
+        :param key:
+        :param response:
+        """
+
+        if self._cache_path is None:
+            return
+
+        file_path: str = self._file_path(key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        # Write to temporary file first, so concurrent readers never see partially written responses.
+        file_descriptor, temp_file_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(response)
+        os.replace(temp_file_path, file_path)
+
+        self._remove_outdated_versions(key)
+        self._bound_disk_size()
+
+    def _remove_outdated_versions(self, key: tuple):
+        """
+        Deletes files of versions older than the one in key for the same dataset and kernel.
+        :param key:
+        """
+
+        dataset_path: str = os.path.dirname(os.path.dirname(self._file_path(key)))
+        for version in os.listdir(dataset_path):
+            if version.lstrip("-").isdigit() and int(version) < int(key[3]):
+                shutil.rmtree(os.path.join(dataset_path, version), ignore_errors=True)
+
+    def _bound_disk_size(self):
+        """
+        Deletes least recently used files until the second tier fits into max_disk_size.
+        """
+
+        files: list = []
+        for directory, _, file_names in os.walk(self._cache_path):
+            for file_name in file_names:
+                if file_name.endswith(".response"):
+                    try:
+                        stat: os.stat_result = os.stat(os.path.join(directory, file_name))
+                        files.append((stat.st_mtime_ns, stat.st_size, os.path.join(directory, file_name)))
+                    except FileNotFoundError:
+                        pass
+
+        disk_size: int = sum(size for _, size, _ in files)
+        # Keep the most recently stored file even if it exceeds the bound on its own.
+        for _, size, file_path in sorted(files)[:-1]:
+            if disk_size <= self._max_disk_size:
+                break
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+            disk_size -= size
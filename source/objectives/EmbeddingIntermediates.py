@@ -0,0 +1,185 @@
+import time
+import numpy as np
+from scipy.spatial.distance import pdist, squareform
+from sklearn.neighbors import NearestNeighbors
+from objectives.topology_preservation_objectives.CorankingMatrix import CorankingMatrix
+from objectives.distance_preservation_objectives.StressEngine import StressEngine
+
+
+class EmbeddingIntermediates:
+    """
+    Intermediate results derived from one embedding and shared by all objectives evaluated on it. Each intermediate is
+    computed on first access and kept until released.
+    Objectives declare which intermediates they read (see Objective.INTERMEDIATES) by the names of the corresponding
+    properties:
+        - "low_dimensional_distances": Condensed Euclidean distances between records in the embedding.
+        - "low_dimensional_ranking": Neighbourhood ranking in the embedding. Only available if max_k is not set.
+        - "low_dimensional_neighbours": Indices of max_k nearest neighbours in the embedding (kNN graph). Only
+        available if max_k is set.
+        - "coranking_matrix": Co-ranking matrix, including its summary with cumulative sums (see
+        CorankingMatrix.summary()).
+    Besides intermediates, instances hold the dataset-level data objectives need, e. g. the high-dimensional
+    neighbourhood ranking or the stress engine.
+    The time needed to compute each intermediate is recorded exclusive of the intermediates it's computed from.
+    """
+
+    # Intermediates each intermediate is computed from.
+    DEPENDENCIES: dict = {
+        "low_dimensional_distances": (),
+        "low_dimensional_ranking": ("low_dimensional_distances",),
+        "low_dimensional_neighbours": (),
+        "coranking_matrix": ("low_dimensional_ranking", "low_dimensional_neighbours")
+    }
+
+    def __init__(
+            self,
+            low_dimensional_data: np.ndarray,
+            high_dimensional_distance_matrix: np.ndarray = None,
+            high_dimensional_neighbourhood_ranking: np.ndarray = None,
+            high_dimensional_neighbours: np.ndarray = None,
+            max_k: int = None,
+            stress_engine: StressEngine = None,
+            input_dataset=None
+    ):
+        """
+        Initializes intermediates for one embedding. No intermediate is computed yet.
+        :param low_dimensional_data: Embedding.
+        :param high_dimensional_distance_matrix:
+        :param high_dimensional_neighbourhood_ranking:
+        :param high_dimensional_neighbours:
+        :param max_k: See CorankingMatrix.
+        :param stress_engine:
+        :param input_dataset: InputDataset the embedding was computed for.
+        """
+
+        self._low_dimensional_data: np.ndarray = low_dimensional_data
+        self._high_dimensional_distance_matrix: np.ndarray = high_dimensional_distance_matrix
+        self._high_dimensional_neighbourhood_ranking: np.ndarray = high_dimensional_neighbourhood_ranking
+        self._high_dimensional_neighbours: np.ndarray = high_dimensional_neighbours
+        self._max_k: int = max_k
+        self._stress_engine: StressEngine = stress_engine
+        self._input_dataset = input_dataset
+        self._intermediates: dict = {}
+        # Exclusive runtime per computed intermediate and total time spent on computing intermediates.
+        self._runtimes: dict = {}
+        self._total_runtime: float = 0
+
+    @staticmethod
+    def with_dependencies(names: tuple) -> set:
+        """
+        Returns specified intermediates and all intermediates they are (transitively) computed from.
+        :param names:
+        :return:
+        """
+
+        closure: set = set()
+        pending: list = list(names)
+
+        while len(pending):
+            name: str = pending.pop()
+            assert name in EmbeddingIntermediates.DEPENDENCIES, "Intermediate " + name + " not supported."
+            if name not in closure:
+                closure.add(name)
+                pending.extend(EmbeddingIntermediates.DEPENDENCIES[name])
+
+        return closure
+
+    @property
+    def runtimes(self) -> dict:
+        """
+        Returns time in seconds spent on computing each intermediate, excluding intermediates it was computed from.
+        Intermediates computed multiple times (after being released) are summed up.
+        :return:
+        """
+        return self._runtimes
+
+    @property
+    def total_runtime(self) -> float:
+        """
+        Returns time in seconds spent on computing intermediates so far.
+        :return:
+        """
+        return self._total_runtime
+
+    def release(self, name: str):
+        """
+        Drops reference to intermediate. It's recomputed if accessed again.
+        :param name:
+        """
+
+        self._intermediates.pop(name, None)
+
+    def _get(self, name: str, compute):
+        """
+        Returns intermediate, computes and stores it if not available yet.
+        :param name:
+        :param compute: Function computing intermediate.
+        :return:
+        """
+
+        if name not in self._intermediates:
+            start: float = time.time()
+            total_runtime_before: float = self._total_runtime
+            self._intermediates[name] = compute()
+
+            # Exclude time spent on intermediates computed within compute().
+            runtime: float = time.time() - start - (self._total_runtime - total_runtime_before)
+            self._runtimes[name] = self._runtimes.get(name, 0) + runtime
+            self._total_runtime += runtime
+
+        return self._intermediates[name]
+
+    @property
+    def low_dimensional_data(self) -> np.ndarray:
+        return self._low_dimensional_data
+
+    @property
+    def high_dimensional_distance_matrix(self) -> np.ndarray:
+        return self._high_dimensional_distance_matrix
+
+    @property
+    def stress_engine(self) -> StressEngine:
+        return self._stress_engine
+
+    @property
+    def input_dataset(self):
+        return self._input_dataset
+
+    @property
+    def low_dimensional_distances(self) -> np.ndarray:
+        return self._get("low_dimensional_distances", lambda: pdist(self._low_dimensional_data))
+
+    @property
+    def low_dimensional_ranking(self) -> np.ndarray:
+        assert self._max_k is None, "Low-dimensional ranking is only available if max_k is not set."
+
+        return self._get(
+            "low_dimensional_ranking",
+            lambda: CorankingMatrix.generate_neighbourhood_ranking(squareform(self.low_dimensional_distances))
+        )
+
+    @property
+    def low_dimensional_neighbours(self) -> np.ndarray:
+        assert self._max_k is not None, "Low-dimensional neighbours are only available if max_k is set."
+
+        # Querying without passing data excludes each record from its own neighbourhood.
+        return self._get(
+            "low_dimensional_neighbours",
+            lambda: NearestNeighbors(n_neighbors=self._max_k).fit(self._low_dimensional_data).kneighbors(
+                return_distance=False
+            )
+        )
+
+    @property
+    def coranking_matrix(self) -> CorankingMatrix:
+        return self._get(
+            "coranking_matrix",
+            lambda: CorankingMatrix(
+                low_dimensional_data=self._low_dimensional_data,
+                high_dimensional_neighbourhood_ranking=self._high_dimensional_neighbourhood_ranking,
+                high_dimensional_neighbours=self._high_dimensional_neighbours,
+                max_k=self._max_k,
+                low_dimensional_neighbourhood_ranking=self.low_dimensional_ranking if self._max_k is None else None,
+                low_dimensional_neighbours=self.low_dimensional_neighbours if self._max_k is not None else None
+            )
+        )
@@ -7,6 +7,9 @@ class Objective(abc.ABC):
     Define Metric as abstract base class (ABC) for all dimensionsality reduction & target dataset objectives.
     """
 
+    # Names of intermediates (see EmbeddingIntermediates) read by from_intermediates().
+    INTERMEDIATES: tuple = ()
+
     def __init__(self, low_dimensional_data: numpy.ndarray, target_data: numpy.ndarray):
         """
         Initializes objective.
@@ -20,6 +23,16 @@ class Objective(abc.ABC):
         self._target_data = target_data
         self._low_dimensional_data = low_dimensional_data
 
+    @classmethod
+    def from_intermediates(cls, intermediates) -> "Objective":
+        """
+        Creates objective for evaluation in ObjectivePipeline. Has to be implemented by objectives registered in
+        ObjectiveRegistry.
+        :param intermediates: EmbeddingIntermediates of embedding to evaluate.
+        :return: Objective instance.
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def compute(self):
         pass
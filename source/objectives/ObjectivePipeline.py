@@ -0,0 +1,56 @@
+import time
+from typing import Tuple
+from objectives.ObjectiveRegistry import ObjectiveRegistry
+from objectives.EmbeddingIntermediates import EmbeddingIntermediates
+
+
+class ObjectivePipeline:
+    """
+    Evaluates a set of registered objectives on one embedding. Intermediates (low-dimensional distances, rankings,
+    co-ranking matrix, ...) are computed once on first use and shared by all objectives. They are released as soon as no
+    remaining objective declares to use them.
+    Runtimes are measured per objective, excluding intermediates computed for it (see EmbeddingIntermediates.runtimes).
+    """
+
+    def __init__(self, objective_names: list = None):
+        """
+        Initializes pipeline.
+        :param objective_names: Names of registered objectives to evaluate, in this order. Defaults to all registered
+        objectives in order of registration.
+        """
+
+        self._objective_names: list = objective_names if objective_names is not None else ObjectiveRegistry.names()
+        self._objective_classes: list = [ObjectiveRegistry.get(name) for name in self._objective_names]
+
+        # Index of last objective using each intermediate, directly or as dependency of a declared one.
+        self._last_uses: dict = {}
+        for i, objective_class in enumerate(self._objective_classes):
+            for intermediate_name in EmbeddingIntermediates.with_dependencies(objective_class.INTERMEDIATES):
+                self._last_uses[intermediate_name] = i
+
+    @property
+    def objective_names(self) -> list:
+        return self._objective_names
+
+    def evaluate(self, intermediates: EmbeddingIntermediates) -> Tuple[dict, dict]:
+        """
+        Evaluates all objectives.
+        :param intermediates: Intermediates of embedding to evaluate.
+        :return: Dictionary with value per objective name, dictionary with runtime in seconds per objective name. The
+        latter excludes time spent on intermediates.
+        """
+
+        values: dict = {}
+        runtimes: dict = {}
+
+        for i, (name, objective_class) in enumerate(zip(self._objective_names, self._objective_classes)):
+            start: float = time.time()
+            intermediates_runtime_before: float = intermediates.total_runtime
+            values[name] = objective_class.from_intermediates(intermediates).compute()
+            runtimes[name] = time.time() - start - (intermediates.total_runtime - intermediates_runtime_before)
+
+            for intermediate_name, last_use in self._last_uses.items():
+                if last_use == i:
+                    intermediates.release(intermediate_name)
+
+        return values, runtimes
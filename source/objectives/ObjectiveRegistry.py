@@ -0,0 +1,46 @@
+class ObjectiveRegistry:
+    """
+    Registry of objectives evaluated for every embedding by ObjectivePipeline. Objectives register themselves with
+    ObjectiveRegistry.register() under the name their value is stored as (e. g. "r_nx").
+    """
+
+    # Objective classes by name, in order of registration.
+    _objectives: dict = {}
+
+    @staticmethod
+    def register(name: str):
+        """
+        Creates class decorator registering an Objective subclass. Registered classes have to declare the intermediates
+        they use in INTERMEDIATES and implement from_intermediates().
+        :param name: Name of objective.
+        :return: Class decorator.
+        """
+
+        def register_objective(objective_class: type) -> type:
+            assert name not in ObjectiveRegistry._objectives, "Objective " + name + " already registered."
+            ObjectiveRegistry._objectives[name] = objective_class
+
+            return objective_class
+
+        return register_objective
+
+    @staticmethod
+    def names() -> list:
+        """
+        Returns names of all registered objectives in order of registration.
+        :return:
+        """
+
+        return list(ObjectiveRegistry._objectives.keys())
+
+    @staticmethod
+    def get(name: str) -> type:
+        """
+        Returns objective class registered under specified name.
+        :param name:
+        :return:
+        """
+
+        assert name in ObjectiveRegistry._objectives, "Objective " + name + " not registered."
+
+        return ObjectiveRegistry._objectives[name]
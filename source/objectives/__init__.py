@@ -1,2 +1,7 @@
 from .distance_preservation_objectives import *
 from .topology_preservation_objectives import *
+from .information_preservation_objectives import *
+from .separability_objectives import *
+from .ObjectiveRegistry import ObjectiveRegistry
+from .EmbeddingIntermediates import EmbeddingIntermediates
+from .ObjectivePipeline import ObjectivePipeline
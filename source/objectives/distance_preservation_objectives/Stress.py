@@ -1,32 +1,68 @@
 import scipy
 import sklearn
 from .DistancePreservationObjective import DistancePreservationObjective
+from .StressEngine import StressEngine
+from objectives.ObjectiveRegistry import ObjectiveRegistry
 import networkx
 from sklearn.isotonic import IsotonicRegression
 import numpy as np
 
 
+@ObjectiveRegistry.register("stress")
 class Stress(DistancePreservationObjective):
     """
     Calculates stress criterions (Kruskal's stress, Sammon's stress, S stress, quadratic loss).
     """
+
+    INTERMEDIATES: tuple = ("low_dimensional_distances",)
+
     def __init__(
             self,
             low_dimensional_data: np.ndarray,
             high_dimensional_data: np.ndarray,
-            use_geodesic_distances: bool = False
+            use_geodesic_distances: bool = False,
+            stress_engine: StressEngine = None,
+            distance_metric: str = None,
+            low_dimensional_distances: np.ndarray = None
     ):
         """
         Initiates new pool for stress-related objectives.
         :param low_dimensional_data:
-        :param high_dimensional_data:
+        :param high_dimensional_data: Original high-dimensional data or, if distance_metric is "precomputed", distances
+        between records as squareform matrix or condensed vector.
         :param use_geodesic_distances:
+        :param stress_engine: Engine with precomputed high-dimensional distances. If supplied and geodesic distances are
+        not used, Kruskal's stress is computed with it instead of from high_dimensional_data.
+        :param distance_metric: "precomputed" if high_dimensional_data holds distances. Euclidean distances between rows
+        of high_dimensional_data are used otherwise.
+        :param low_dimensional_distances: Precomputed condensed Euclidean distances between rows of
+        low_dimensional_data. Computed if not supplied.
         """
         super().__init__(
             low_dimensional_data=low_dimensional_data,
             high_dimensional_data=high_dimensional_data,
+            distance_metric=distance_metric,
             use_geodesic_distances=use_geodesic_distances
         )
+        self._stress_engine: StressEngine = stress_engine
+        self._low_dimensional_distances: np.ndarray = low_dimensional_distances
+
+    @classmethod
+    def from_intermediates(cls, intermediates) -> "Stress":
+        stress_engine: StressEngine = intermediates.stress_engine
+
+        return cls(
+            high_dimensional_data=intermediates.high_dimensional_distance_matrix,
+            low_dimensional_data=intermediates.low_dimensional_data,
+            use_geodesic_distances=False,
+            stress_engine=stress_engine,
+            distance_metric="precomputed",
+            # Sampled pairs don't need all low-dimensional distances.
+            low_dimensional_distances=(
+                intermediates.low_dimensional_distances
+                if stress_engine is None or not stress_engine.is_subsampled else None
+            )
+        )
 
     def compute(self) -> float:
         """
@@ -38,7 +74,10 @@ class Stress(DistancePreservationObjective):
         Source: https://github.com/flowersteam/Unsupervised_Goal_Space_Learning/blob/master/src/embqual.py.
         :return: Stress measure.
         """
-        
+
+        if self._stress_engine is not None and not self._use_geodesic_distances:
+            return self._stress_engine.compute(self._low_dimensional_data, self._low_dimensional_distances)
+
         # We retrieve dimensions of the data
         n, m = self._low_dimensional_data.shape
 
@@ -61,9 +100,14 @@ class Stress(DistancePreservationObjective):
             s_all_distances = s_all_distances.ravel()
 
         else:
-            s_uni_distances = scipy.spatial.distance.pdist(self._low_dimensional_data)
+            s_uni_distances = self._low_dimensional_distances if self._low_dimensional_distances is not None else \
+                scipy.spatial.distance.pdist(self._low_dimensional_data)
             s_all_distances = scipy.spatial.distance.squareform(s_uni_distances).ravel()
-        l_uni_distances = scipy.spatial.distance.pdist(self._target_data)
+        if self._distance_metric == "precomputed":
+            l_uni_distances = scipy.spatial.distance.squareform(self._target_data, force="tovector", checks=False) \
+                if self._target_data.ndim == 2 else self._target_data
+        else:
+            l_uni_distances = scipy.spatial.distance.pdist(self._target_data)
         l_all_distances = scipy.spatial.distance.squareform(l_uni_distances).ravel()
 
         # We set up the measure dict
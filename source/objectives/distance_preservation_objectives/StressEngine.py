@@ -0,0 +1,192 @@
+import numpy as np
+from scipy.spatial.distance import pdist, squareform
+from scipy.stats import norm
+from sklearn.isotonic import isotonic_regression
+from typing import Tuple
+
+
+class StressEngine:
+    """
+    Computes Kruskal's stress for many embeddings of the same dataset. High-dimensional distances are determined once
+    and kept in condensed form (one entry per pair of records), so only low-dimensional distances have to be computed
+    per embedding.
+    Yields the same values as Stress.compute(), which fits an isotonic regression on full squareform distance matrices:
+    Duplicate pairs only double all sums. Auto-referential pairs have zero distance in both spaces and only affect the
+    fit if distinct records coincide in low-dimensional space, in which case they are accounted for with an additional
+    weight on the block of pairs with low-dimensional distance 0.
+    For large datasets, stress can be estimated on a uniform sample of pairs instead (see from_distance_matrix()).
+    """
+
+    # Number of records above which generate_data.py estimates stress on a sample of pairs.
+    MAX_EXACT_RECORDS: int = 20000
+    # Default number of sampled pairs.
+    DEFAULT_PAIR_BUDGET: int = 10 ** 7
+
+    def __init__(self, high_dimensional_distances: np.ndarray, pair_indices: np.ndarray = None):
+        """
+        Initializes engine with precomputed high-dimensional distances.
+        :param high_dimensional_distances: Condensed distances between records, as returned by
+        scipy.spatial.distance.pdist(), or distances between sampled pairs.
+        :param pair_indices: 2 x m matrix with record indices of sampled pairs. None if all pairs are used.
+        """
+
+        self._high_dimensional_distances: np.ndarray = high_dimensional_distances
+        self._pair_indices: np.ndarray = pair_indices
+        # Normalization term of Kruskal's stress.
+        self._squared_distances_sum: float = np.square(high_dimensional_distances, dtype=float).sum()
+
+    @staticmethod
+    def from_high_dimensional_data(high_dimensional_data: np.ndarray) -> "StressEngine":
+        """
+        Initializes engine by computing Euclidean distances between rows of high-dimensional data.
+        :param high_dimensional_data:
+        :return:
+        """
+
+        return StressEngine(pdist(high_dimensional_data))
+
+    @staticmethod
+    def from_distance_matrix(
+            distance_matrix: np.ndarray, pair_budget: int = None, seed: int = 0
+    ) -> "StressEngine":
+        """
+        Initializes engine with precomputed high-dimensional distance matrix.
+        :param distance_matrix: Symmetric n x n distance matrix.
+        :param pair_budget: Maximal number of pairs to evaluate. If the dataset has more pairs, this number of pairs is
+        sampled uniformly (with replacement) and stress is estimated on them.
+        :param seed: Seed for sampling pairs.
+        :return:
+        """
+
+        n: int = distance_matrix.shape[0]
+
+        if pair_budget is None or pair_budget >= n * (n - 1) / 2:
+            return StressEngine(squareform(distance_matrix, force="tovector", checks=False))
+
+        # Sample ordered pairs of distinct records, which is equivalent to sampling unordered pairs uniformly.
+        rng: np.random.RandomState = np.random.RandomState(seed)
+        index_dtype: np.dtype = np.dtype(np.int32) if n <= np.iinfo(np.int32).max else np.dtype(np.int64)
+        pair_indices: np.ndarray = np.empty((2, pair_budget), dtype=index_dtype)
+        pair_indices[0] = rng.randint(0, n, pair_budget)
+        # Shift second index by 1...n-1 to exclude auto-referential pairs.
+        pair_indices[1] = (pair_indices[0] + rng.randint(1, n, pair_budget)) % n
+
+        return StressEngine(distance_matrix[pair_indices[0], pair_indices[1]], pair_indices)
+
+    @property
+    def high_dimensional_distances(self) -> np.ndarray:
+        return self._high_dimensional_distances
+
+    @property
+    def pair_indices(self) -> np.ndarray:
+        return self._pair_indices
+
+    @property
+    def is_subsampled(self) -> bool:
+        return self._pair_indices is not None
+
+    def compute(self, low_dimensional_data: np.ndarray, low_dimensional_distances: np.ndarray = None) -> float:
+        """
+        Computes Kruskal's stress of embedding. Estimated on sampled pairs if engine is subsampled.
+        :param low_dimensional_data:
+        :param low_dimensional_distances: Precomputed condensed distances between rows of low_dimensional_data. Only
+        used if engine isn't subsampled.
+        :return: Kruskal's stress.
+        """
+
+        fitted_distances, _, block_weights, block_sums, block_squared_sums, _ = self._fit(
+            low_dimensional_data, low_dimensional_distances
+        )
+
+        # Sum of squared residuals per block: sum((f - y)^2) = f^2 * size - 2 * f * sum(y) + sum(y^2). Auto-referential
+        # pairs only contribute to the first term, since their high-dimensional distance is 0.
+        squared_residuals_sum: float = (
+            np.square(fitted_distances) * block_weights - 2 * fitted_distances * block_sums + block_squared_sums
+        ).sum()
+
+        return np.sqrt(max(squared_residuals_sum, 0) / self._squared_distances_sum)
+
+    def estimate(self, low_dimensional_data: np.ndarray, confidence: float = 0.95) -> Tuple[float, float, float]:
+        """
+        Estimates Kruskal's stress of embedding on sampled pairs with confidence interval. Squared stress is a ratio of
+        means over pairs, its standard error is approximated with the delta method (treating the isotonic fit as fixed,
+        which is reasonable for large samples).
+        :param low_dimensional_data:
+        :param confidence: Confidence level of interval.
+        :return: Stress, lower and upper bound of confidence interval. Bounds equal stress if all pairs are used.
+        """
+
+        fitted_distances, block_sizes, block_weights, _, _, high_dimensional_distances = self._fit(low_dimensional_data)
+
+        squared_residuals: np.ndarray = np.square(
+            np.repeat(fitted_distances, block_sizes) - high_dimensional_distances
+        )
+        squared_distances: np.ndarray = np.square(high_dimensional_distances)
+        squared_stress: float = (
+            squared_residuals.sum() + (block_weights[0] - block_sizes[0]) * np.square(fitted_distances[0])
+        ) / self._squared_distances_sum
+        stress: float = np.sqrt(squared_stress)
+
+        if not self.is_subsampled or stress == 0:
+            return stress, stress, stress
+
+        num_pairs: int = len(squared_residuals)
+        squared_stress_se: float = np.sqrt(
+            np.var(squared_residuals - squared_stress * squared_distances) / num_pairs
+        ) / squared_distances.mean()
+        stress_se: float = squared_stress_se / (2 * stress)
+        z: float = norm.ppf(0.5 + confidence / 2)
+
+        return stress, max(stress - z * stress_se, 0), stress + z * stress_se
+
+    def _fit(
+            self, low_dimensional_data: np.ndarray, low_dimensional_distances: np.ndarray = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Fits isotonic regression of high-dimensional on low-dimensional distances.
+        :param low_dimensional_data:
+        :param low_dimensional_distances: Precomputed condensed low-dimensional distances. Ignored if subsampled.
+        :return: Fitted distance, size, weight (i. e. size including auto-referential pairs), sum and sum of squares of
+        high-dimensional distances per block of pairs with identical low-dimensional distance; high-dimensional
+        distances ordered by low-dimensional distances.
+        """
+
+        if self._pair_indices is None:
+            if low_dimensional_distances is None:
+                low_dimensional_distances = pdist(low_dimensional_data)
+        else:
+            low_dimensional_distances = np.linalg.norm(
+                low_dimensional_data[self._pair_indices[0]] - low_dimensional_data[self._pair_indices[1]], axis=1
+            )
+
+        # Order pairs by low-dimensional distances, since the isotonic regression fits high-dimensional distances as
+        # monotonous function of low-dimensional ones.
+        order: np.ndarray = np.argsort(low_dimensional_distances)
+        low_dimensional_distances = low_dimensional_distances[order]
+        high_dimensional_distances: np.ndarray = np.asarray(self._high_dimensional_distances[order], dtype=float)
+        del order
+
+        # Pairs with identical low-dimensional distances are fit with one value, their average high-dimensional
+        # distance. Aggregate them into blocks weighted by their size.
+        block_starts: np.ndarray = np.flatnonzero(
+            np.concatenate(([True], low_dimensional_distances[1:] != low_dimensional_distances[:-1]))
+        )
+        block_sizes: np.ndarray = np.diff(np.append(block_starts, len(low_dimensional_distances)))
+        block_sums: np.ndarray = np.add.reduceat(high_dimensional_distances, block_starts)
+        block_squared_sums: np.ndarray = np.add.reduceat(np.square(high_dimensional_distances), block_starts)
+
+        # Auto-referential pairs (0, 0) pool with pairs of coinciding records. A squareform matrix holds n of them
+        # besides n * (n - 1) ordered pairs, i. e. there's half an auto-referential pair per record and unordered pair.
+        # Scaled to the number of (sampled) pairs, so that estimates converge to the exact value.
+        block_weights: np.ndarray = block_sizes.astype(float)
+        if low_dimensional_distances[0] == 0:
+            block_weights[0] += len(low_dimensional_distances) / (low_dimensional_data.shape[0] - 1)
+
+        return (
+            isotonic_regression(block_sums / block_weights, sample_weight=block_weights),
+            block_sizes,
+            block_weights,
+            block_sums,
+            block_squared_sums,
+            high_dimensional_distances
+        )
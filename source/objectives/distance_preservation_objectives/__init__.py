@@ -1,2 +1,3 @@
 from .ResidualVariance import ResidualVariance
 from .Stress import Stress
+from .StressEngine import StressEngine
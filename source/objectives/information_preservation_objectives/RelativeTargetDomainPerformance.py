@@ -0,0 +1,33 @@
+import numpy
+from objectives.Objective import Objective
+from objectives.ObjectiveRegistry import ObjectiveRegistry
+
+
+@ObjectiveRegistry.register("target_domain_performance")
+class RelativeTargetDomainPerformance(Objective):
+    """
+    Calculates target domain performance of embedding relative to the one of the original high-dimensional dataset.
+    See InputDataset.compute_relative_target_domain_performance().
+    """
+
+    def __init__(self, low_dimensional_data: numpy.ndarray, input_dataset):
+        """
+        Initializes objective.
+        :param low_dimensional_data: Output of DR algorithm.
+        :param input_dataset: InputDataset the embedding was computed for.
+        """
+
+        super().__init__(low_dimensional_data=low_dimensional_data, target_data=None)
+        self._input_dataset = input_dataset
+
+    @classmethod
+    def from_intermediates(cls, intermediates) -> "RelativeTargetDomainPerformance":
+        return cls(low_dimensional_data=intermediates.low_dimensional_data, input_dataset=intermediates.input_dataset)
+
+    def compute(self) -> float:
+        """
+        Calculates objective.
+        :return: Relative target domain performance.
+        """
+
+        return self._input_dataset.compute_relative_target_domain_performance(features=self._low_dimensional_data)
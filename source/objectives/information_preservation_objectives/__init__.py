@@ -0,0 +1 @@
+from .RelativeTargetDomainPerformance import RelativeTargetDomainPerformance
@@ -0,0 +1,32 @@
+import numpy
+from objectives.Objective import Objective
+from objectives.ObjectiveRegistry import ObjectiveRegistry
+
+
+@ObjectiveRegistry.register("separability_metric")
+class Separability(Objective):
+    """
+    Calculates separability of classes in embedding. See InputDataset.compute_separability_metric().
+    """
+
+    def __init__(self, low_dimensional_data: numpy.ndarray, input_dataset):
+        """
+        Initializes objective.
+        :param low_dimensional_data: Output of DR algorithm.
+        :param input_dataset: InputDataset the embedding was computed for.
+        """
+
+        super().__init__(low_dimensional_data=low_dimensional_data, target_data=None)
+        self._input_dataset = input_dataset
+
+    @classmethod
+    def from_intermediates(cls, intermediates) -> "Separability":
+        return cls(low_dimensional_data=intermediates.low_dimensional_data, input_dataset=intermediates.input_dataset)
+
+    def compute(self) -> float:
+        """
+        Calculates objective.
+        :return: Normalized score between 0 and 1 indicating cluster consistency in embedding.
+        """
+
+        return self._input_dataset.compute_separability_metric(features=self._low_dimensional_data)
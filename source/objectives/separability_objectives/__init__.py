@@ -0,0 +1 @@
+from .Separability import Separability
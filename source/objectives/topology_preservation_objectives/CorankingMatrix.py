@@ -1,5 +1,3 @@
-import pickle
-
 import pandas as pd
 import numpy as np
 from objectives.DimensionalityReductionObjective import DimensionalityReductionObjective
@@ -7,10 +5,11 @@ from coranking.metrics import trustworthiness, continuity
 from typing import Tuple
 from scipy.spatial import distance
 import sklearn
+from sklearn.neighbors import NearestNeighbors
 import networkx as nx
 from utils import Utils
-import itertools
 from scipy.spatial.distance import cdist
+from .CorankingMatrixSummary import CorankingMatrixSummary
 
 
 class CorankingMatrix:
@@ -23,7 +22,11 @@ class CorankingMatrix:
             low_dimensional_data: np.ndarray,
             distance_metric: str = None,
             high_dimensional_data: np.ndarray = None,
-            high_dimensional_neighbourhood_ranking: np.ndarray = None
+            high_dimensional_neighbourhood_ranking: np.ndarray = None,
+            high_dimensional_neighbours: np.ndarray = None,
+            max_k: int = None,
+            low_dimensional_neighbourhood_ranking: np.ndarray = None,
+            low_dimensional_neighbours: np.ndarray = None
     ):
         """
         Computes new co-ranking matrix.
@@ -32,26 +35,136 @@ class CorankingMatrix:
         :param distance_metric: Distance metric used to compute neighbourhood ranking. Only needed if
         high_dimensional_neighbourhood_ranking not supplied.
         :param high_dimensional_neighbourhood_ranking:
+        :param high_dimensional_neighbours: Indices of each record's nearest neighbours in high-dimensional space,
+        ordered by distance and excluding the record itself (see generate_truncated_neighbourhood()). Only used if
+        max_k is set.
+        :param max_k: If set, only neighbourhoods up to size max_k are considered. The coranking matrix is then reduced
+        to its upper left max_k x max_k block, which is computed from nearest neighbour queries without ranking all
+        pairs of records.
+        :param low_dimensional_neighbourhood_ranking: Precomputed neighbourhood ranking in low-dimensional space.
+        Computed from low_dimensional_data if not supplied. Only used if max_k is not set.
+        :param low_dimensional_neighbours: Precomputed indices of nearest neighbours in low-dimensional space, at least
+        max_k per record. Computed from low_dimensional_data if not supplied. Only used if max_k is set.
         """
 
-        assert high_dimensional_data is not None or high_dimensional_neighbourhood_ranking is not None
-        assert high_dimensional_neighbourhood_ranking is not None or distance_metric, \
+        assert high_dimensional_data is not None or \
+            high_dimensional_neighbourhood_ranking is not None or \
+            high_dimensional_neighbours is not None
+        assert high_dimensional_neighbourhood_ranking is not None or \
+            high_dimensional_neighbours is not None or \
+            distance_metric, \
             "Distance metric must be specified when not passing high_dimensionsional_neighbourhood_rankings."
+        assert high_dimensional_neighbours is None or max_k is not None, \
+            "max_k must be specified when passing high_dimensional_neighbours."
 
         self._distance_metric: str = distance_metric
         self._high_dim_ranking: np.ndarray = None
         self._low_dim_ranking: np.ndarray = None
+        self._max_k: int = max_k
+        # Only set if max_k is set: Records and maximum of both ranks of neighbours within max_k in both spaces.
+        self._truncated_neighbourhood_overlaps: Tuple[np.ndarray, np.ndarray] = None
+        # Only set if max_k is set: Indices of max_k nearest neighbours in high- and low-dimensional space.
+        self._truncated_neighbourhoods: Tuple[np.ndarray, np.ndarray] = None
+        # Compiled lazily, since only the model detail view needs it.
+        self._record_bin_indices: pd.DataFrame = None
+        self._summary: CorankingMatrixSummary = None
+        self._num_records: int = low_dimensional_data.shape[0]
+
+        if max_k is None:
+            self._matrix = self._generate_coranking_matrix(
+                high_dimensional_data=high_dimensional_data,
+                low_dimensional_data=low_dimensional_data,
+                high_dim_neighbourhood_ranking=high_dimensional_neighbourhood_ranking,
+                low_dim_neighbourhood_ranking=low_dimensional_neighbourhood_ranking
+            )
+        else:
+            self._matrix = self._generate_truncated_coranking_matrix(
+                high_dimensional_data=high_dimensional_data,
+                low_dimensional_data=low_dimensional_data,
+                high_dim_neighbourhood_ranking=high_dimensional_neighbourhood_ranking,
+                high_dim_neighbours=high_dimensional_neighbours,
+                low_dim_neighbours=low_dimensional_neighbours
+            )
 
-        self._matrix, self._record_bin_indices = self._generate_coranking_matrix(
-            high_dimensional_data=high_dimensional_data,
-            low_dimensional_data=low_dimensional_data,
-            high_dim_neighbourhood_ranking=high_dimensional_neighbourhood_ranking
-        )
+    @property
+    def max_k(self) -> int:
+        """
+        Returns largest neighbourhood size covered by this coranking matrix.
+        :return:
+        """
+        return self._matrix.shape[0]
+
+    @property
+    def is_truncated(self) -> bool:
+        """
+        Returns whether this coranking matrix only covers neighbourhoods up to a size of max_k.
+        :return:
+        """
+        return self._max_k is not None
 
     @property
     def record_bin_indices(self) -> pd.DataFrame:
+        """
+        Returns pd.DataFrame with records like [source record index, neighbour record index, high-dim. neighbour rank,
+        low-dim. neighbour rank]. Compiled on first access. If truncated, ranks beyond max_k are set to max_k + 1.
+        :return:
+        """
+
+        if self._record_bin_indices is None:
+            self._record_bin_indices = self._compile_record_bin_indices()
+
         return self._record_bin_indices
 
+    @staticmethod
+    def rank_dtype(n: int) -> np.dtype:
+        """
+        Returns smallest unsigned integer type able to hold neighbourhood ranks for n records.
+        :param n: Number of records.
+        :return:
+        """
+
+        return np.dtype(np.uint16) if n <= np.iinfo(np.uint16).max + 1 else np.dtype(np.uint32)
+
+    @staticmethod
+    def _rank_by_order(distances: np.ndarray) -> np.ndarray:
+        """
+        Ranks neighbours row-wise by their distances. Equivalent to distances.argsort(axis=1).argsort(axis=1), but
+        inverts the sort order with a scatter instead of a second argsort and stores ranks in a compact integer type.
+        :param distances: n x n distance matrix.
+        :return: n x n matrix with element (x, y) denoting which neighbour of record x record y is.
+        """
+
+        n: int = distances.shape[1]
+        dtype: np.dtype = CorankingMatrix.rank_dtype(n)
+        ranking: np.ndarray = np.empty(distances.shape, dtype=dtype)
+        np.put_along_axis(
+            ranking,
+            distances.argsort(axis=1),
+            np.broadcast_to(np.arange(n, dtype=dtype), distances.shape),
+            axis=1
+        )
+
+        return ranking
+
+    @staticmethod
+    def _rank_truncated_neighbourhood(neighbours: np.ndarray) -> np.ndarray:
+        """
+        Expands truncated neighbourhood to a neighbourhood ranking in which all records beyond the max_k nearest
+        neighbours share rank max_k + 1.
+        :param neighbours: n x max_k matrix of neighbour indices (see generate_truncated_neighbourhood()).
+        :return: n x n matrix with element (x, y) denoting which neighbour of record x record y is.
+        """
+
+        n, max_k = neighbours.shape
+        dtype: np.dtype = CorankingMatrix.rank_dtype(n)
+        ranking: np.ndarray = np.full((n, n), max_k + 1, dtype=dtype)
+        np.put_along_axis(
+            ranking, neighbours, np.broadcast_to(np.arange(1, max_k + 1, dtype=dtype), neighbours.shape), axis=1
+        )
+        np.fill_diagonal(ranking, 0)
+
+        return ranking
+
     @staticmethod
     def generate_neighbourhood_ranking(distance_matrix: np.ndarray) -> np.ndarray:
         """
@@ -64,7 +177,55 @@ class CorankingMatrix:
 
         # Original approach: Re-calculate with chosen data and distance metric.
         # Calculate distances, then sort by similarities.
-        return distance_matrix.argsort(axis=1).argsort(axis=1)
+        return CorankingMatrix._rank_by_order(distance_matrix)
+
+    @staticmethod
+    def generate_truncated_neighbourhood(distance_matrix: np.ndarray, max_k: int, chunk_size: int = 2 ** 24) -> np.ndarray:
+        """
+        Generates truncated neighbourhood, i. e. the indices of each record's max_k nearest neighbours. Uses
+        np.argpartition in row chunks, so only max_k elements per row have to be sorted.
+        :param distance_matrix: n x n distance matrix. Can be memory-mapped.
+        :param max_k: Number of neighbours to retrieve per record.
+        :param chunk_size: Approximate number of distance matrix elements to process at once.
+        :return: n x max_k matrix with element (x, y) denoting the index of record x's (y + 1)-th nearest neighbour.
+        The record itself is not considered its own neighbour.
+        """
+
+        n: int = distance_matrix.shape[0]
+        assert max_k < n, "max_k has to be smaller than the number of records."
+        neighbours: np.ndarray = np.empty((n, max_k), dtype=np.int64)
+        num_rows_per_chunk: int = max(1, chunk_size // n)
+
+        for first_row in range(0, n, num_rows_per_chunk):
+            rows: np.ndarray = np.arange(first_row, min(first_row + num_rows_per_chunk, n))
+            distances: np.ndarray = np.array(distance_matrix[rows[0]:rows[-1] + 1], dtype=np.float64)
+            # Exclude records themselves.
+            distances[np.arange(len(rows)), rows] = np.inf
+
+            # Select max_k nearest neighbours, then sort only those.
+            candidates: np.ndarray = np.argpartition(distances, max_k - 1, axis=1)[:, :max_k]
+            order: np.ndarray = np.take_along_axis(distances, candidates, axis=1).argsort(axis=1, kind="stable")
+            neighbours[rows] = np.take_along_axis(candidates, order, axis=1)
+
+        return neighbours
+
+    @staticmethod
+    def _generate_truncated_neighbourhood_from_data(
+            data: np.ndarray, max_k: int, distance_metric: str = "euclidean"
+    ) -> np.ndarray:
+        """
+        Generates truncated neighbourhood by querying a tree-based nearest neighbour index built on data.
+        :param data:
+        :param max_k: Number of neighbours to retrieve per record.
+        :param distance_metric:
+        :return: n x max_k matrix with element (x, y) denoting the index of record x's (y + 1)-th nearest neighbour.
+        The record itself is not considered its own neighbour.
+        """
+
+        # Querying without passing data excludes each record from its own neighbourhood.
+        return NearestNeighbors(
+            n_neighbors=max_k, metric=distance_metric if distance_metric is not None else "euclidean"
+        ).fit(data).kneighbors(return_distance=False)
 
     @staticmethod
     def _generate_neighbourhood_matrix(data: np.ndarray, distance_metric: str = "euclidean") -> np.ndarray:
@@ -78,16 +239,45 @@ class CorankingMatrix:
 
         # Original approach: Re-calculate with chosen data and distance metric.
         # Calculate distances, then sort by similarities.
-        return distance.squareform(
+        return CorankingMatrix._rank_by_order(distance.squareform(
             distance.pdist(data, distance_metric if distance_metric is not None else "euclidean")
-        ).argsort(axis=1).argsort(axis=1)
+        ))
+
+    @staticmethod
+    def compute_coranking_matrix(
+            high_dim_ranking: np.ndarray, low_dim_ranking: np.ndarray, method: str = "bincount"
+    ) -> np.ndarray:
+        """
+        Counts how many record pairs have high-dimensional rank x and low-dimensional rank y.
+        :param high_dim_ranking: n x n neighbourhood ranking in high-dimensional space.
+        :param low_dim_ranking: n x n neighbourhood ranking in low-dimensional space.
+        :param method: "bincount" to count integer pair indices directly, "histogram2d" for the original
+        implementation based on np.histogram2d. Both yield identical counts.
+        :return: n x n co-ranking matrix including auto-referential ranks (i. e. row and column 0).
+        """
+
+        assert method in ("bincount", "histogram2d"), "Method " + method + " not supported."
+        n: int = high_dim_ranking.shape[0]
+
+        if method == "histogram2d":
+            Q, xedges, yedges = np.histogram2d(high_dim_ranking.flatten(), low_dim_ranking.flatten(), bins=n)
+            return Q
+
+        # Encode each (high-dim. rank, low-dim. rank) pair as one integer and count occurences. Ranks are stored in
+        # compact types, so the pair index has to be computed in int64 to avoid overflows.
+        pair_indices: np.ndarray = high_dim_ranking.astype(np.int64)
+        pair_indices *= n
+        pair_indices += low_dim_ranking
+
+        return np.bincount(pair_indices.ravel(), minlength=n * n).reshape((n, n))
 
     def _generate_coranking_matrix(
             self,
             high_dimensional_data: np.ndarray,
             low_dimensional_data: np.ndarray,
             high_dim_neighbourhood_ranking: np.ndarray = None,
-            use_geodesic: bool = False
+            use_geodesic: bool = False,
+            low_dim_neighbourhood_ranking: np.ndarray = None
     ) -> Tuple[np.ndarray, pd.DataFrame]:
         """
         This function allows to construct coranking matrix based on data in state and latent space. Based on
@@ -101,12 +291,11 @@ class CorankingMatrix:
         :param use_geodesic: Whether to use the geodesic distance for state space.
         :param high_dim_neighbourhood_ranking: Ranking of neighbourhood similarities. Calculated if none is supplied. If
         supplied, high_dimensional_data is not used.
-        :return: (1) Coranking matrix as 2-dim. ndarry, (2) pd.DataFrame with records like [source record index, neighbour
-        record index, bin index x-axis, bin index y-axis] if compute_indices_bin_location == True - otherwise None.
+        :param low_dim_neighbourhood_ranking: Ranking of neighbourhood similarities in low-dimensional space. Calculated
+        if none is supplied.
+        :return: Coranking matrix as 2-dim. ndarry.
         """
 
-        n_rows: int = low_dimensional_data.shape[0]
-
         # ------------------------------------------------------------------------------------
         # 1. Calculate ranking in high dimensional space only if that hasn't been done yet.
         # ------------------------------------------------------------------------------------
@@ -131,47 +320,123 @@ class CorankingMatrix:
         # 2. Calculate ranking in low-dimensional space.
         # ------------------------------------------------------------------------------------
 
-        # Calculate distances.
-        self._low_dim_ranking = CorankingMatrix._generate_neighbourhood_matrix(
-            low_dimensional_data,
-            distance_metric=self._distance_metric
-        )
+        # Calculate distances, if ranking wasn't supplied.
+        self._low_dim_ranking = low_dim_neighbourhood_ranking if low_dim_neighbourhood_ranking is not None else \
+            CorankingMatrix._generate_neighbourhood_matrix(
+                low_dimensional_data,
+                distance_metric=self._distance_metric
+            )
 
         # ------------------------------------------------------------------------------------
         # 3. Compute coranking matrix.
         # ------------------------------------------------------------------------------------
 
-        high_dim_neighbourhood_positions: np.ndarray = self._high_dim_ranking.flatten()
-        low_dim_neighbourhood_positions: np.ndarray = self._low_dim_ranking.flatten()
+        Q: np.ndarray = CorankingMatrix.compute_coranking_matrix(self._high_dim_ranking, self._low_dim_ranking)
 
-        Q, xedges, yedges = np.histogram2d(
-            high_dim_neighbourhood_positions,
-            low_dim_neighbourhood_positions,
-            bins=n_rows
+        # Exclude auto-referential ranks (i. e. record x being record's x closest neighbour).
+        return Q[1:, 1:]
+
+    def _generate_truncated_coranking_matrix(
+            self,
+            high_dimensional_data: np.ndarray,
+            low_dimensional_data: np.ndarray,
+            high_dim_neighbourhood_ranking: np.ndarray = None,
+            high_dim_neighbours: np.ndarray = None,
+            low_dim_neighbours: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Constructs upper left max_k x max_k block of coranking matrix from nearest neighbour indices, i. e. in
+        O(n * max_k * log(n * max_k)) instead of O(n^2 * log(n)).
+        :param high_dimensional_data:
+        :param low_dimensional_data:
+        :param high_dim_neighbourhood_ranking: Full neighbourhood ranking. Only used if high_dim_neighbours is None.
+        :param high_dim_neighbours: Indices of nearest neighbours in high-dimensional space.
+        :param low_dim_neighbours: Indices of nearest neighbours in low-dimensional space. Computed if not supplied.
+        :return: Truncated coranking matrix as max_k x max_k ndarray.
+        """
+
+        max_k: int = self._max_k
+        n: int = low_dimensional_data.shape[0]
+
+        # ------------------------------------------------------------------------------------
+        # 1. Gather nearest neighbours in both spaces.
+        # ------------------------------------------------------------------------------------
+
+        if high_dim_neighbours is not None:
+            assert high_dim_neighbours.shape[1] >= max_k, "Fewer high-dimensional neighbours than max_k supplied."
+            high_dim_neighbours = high_dim_neighbours[:, :max_k]
+        elif high_dim_neighbourhood_ranking is not None:
+            high_dim_neighbours = CorankingMatrix.generate_truncated_neighbourhood(
+                high_dim_neighbourhood_ranking, max_k
+            )
+        else:
+            high_dim_neighbours = CorankingMatrix._generate_truncated_neighbourhood_from_data(
+                high_dimensional_data, max_k, self._distance_metric
+            )
+        if low_dim_neighbours is not None:
+            assert low_dim_neighbours.shape[1] >= max_k, "Fewer low-dimensional neighbours than max_k supplied."
+            low_dim_neighbours = low_dim_neighbours[:, :max_k]
+        else:
+            low_dim_neighbours = CorankingMatrix._generate_truncated_neighbourhood_from_data(
+                low_dimensional_data, max_k, self._distance_metric
+            )
+
+        # ------------------------------------------------------------------------------------
+        # 2. Find neighbours in both neighbourhoods and their ranks.
+        # ------------------------------------------------------------------------------------
+
+        # Encode (record, neighbour) pairs as integers. Pairs are unique within each neighbourhood.
+        record_offsets: np.ndarray = np.arange(n, dtype=np.int64)[:, None] * n
+        _, high_dim_positions, low_dim_positions = np.intersect1d(
+            (record_offsets + high_dim_neighbours).ravel(),
+            (record_offsets + low_dim_neighbours).ravel(),
+            assume_unique=True,
+            return_indices=True
+        )
+        # Column index of a neighbour is its rank - 1.
+        high_dim_ranks: np.ndarray = high_dim_positions % max_k
+        low_dim_ranks: np.ndarray = low_dim_positions % max_k
+
+        self._truncated_neighbourhood_overlaps = (
+            high_dim_positions // max_k, np.maximum(high_dim_ranks, low_dim_ranks) + 1
         )
+        self._truncated_neighbourhoods = (high_dim_neighbours, low_dim_neighbours)
 
         # ------------------------------------------------------------------------------------
-        # 4. Extract bin indices of records in co-ranking matrix.
+        # 3. Compute coranking matrix block.
         # ------------------------------------------------------------------------------------
 
+        return np.bincount(high_dim_ranks * max_k + low_dim_ranks, minlength=max_k * max_k).reshape((max_k, max_k))
+
+    def _compile_record_bin_indices(self) -> pd.DataFrame:
+        """
+        Extracts bin indices of records in co-ranking matrix.
+        :return: pd.DataFrame with records like [source record index, neighbour record index, high-dim. neighbour rank,
+        low-dim. neighbour rank].
+        """
+
         # self._*_dim_ranking specifies the rank/neighbourhood distance in jumps between
         # records x (row) and y (column) - i. e. element (x, y), record y, is record x's
         # self._*_dim_ranking[x, y]-th neighbour.
+        if self.is_truncated:
+            self._high_dim_ranking, self._low_dim_ranking = (
+                CorankingMatrix._rank_truncated_neighbourhood(neighbours)
+                for neighbours in self._truncated_neighbourhoods
+            )
+        n_rows: int = self._high_dim_ranking.shape[0]
 
         # Compile dataframe with information on bin index for record pair.
         # Note that high_dim_neighbour_rank represents y-axis, low_dim_neighbour_offset the x-axis in co-ranking
         # matrix.
-        index_vals: list = list(range(n_rows))
-        record_indices: np.ndarray = np.asarray([element for element in itertools.product(index_vals, index_vals)])
         record_bin_indices: pd.DataFrame = pd.DataFrame({
-            "source": record_indices[:, 0],
-            "neighbour": record_indices[:, 1],
-            "high_dim_neighbour_rank": high_dim_neighbourhood_positions,
-            "low_dim_neighbour_rank": low_dim_neighbourhood_positions
+            "source": np.repeat(np.arange(n_rows), n_rows),
+            "neighbour": np.tile(np.arange(n_rows), n_rows),
+            "high_dim_neighbour_rank": self._high_dim_ranking.flatten(),
+            "low_dim_neighbour_rank": self._low_dim_ranking.flatten()
         })
 
         # Exclude auto-referential records (i. e. rows stating that record x is record's x closest neighbour).
-        return Q[1:, 1:], record_bin_indices[record_bin_indices.source != record_bin_indices.neighbour]
+        return record_bin_indices[record_bin_indices.source != record_bin_indices.neighbour]
 
     @staticmethod
     def _calculate_geodesic_ranking(data: np.ndarray, distance_metric: str):
@@ -197,7 +462,7 @@ class CorankingMatrix:
         distances = (distances + distances.T) / 2
 
         # Generate rankings from distances.
-        return distances.argsort(axis=1).argsort(axis=1)
+        return CorankingMatrix._rank_by_order(distances)
 
     def matrix(self):
         """
@@ -206,35 +471,29 @@ class CorankingMatrix:
         """
         return self._matrix
 
+    def summary(self) -> CorankingMatrixSummary:
+        """
+        Returns cumulative sums over coranking matrix for O(1) evaluation of criteria for any k. Computed on first
+        access.
+        :return: CorankingMatrixSummary for this coranking matrix.
+        """
+
+        if self._summary is None:
+            self._summary = CorankingMatrixSummary(self._matrix, n=self._num_records - 1)
+
+        return self._summary
+
     def calculate_intrusion(self, k_values: list):
         """
         This method allows to compute the fraction of intrusion.
 
         Implementation based on https://github.com/gdkrmr/coRanking .
 
-        :param Q: The coranking matrix
         :param k_values: The neighbourhood sizes to sample.
         :returns List of intrusion values for each k.
         """
 
-        Q = self._matrix
-
-        # We retrieve the number of points
-        n = Q.shape[0]
-        # We compute the values
-        vals = Q
-
-        measures = []
-        for k in k_values:
-            # We compute the mask.
-            mask = np.zeros([n, n])
-            mask[:k, :k] = np.triu(np.ones([k, k]))
-            # We compute the normalization constant
-            norm = k * (n + 1.)
-            # We finally compute the measures
-            measures.append((vals * mask).sum() / float(norm))
-
-        return measures
+        return self.summary().intrusion(k_values).tolist()
 
     def calculate_extrusion(self, k_values: list):
         """
@@ -242,33 +501,11 @@ class CorankingMatrix:
 
         Implementation based on https://github.com/gdkrmr/coRanking .
 
-        :param Q: The coranking matrix
         :param k_values: The neighbourhood sizes to sample.
         :returns List of extrusion values for each k.
         """
 
-        Q = self._matrix
-
-        # We retrieve the number of points
-        n = Q.shape[0]
-        # We compute the values
-        vals = Q
-
-        # We compute the mask
-        mask = np.zeros([n, n])
-
-        measures = []
-        for k in k_values:
-            mask[:k, :k] = np.tril(np.ones([k, k]))
-            # We compute the normalization constant.
-            norm = k * (n + 1.)
-            # We finally compute the measures.
-            measures.append((vals * mask).sum() / float(norm))
-
-            # Reset mask.
-            mask[:k, :k] = 0.
-
-        return measures
+        return self.summary().extrusion(k_values).tolist()
 
     def high_dimensional_neighbourhood_ranking(self):
         """
@@ -286,6 +523,76 @@ class CorankingMatrix:
 
         return self._low_dim_ranking
 
+    def pointwise_neighbourhood_overlaps(self, k_values: list) -> np.ndarray:
+        """
+        Counts for each record and each k how many of its k nearest neighbours in high-dimensional space are also
+        amongst its k nearest neighbours in low-dimensional space. Equals the sum over the upper left k x k block of
+        the pointwise co-ranking matrix Q_i yielded by create_pointwise_coranking_matrix_generator().
+        :param k_values: The neighbourhood sizes to sample.
+        :return: Matrix of shape (number of records, number of k values) holding neighbourhood overlaps.
+        """
+
+        if self.is_truncated:
+            assert max(k_values) <= self._max_k, "k values have to be <= max_k."
+            records, max_ranks = self._truncated_neighbourhood_overlaps
+            sorted_k_values, k_value_indices = np.unique(np.asarray(k_values, dtype=np.int64), return_inverse=True)
+            num_k_values: int = len(sorted_k_values)
+
+            # Count neighbours per (record, smallest k containing neighbour).
+            overlaps: np.ndarray = np.bincount(
+                records * (num_k_values + 1) + np.searchsorted(sorted_k_values, max_ranks, side="left"),
+                minlength=self._num_records * (num_k_values + 1)
+            ).reshape((self._num_records, num_k_values + 1))
+
+            return np.cumsum(overlaps[:, :num_k_values], axis=1)[:, k_value_indices.ravel()]
+
+        return CorankingMatrix.count_pointwise_neighbourhood_overlaps(
+            self._high_dim_ranking, self._low_dim_ranking, k_values
+        )
+
+    @staticmethod
+    def count_pointwise_neighbourhood_overlaps(
+            high_dim_ranking: np.ndarray, low_dim_ranking: np.ndarray, k_values: list, chunk_size: int = 2 ** 22
+    ) -> np.ndarray:
+        """
+        Computes pointwise neighbourhood overlaps directly from row-wise rankings in O(n^2) for all k at once. A
+        neighbour j of record i counts towards k if both its ranks are in [1, k], i. e. if 1 <= min(ranks) and
+        max(ranks) <= k.
+        :param high_dim_ranking: n x n neighbourhood ranking in high-dimensional space.
+        :param low_dim_ranking: n x n neighbourhood ranking in low-dimensional space.
+        :param k_values: The neighbourhood sizes to sample.
+        :param chunk_size: Approximate number of ranking elements to process at once. Bounds temporary memory.
+        :return: Matrix of shape (number of records, number of k values) holding neighbourhood overlaps.
+        """
+
+        n, m = high_dim_ranking.shape
+        sorted_k_values, k_value_indices = np.unique(np.asarray(k_values, dtype=np.int64), return_inverse=True)
+        num_k_values: int = len(sorted_k_values)
+        overlaps: np.ndarray = np.zeros((n, num_k_values + 1), dtype=np.int64)
+        num_rows_per_chunk: int = max(1, chunk_size // max(m, 1))
+
+        for first_row in range(0, n, num_rows_per_chunk):
+            rows: slice = slice(first_row, min(first_row + num_rows_per_chunk, n))
+            high_dim_chunk: np.ndarray = high_dim_ranking[rows]
+            low_dim_chunk: np.ndarray = low_dim_ranking[rows]
+
+            # Index of smallest k containing this neighbour in both rankings. Auto-referential entries (rank 0) are
+            # moved past the largest k.
+            k_bins: np.ndarray = np.searchsorted(
+                sorted_k_values, np.maximum(high_dim_chunk, low_dim_chunk), side="left"
+            )
+            k_bins[np.minimum(high_dim_chunk, low_dim_chunk) == 0] = num_k_values
+
+            # Count neighbours per (record, smallest k) with one bincount over offset indices.
+            num_rows: int = high_dim_chunk.shape[0]
+            k_bins += (np.arange(num_rows) * (num_k_values + 1))[:, None]
+            overlaps[rows] = np.bincount(
+                k_bins.ravel(), minlength=num_rows * (num_k_values + 1)
+            ).reshape((num_rows, num_k_values + 1))
+
+        # Neighbours contained in neighbourhood k are contained in all larger neighbourhoods as well.
+        return np.cumsum(overlaps[:, :num_k_values], axis=1)[:, k_value_indices.ravel()]
+
     def create_pointwise_coranking_matrix_generator(self, indices: list = None):
         """
         Creates a generator yielding one pointwise
@@ -295,6 +602,8 @@ class CorankingMatrix:
         :return:
         """
 
+        assert not self.is_truncated, "Pointwise coranking matrices require full neighbourhood rankings."
+
         n, m = self._matrix.shape
         indices = indices if indices is not None else [i for i in range(0, n)]
 
@@ -322,14 +631,18 @@ class CorankingMatrix:
     def compute_pairwise_displacement_data(
             original_distance_matrix_file_path: str,
             original_neighbour_ranking_file_path: str,
-            low_dim_projection_data: np.ndarray
+            low_dim_projection_data: np.ndarray,
+            original_neighbours: np.ndarray = None
     ) -> pd.DataFrame:
         """
         Computes pairwise displacement data, i. e. data needed for Shepard diagram (pairwise distances between records
         in high- and low-dimensional space) and coranking matrix for this low-dimensional embedding.
-        :param original_distance_matrix_file_path:
-        :param original_neighbour_ranking_file_path:
+        :param original_distance_matrix_file_path: Path to .npy file stored with Utils.persist_array().
+        :param original_neighbour_ranking_file_path: Path to .npy file stored with Utils.persist_array(). Not used if
+        original_neighbours is set.
         :param low_dim_projection_data:
+        :param original_neighbours: Indices of each record's max_k nearest neighbours in high-dimensional space, for
+        datasets generated in truncated mode (see NeighbourhoodGraph). Ranks beyond max_k are then set to max_k + 1.
         :return: Dict of pd.DataFrames with records like [
             record index 1,
             record index 2,
@@ -348,10 +661,10 @@ class CorankingMatrix:
         # 1. Load files.
         ###############################################
 
-        with open(original_neighbour_ranking_file_path, "rb") as file:
-            original_neighbour_ranking: np.ndarray = pickle.load(file)
-        with open(original_distance_matrix_file_path, "rb") as file:
-            original_distance_matrices: np.ndarray = pickle.load(file)
+        # Arrays are memory-mapped, so concurrent requests share the same pages instead of loading their own copies.
+        original_neighbour_ranking: np.ndarray = Utils.load_array(original_neighbour_ranking_file_path) \
+            if original_neighbours is None else None
+        original_distance_matrices: np.ndarray = Utils.load_array(original_distance_matrix_file_path)
 
         ###############################################
         # 2. Compute coranking and distance matrices
@@ -365,7 +678,9 @@ class CorankingMatrix:
             high_dimensional_data=None,
             low_dimensional_data=low_dim_projection_data,
             distance_metric=None,
-            high_dimensional_neighbourhood_ranking=original_neighbour_ranking
+            high_dimensional_neighbourhood_ranking=original_neighbour_ranking,
+            high_dimensional_neighbours=original_neighbours,
+            max_k=original_neighbours.shape[1] if original_neighbours is not None else None
         ).record_bin_indices
 
         # 2. Gather distance values, merge with existing dataframes (note that index sequence is identical, since
@@ -389,32 +704,68 @@ class CorankingMatrix:
         return pairwise_displacement_data
 
     @staticmethod
-    def bin_coranking_matrix_data(pairwise_displacement_data: pd.DataFrame, n_bins: int = 10):
+    def bin_coranking_matrix_data(pairwise_displacement_data: pd.DataFrame, n_bins: int = 10) -> pd.DataFrame:
         """
         Bins pairwise displacement data into format easily usable for co-ranking matrix visualization.
         :param pairwise_displacement_data:
         :param n_bins:
-        :return:
+        :return: pd.DataFrame with one record per bin like [high-dim. neighbour bin, low-dim. neighbour bin, list of
+        (source, neighbour) tuples].
         """
 
-        df: pd.DataFrame = pairwise_displacement_data
+        offsets, sources, neighbours = CorankingMatrix.bin_coranking_matrix_paths(pairwise_displacement_data, n_bins)
+        # Convert to Python objects at once, which is considerably faster than converting per bin.
+        paths: list = list(zip(sources.tolist(), neighbours.tolist()))
 
-        # Prepare binned coranking matrix
-        df["high_dim_neighbour_bin"] = pd.cut(
-            df.high_dim_neighbour_rank, bins=n_bins, labels=[i for i in range(n_bins)]
-        )
-        df["low_dim_neighbour_bin"] = pd.cut(df.low_dim_neighbour_rank, bins=n_bins, labels=[i for i in range(n_bins)])
+        return pd.DataFrame({
+            "high_dim_neighbour_bin": np.repeat(np.arange(n_bins), n_bins),
+            "low_dim_neighbour_bin": np.tile(np.arange(n_bins), n_bins),
+            "paths": [paths[offsets[i]:offsets[i + 1]] for i in range(n_bins ** 2)]
+        })
 
-        grouped: pd.DataFrame = df.groupby(["high_dim_neighbour_bin", "low_dim_neighbour_bin"])
-        res: pd.DataFrame = pd.DataFrame(
-            {"source": grouped["source"].apply(list), "neighbour": grouped["neighbour"].apply(list)}
-        )
+    @staticmethod
+    def bin_coranking_matrix_paths(
+            pairwise_displacement_data: pd.DataFrame, n_bins: int = 10
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Groups record pairs by their bin in binned co-ranking matrix. Bins are ordered by high- and then by low-dim.
+        neighbour bin, pairs within a bin keep their order in pairwise_displacement_data.
+        :param pairwise_displacement_data:
+        :param n_bins: Number of bins per axis.
+        :return: Offsets of bins (n_bins ** 2 + 1 entries), source record indices, neighbour record indices. Pairs in
+        bin i are at positions offsets[i] to offsets[i + 1] (exclusive) in source and neighbour record indices.
+        """
 
-        res["paths"] = res.apply(
-            lambda x: list(
-                map(tuple, np.stack([x.source, x.neighbour], axis=1).tolist())
-            ) if type(x.source) == list else [],
-            axis=1
+        bin_ids: np.ndarray = \
+            CorankingMatrix._bin_neighbour_ranks(pairwise_displacement_data.high_dim_neighbour_rank.values, n_bins) * \
+            n_bins + \
+            CorankingMatrix._bin_neighbour_ranks(pairwise_displacement_data.low_dim_neighbour_rank.values, n_bins)
+        order: np.ndarray = np.argsort(bin_ids, kind="stable")
+
+        return (
+            np.concatenate([[0], np.cumsum(np.bincount(bin_ids, minlength=n_bins ** 2))]),
+            pairwise_displacement_data.source.values[order],
+            pairwise_displacement_data.neighbour.values[order]
         )
 
-        return res[["paths"]].reset_index()
+    @staticmethod
+    def _bin_neighbour_ranks(ranks: np.ndarray, n_bins: int) -> np.ndarray:
+        """
+        Assigns neighbour ranks to equal-width bins. Bins are identical to those of pd.cut(ranks, bins=n_bins), i. e.
+        right-closed and spanning the range of ranks, with the lowest edge lowered by 0.1% of the range.
+        :param ranks:
+        :param n_bins:
+        :return: Bin index per rank.
+        """
+
+        min_rank: float = float(ranks.min()) if len(ranks) else 0
+        max_rank: float = float(ranks.max()) if len(ranks) else 0
+        # Like pd.cut, widen range if all ranks are equal. Lowering the lowest edge doesn't change any bin index, so
+        # it's skipped.
+        if min_rank == max_rank:
+            adjustment: float = 0.001 * abs(min_rank) if min_rank != 0 else 0.001
+            min_rank, max_rank = min_rank - adjustment, max_rank + adjustment
+        inner_edges: np.ndarray = np.linspace(min_rank, max_rank, n_bins + 1)[1:-1]
+
+        # Use smallest type holding combined bin indices of both axes.
+        return np.searchsorted(inner_edges, ranks, side="left").astype(np.min_scalar_type(n_bins ** 2 - 1))
@@ -1,13 +1,17 @@
 import numpy
 from .TopologyPreservationObjective import TopologyPreservationObjective
 from .CorankingMatrix import CorankingMatrix
+from objectives.ObjectiveRegistry import ObjectiveRegistry
 
 
+@ObjectiveRegistry.register("b_nx")
 class CorankingMatrixBehaviourCriterion(TopologyPreservationObjective):
     """
     Calculates coranking matrix quality criterion (Q_nx).
     """
 
+    INTERMEDIATES: tuple = ("coranking_matrix",)
+
     def __init__(
             self,
             low_dimensional_data: numpy.ndarray,
@@ -26,6 +30,13 @@ class CorankingMatrixBehaviourCriterion(TopologyPreservationObjective):
             coranking_matrix=coranking_matrix
         )
 
+    @classmethod
+    def from_intermediates(cls, intermediates) -> "CorankingMatrixBehaviourCriterion":
+        return cls(
+            low_dimensional_data=intermediates.low_dimensional_data,
+            coranking_matrix=intermediates.coranking_matrix
+        )
+
     def compute(self):
         """
         Calculates objective.
@@ -37,24 +48,14 @@ class CorankingMatrixBehaviourCriterion(TopologyPreservationObjective):
         # 1. Prepare coranking matrix data.
         ########################################
 
-        Q = self._coranking_matrix.matrix()
         # We retrieve the number of points
-        n = Q.shape[0]
+        n = self._coranking_matrix.summary().n
 
         ########################################
         # 2. Pick k values to sample.
         ########################################
 
-        # Pick immediate neighbourhood + 4 equidistant values of k beyond that for sampling purposes.
-        # Pick 10-percentile neighbourhood for k (arbitray choice).
-        k_samples = [1, 5, 10]
-        k_samples.extend(numpy.linspace(
-            start=1,
-            stop=n - 2,
-            num=4,
-            endpoint=False,
-            dtype=numpy.int
-        ))
+        k_samples = self._sample_neighbourhood_sizes(n)
 
         ########################################
         # 3. Calculate AUC for b_nx.
@@ -1,13 +1,18 @@
 import numpy
 from .TopologyPreservationObjective import TopologyPreservationObjective
 from .CorankingMatrix import CorankingMatrix
+from objectives.ObjectiveRegistry import ObjectiveRegistry
+from .CorankingMatrixSummary import CorankingMatrixSummary
 
 
+@ObjectiveRegistry.register("r_nx")
 class CorankingMatrixQualityCriterion(TopologyPreservationObjective):
     """
     Calculates coranking matrix quality criterion (R_nx).
     """
 
+    INTERMEDIATES: tuple = ("coranking_matrix",)
+
     def __init__(
             self,
             low_dimensional_data: numpy.ndarray,
@@ -26,6 +31,13 @@ class CorankingMatrixQualityCriterion(TopologyPreservationObjective):
             coranking_matrix=coranking_matrix
         )
 
+    @classmethod
+    def from_intermediates(cls, intermediates) -> "CorankingMatrixQualityCriterion":
+        return cls(
+            low_dimensional_data=intermediates.low_dimensional_data,
+            coranking_matrix=intermediates.coranking_matrix
+        )
+
     def compute(self):
         """
         Calculates objective.
@@ -37,55 +49,29 @@ class CorankingMatrixQualityCriterion(TopologyPreservationObjective):
         # 1. Prepare coranking matrix data.
         ########################################
 
-        Q = self._coranking_matrix.matrix()
+        summary: CorankingMatrixSummary = self._coranking_matrix.summary()
         # We retrieve the number of points
-        n = Q.shape[0]
-        # We compute the values
-        vals = Q
+        n = summary.n
 
         ########################################
         # 2. Pick k values to sample.
         ########################################
 
-        # Pick immediate neighbourhood + 4 equidistant values of k beyond that for sampling purposes.
-        k_samples = [1, 5, 10]
-        k_samples.extend(numpy.linspace(
-            start=1,
-            stop=n - 2,
-            num=4,
-            endpoint=False,
-            dtype=numpy.int
-        ))
+        k_samples = self._sample_neighbourhood_sizes(n)
 
         ########################################
         # 3. Calculate AUC for r_nx.
         ########################################
 
         auc_r_nx = 0
-        # We compute the mask.
-        mask = numpy.zeros([n, n])
 
         # Range for k is (1, n - 2) - see https://www-sciencedirect-com/science/article/pii/S0925231215003641 for
         # derivation.
         for k in k_samples:
-            mask[:k, :k] = 1.
-            # We compute the normalization constant.
-            norm = k * (n + 1.)
-
-            # We finally compute the measures.
-            # Note: This calculates q_nx.
-            q_nx = (vals * mask).sum() / float(norm)
-
-            # Calculate r_nx.
-            r_nx = ((n - 1) * q_nx - k) / (n - 1 - k)
-
             # See p. 253, bottom right, on
             # https://www-sciencedirect-com.uaccess.univie.ac.at/science/article/pii/S0925231215003641 on equation.
             # Note that AUC here is just a weighted average! Has to be divided by the number of k-ary neighbourhoods
             # considered.
-            auc_r_nx += r_nx / k
-
-            # Reset mask.
-            mask[:k, :k] = 0.
+            auc_r_nx += summary.r_nx(k) / k
 
         return auc_r_nx / sum([1 / k for k in k_samples])
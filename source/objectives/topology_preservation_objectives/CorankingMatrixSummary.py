@@ -0,0 +1,122 @@
+import numpy as np
+
+
+class CorankingMatrixSummary:
+    """
+    Cumulative sums over a co-ranking matrix. Allows to evaluate Q_nx, R_nx, B_nx, intrusion and extrusion for every
+    neighbourhood size k in O(1) after a single O(n^2) pass over the matrix.
+    Definitions follow https://github.com/gdkrmr/coRanking.
+    """
+
+    def __init__(self, matrix: np.ndarray, n: int = None):
+        """
+        Computes cumulative sums for all neighbourhood sizes covered by the specified co-ranking matrix.
+        :param matrix: Co-ranking matrix without auto-referential ranks, i. e. matrix[x - 1, y - 1] counts record pairs
+        with high-dimensional rank x and low-dimensional rank y. Can also be the upper left K x K block of such a
+        matrix, in which case all quantities are available for k <= K.
+        :param n: Number of rows in the full co-ranking matrix. Only needed if matrix is a truncated block.
+        """
+
+        self._n: int = n if n is not None else matrix.shape[0]
+        self._max_k: int = matrix.shape[0]
+
+        # Sums over the upper left k x k block (i. e. the diagonal of the 2-D prefix sum of Q) are assembled from sums
+        # over its upper triangle (intrusions and hits) and its lower triangle (extrusions and hits). Growing the
+        # block from k - 1 to k adds column k - 1 to the upper and row k - 1 to the lower triangle.
+        # Entry k refers to the block of size k, entry 0 to the empty block.
+        self._upper_triangle_sums: np.ndarray = np.concatenate(([0], np.cumsum(np.triu(matrix).sum(axis=0))))
+        self._lower_triangle_sums: np.ndarray = np.concatenate(([0], np.cumsum(np.tril(matrix).sum(axis=1))))
+        self._diagonal_sums: np.ndarray = np.concatenate(([0], np.cumsum(np.diagonal(matrix))))
+        self._block_sums: np.ndarray = self._upper_triangle_sums + self._lower_triangle_sums - self._diagonal_sums
+
+    @property
+    def n(self) -> int:
+        return self._n
+
+    @property
+    def max_k(self) -> int:
+        """
+        Returns largest neighbourhood size available.
+        :return:
+        """
+        return self._max_k
+
+    def _normalize(self, sums: np.ndarray, k):
+        """
+        Normalizes sums over k-ary neighbourhoods.
+        :param sums: Cumulative sums indexed by k.
+        :param k: Neighbourhood size(s), either scalar or array-like.
+        :return: Normalized values for each k.
+        """
+
+        k = np.asarray(k)
+        assert np.all((k >= 1) & (k <= self._max_k)), "k has to be in [1, " + str(self._max_k) + "]."
+
+        return sums[k] / (k * (self._n + 1.))
+
+    def q_nx(self, k):
+        """
+        Computes quality criterion Q_nx(k), i. e. the fraction of preserved k-ary neighbourhoods.
+        :param k: Neighbourhood size(s), either scalar or array-like.
+        :return:
+        """
+        return self._normalize(self._block_sums, k)
+
+    def r_nx(self, k):
+        """
+        Computes Q_nx(k) rescaled w. r. t. random embeddings (R_nx(k)). Defined for k < n - 1.
+        See p. 253 on https://www.sciencedirect.com/science/article/pii/S0925231215003641.
+        :param k: Neighbourhood size(s), either scalar or array-like.
+        :return:
+        """
+
+        k = np.asarray(k)
+        return ((self._n - 1) * self.q_nx(k) - k) / (self._n - 1 - k)
+
+    def intrusion(self, k):
+        """
+        Computes fraction of intrusions, i. e. of neighbours ranked closer in low- than in high-dimensional space.
+        :param k: Neighbourhood size(s), either scalar or array-like.
+        :return:
+        """
+        return self._normalize(self._upper_triangle_sums, k)
+
+    def extrusion(self, k):
+        """
+        Computes fraction of extrusions, i. e. of neighbours ranked closer in high- than in low-dimensional space.
+        :param k: Neighbourhood size(s), either scalar or array-like.
+        :return:
+        """
+        return self._normalize(self._lower_triangle_sums, k)
+
+    def b_nx(self, k):
+        """
+        Computes behaviour criterion B_nx(k) (intrusive if > 0, extrusive otherwise).
+        :param k: Neighbourhood size(s), either scalar or array-like.
+        :return:
+        """
+        return self.intrusion(k) - self.extrusion(k)
+
+    def neighbourhood_sizes(self) -> np.ndarray:
+        """
+        Returns all neighbourhood sizes for which R_nx is defined and available.
+        :return:
+        """
+        return np.arange(1, min(self._max_k, self._n - 2) + 1)
+
+    def curves(self) -> dict:
+        """
+        Evaluates all criteria for every available neighbourhood size.
+        :return: Dictionary with k and one array per criterion.
+        """
+
+        k: np.ndarray = self.neighbourhood_sizes()
+
+        return {
+            "k": k,
+            "q_nx": self.q_nx(k),
+            "r_nx": self.r_nx(k),
+            "b_nx": self.b_nx(k),
+            "intrusion": self.intrusion(k),
+            "extrusion": self.extrusion(k)
+        }
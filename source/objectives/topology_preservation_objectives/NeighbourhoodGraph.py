@@ -0,0 +1,217 @@
+import hashlib
+import os
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+from .CorankingMatrix import CorankingMatrix
+
+
+class NeighbourhoodGraph:
+    """
+    k-nearest neighbour graph of a dataset, i. e. the indices of each record's max_k nearest neighbours ordered by
+    distance. Built once per dataset and used by CorankingMatrix in truncated mode instead of a dense neighbourhood
+    ranking.
+    Supported methods:
+        - "exact": np.argpartition over rows of a precomputed distance matrix.
+        - "balltree": Exact queries against a ball tree built on the features.
+        - "nndescent": Approximate queries against an NN-descent index (requires pynndescent).
+    Stored graphs carry a fingerprint of the data they were built from (see compute_fingerprint()), so that they are
+    not reused for a different version of the dataset.
+    """
+
+    METHODS: tuple = ("exact", "balltree", "nndescent")
+    # Methods yielding exact neighbourhoods, which can be used interchangeably.
+    EXACT_METHODS: tuple = ("exact", "balltree")
+
+    def __init__(self, neighbours: np.ndarray, distances: np.ndarray, method: str, fingerprint: str = None):
+        """
+        Initializes graph with precomputed neighbourhoods. Use from_distance_matrix(), from_data() or load() to create
+        new instances.
+        :param neighbours: n x max_k matrix with element (x, y) denoting the index of record x's (y + 1)-th nearest
+        neighbour. Records are not considered their own neighbours.
+        :param distances: n x max_k matrix with corresponding distances.
+        :param method: Method used to build graph.
+        :param fingerprint: Fingerprint of data graph was built from. See compute_fingerprint().
+        """
+
+        assert method in NeighbourhoodGraph.METHODS, "Method " + method + " not supported."
+
+        self._neighbours: np.ndarray = neighbours
+        self._distances: np.ndarray = distances
+        self._method: str = method
+        self._fingerprint: str = fingerprint
+
+    @property
+    def max_k(self) -> int:
+        return self._neighbours.shape[1]
+
+    @property
+    def method(self) -> str:
+        return self._method
+
+    @property
+    def fingerprint(self) -> str:
+        return self._fingerprint
+
+    @fingerprint.setter
+    def fingerprint(self, fingerprint: str):
+        self._fingerprint = fingerprint
+
+    @staticmethod
+    def compute_fingerprint(data: np.ndarray) -> str:
+        """
+        Computes fingerprint of data a graph is built from.
+        :param data: Feature or distance matrix. Can be memory-mapped.
+        :return: Number of records and SHA-1 hash of data.
+        """
+
+        return str(len(data)) + "_" + hashlib.sha1(np.ascontiguousarray(data).view(np.uint8).ravel()).hexdigest()
+
+    def is_compatible(self, max_k: int, method: str, fingerprint: str) -> bool:
+        """
+        Checks whether graph can be used in place of a graph built with the specified configuration, i. e. whether it
+        holds enough neighbours, was built from the same data and is exact if an exact method was requested.
+        :param max_k: Minimal number of neighbours per record.
+        :param method: Requested method.
+        :param fingerprint: Fingerprint of current data.
+        :return:
+        """
+
+        return self.max_k >= max_k and self._fingerprint == fingerprint and (
+            self._method == method or
+            (self._method in NeighbourhoodGraph.EXACT_METHODS and method in NeighbourhoodGraph.EXACT_METHODS)
+        )
+
+    def neighbours(self, max_k: int = None) -> np.ndarray:
+        """
+        Returns indices of each record's max_k nearest neighbours.
+        :param max_k: Number of neighbours to return per record. Defaults to all available neighbours.
+        :return: n x max_k matrix of neighbour indices.
+        """
+
+        max_k = max_k if max_k is not None else self.max_k
+        assert max_k <= self.max_k, "Graph only holds " + str(self.max_k) + " neighbours per record."
+
+        return self._neighbours[:, :max_k]
+
+    def distances(self, max_k: int = None) -> np.ndarray:
+        """
+        Returns distances to each record's max_k nearest neighbours.
+        :param max_k: Number of neighbours to return per record. Defaults to all available neighbours.
+        :return: n x max_k matrix of distances.
+        """
+
+        return self._distances[:, :max_k if max_k is not None else self.max_k]
+
+    @staticmethod
+    def from_distance_matrix(distance_matrix: np.ndarray, max_k: int) -> "NeighbourhoodGraph":
+        """
+        Builds exact graph from precomputed distance matrix.
+        :param distance_matrix:
+        :param max_k: Number of neighbours per record.
+        :return:
+        """
+
+        neighbours: np.ndarray = CorankingMatrix.generate_truncated_neighbourhood(distance_matrix, max_k)
+
+        return NeighbourhoodGraph(
+            neighbours,
+            np.vstack([distance_matrix[i, neighbours[i]] for i in range(len(neighbours))]),
+            "exact"
+        )
+
+    @staticmethod
+    def from_data(
+            data: np.ndarray, max_k: int, method: str = "balltree", distance_metric: str = "euclidean"
+    ) -> "NeighbourhoodGraph":
+        """
+        Builds graph by indexing records' features.
+        :param data: Feature matrix.
+        :param max_k: Number of neighbours per record.
+        :param method: "balltree" or "nndescent".
+        :param distance_metric:
+        :return:
+        """
+
+        assert method in ("balltree", "nndescent"), "Method " + method + " not supported for feature data."
+
+        if method == "balltree":
+            # Querying without passing data excludes each record from its own neighbourhood.
+            distances, neighbours = NearestNeighbors(
+                n_neighbors=max_k, algorithm="ball_tree", metric=distance_metric
+            ).fit(data).kneighbors()
+
+            return NeighbourhoodGraph(neighbours, distances, method)
+
+        # pynndescent is only required for approximate graphs, hence it's imported here.
+        import pynndescent
+
+        # Query one additional neighbour, since records are included in their own neighbourhoods.
+        neighbours, distances = pynndescent.NNDescent(
+            data, n_neighbors=max_k + 1, metric=distance_metric
+        ).neighbor_graph
+        is_auto_referential: np.ndarray = neighbours == np.arange(len(neighbours))[:, None]
+        # Drop most distant neighbour for records not found in their own neighbourhood.
+        is_auto_referential[~is_auto_referential.any(axis=1), -1] = True
+
+        return NeighbourhoodGraph(
+            neighbours[~is_auto_referential].reshape((len(neighbours), max_k)),
+            distances[~is_auto_referential].reshape((len(neighbours), max_k)),
+            method
+        )
+
+    def save(self, file_path: str):
+        """
+        Stores graph as .npz file.
+        :param file_path:
+        """
+
+        np.savez(
+            file_path,
+            neighbours=self._neighbours,
+            distances=self._distances,
+            method=self._method,
+            fingerprint=self._fingerprint if self._fingerprint is not None else ""
+        )
+
+    @staticmethod
+    def load(file_path: str) -> "NeighbourhoodGraph":
+        """
+        Loads graph stored with save().
+        :param file_path:
+        :return:
+        """
+
+        with np.load(file_path) as graph_data:
+            # Graphs stored before fingerprints were introduced have none.
+            fingerprint: str = str(graph_data["fingerprint"]) if "fingerprint" in graph_data.files else ""
+
+            return NeighbourhoodGraph(
+                graph_data["neighbours"],
+                graph_data["distances"],
+                str(graph_data["method"]),
+                fingerprint if fingerprint else None
+            )
+
+    @staticmethod
+    def load_or_build(file_path: str, max_k: int, method: str, fingerprint: str, build) -> "NeighbourhoodGraph":
+        """
+        Loads graph from file, if it exists and is compatible with the requested configuration (see is_compatible()).
+        Builds and stores it otherwise.
+        :param file_path:
+        :param max_k: Minimal number of neighbours per record.
+        :param method: Requested method.
+        :param fingerprint: Fingerprint of data graph is built from. See compute_fingerprint().
+        :param build: Callable returning a new NeighbourhoodGraph with max_k neighbours per record.
+        :return:
+        """
+
+        if os.path.isfile(file_path):
+            graph: NeighbourhoodGraph = NeighbourhoodGraph.load(file_path)
+            if graph.is_compatible(max_k, method, fingerprint):
+                return graph
+
+        graph = build()
+        graph.fingerprint = fingerprint
+        graph.save(file_path)
+
+        return graph
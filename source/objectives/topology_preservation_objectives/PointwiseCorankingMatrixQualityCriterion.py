@@ -1,14 +1,18 @@
 import numpy
 from .TopologyPreservationObjective import TopologyPreservationObjective
 from .CorankingMatrix import CorankingMatrix
+from objectives.ObjectiveRegistry import ObjectiveRegistry
 import numpy as np
 
 
+@ObjectiveRegistry.register("pointwise_quality_values")
 class PointwiseCorankingMatrixQualityCriterion(TopologyPreservationObjective):
     """
     Calculates pointwise coranking matrix quality criterion (q_nx).
     """
 
+    INTERMEDIATES: tuple = ("coranking_matrix",)
+
     def __init__(
             self,
             low_dimensional_data: numpy.ndarray,
@@ -27,6 +31,13 @@ class PointwiseCorankingMatrixQualityCriterion(TopologyPreservationObjective):
             coranking_matrix=coranking_matrix
         )
 
+    @classmethod
+    def from_intermediates(cls, intermediates) -> "PointwiseCorankingMatrixQualityCriterion":
+        return cls(
+            low_dimensional_data=intermediates.low_dimensional_data,
+            coranking_matrix=intermediates.coranking_matrix
+        )
+
     def compute(self) -> np.ndarray:
         """
         Calculates objective.
@@ -40,38 +51,20 @@ class PointwiseCorankingMatrixQualityCriterion(TopologyPreservationObjective):
 
         # Nuber of points.
         num_points: int = self._low_dimensional_data.shape[0]
-        # Counter.
-        i: int = 0
         # k for which to compute q_nx(k).
-        k_samples: list = [1, 5, 10]
-        k_samples.extend(numpy.linspace(
-            start=1,
-            stop=num_points - 2,
-            num=4,
-            endpoint=False,
-            dtype=numpy.int
-        ))
-
-        # Vector with all q_nx_i results for point with index i in (i).
-        q_nx_i: np.ndarray = numpy.zeros([num_points, 1])
+        k_samples: list = self._sample_neighbourhood_sizes(num_points)
 
         ########################################
         # 2. Compute pointwise q_nx_i.
         ########################################
 
-        # Generate mask matrix.
-        mask: np.ndarray = numpy.zeros([num_points - 2, num_points - 2])
-
-        # Compute q_nx_i(k).
-        for Q_i in self._coranking_matrix.create_pointwise_coranking_matrix_generator():
-            for k in k_samples:
-                mask[:k, :k] = 1.
-
-                # For equation see http://www.cs.rug.nl/biehl/Preprints/2012-esann-quality.pdf (section 4).
-                q_nx_i[i] += (Q_i * mask).sum() / float(k)
+        # Number of neighbours in both the high- and the low-dimensional k-ary neighbourhood of each point, i. e. the
+        # sum over the upper left k x k block of each point's pointwise co-ranking matrix.
+        neighbourhood_overlaps: np.ndarray = self._coranking_matrix.pointwise_neighbourhood_overlaps(k_samples)
 
-                # Reset mask.
-                mask[:k, :k] = 0
-            i += 1
+        # For equation see http://www.cs.rug.nl/biehl/Preprints/2012-esann-quality.pdf (section 4).
+        q_nx_i: np.ndarray = (
+            neighbourhood_overlaps / numpy.asarray(k_samples, dtype=float)
+        ).sum(axis=1).reshape((num_points, 1))
 
         return q_nx_i / len(k_samples)
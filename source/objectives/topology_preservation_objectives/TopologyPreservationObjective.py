@@ -43,6 +43,26 @@ class TopologyPreservationObjective(DimensionalityReductionObjective):
             distance_metric=distance_metric
         )
 
+    def _sample_neighbourhood_sizes(self, n: int) -> list:
+        """
+        Picks immediate neighbourhood + 4 equidistant values of k beyond that for sampling purposes. Values are limited
+        to the neighbourhood sizes covered by the coranking matrix.
+        :param n: Number of points.
+        :return: List of k values to sample.
+        """
+
+        max_k: int = min(n - 2, self._coranking_matrix.max_k)
+        k_samples: list = [k for k in [1, 5, 10] if k <= max_k]
+        k_samples.extend(numpy.linspace(
+            start=1,
+            stop=max_k,
+            num=4,
+            endpoint=False,
+            dtype=int
+        ))
+
+        return k_samples
+
     @abc.abstractmethod
     def compute(self):
         """
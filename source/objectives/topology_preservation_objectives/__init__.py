@@ -1,4 +1,6 @@
 from .CorankingMatrix import CorankingMatrix
+from .CorankingMatrixSummary import CorankingMatrixSummary
+from .NeighbourhoodGraph import NeighbourhoodGraph
 from .CorankingMatrixBehaviourCriterion import CorankingMatrixBehaviourCriterion
 from .CorankingMatrixQualityCriterion import CorankingMatrixQualityCriterion
 from .PointwiseCorankingMatrixQualityCriterion import PointwiseCorankingMatrixQualityCriterion
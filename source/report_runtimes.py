@@ -0,0 +1,59 @@
+import argparse
+import pandas as pd
+from tables import *
+
+from utils import Utils
+
+
+def compile_runtime_report(metadata: pd.DataFrame, group_by: str = None) -> pd.DataFrame:
+    """
+    Summarizes how data generation time is distributed across stages (DR fit, intermediates and objectives).
+    :param metadata: Metadata table of .h5 file with embeddings.
+    :param group_by: Name of hyperparameter to break down stage costs by. Optional.
+    :return: Dataframe with one row per stage (or per group and stage) holding statistics of its runtime across models
+    and its share of total generation time.
+    """
+
+    # The DR fit is recorded as "runtime", all other stages as "runtime_<stage>".
+    runtime_cols: list = [col for col in metadata.columns if col.startswith("runtime_")]
+    assert len(runtime_cols), "File doesn't contain runtimes per stage."
+    runtimes: pd.DataFrame = metadata[["runtime", *runtime_cols]].rename(
+        columns={"runtime": "dr_fit", **{col: col[len("runtime_"):] for col in runtime_cols}}
+    )
+
+    groups = [(None, runtimes)] if group_by is None else runtimes.groupby(metadata[group_by])
+    reports: list = []
+
+    for group_value, group_runtimes in groups:
+        report: pd.DataFrame = group_runtimes.describe(percentiles=[0.5, 0.9]).T[
+            ["mean", "50%", "90%", "max"]
+        ].rename(columns={"50%": "median", "90%": "p90"})
+        report["total"] = group_runtimes.sum()
+        report["share"] = report["total"] / report["total"].sum()
+        if group_by is not None:
+            report.insert(0, group_by, group_value)
+        reports.append(report.sort_values("total", ascending=False))
+
+    return pd.concat(reports)
+
+
+if __name__ == '__main__':
+    logger = Utils.create_logger()
+
+    argument_parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Reports distribution of data generation time across stages for a .h5 file with embeddings."
+    )
+    argument_parser.add_argument("file_path", help="Path to .h5 file with embeddings.")
+    argument_parser.add_argument("--by", default=None, help="Hyperparameter to break down stage costs by.")
+    args: argparse.Namespace = argument_parser.parse_args()
+
+    h5file: File = open_file(filename=args.file_path, mode="r")
+    metadata: pd.DataFrame = pd.DataFrame(h5file.root.metadata[:]).set_index("id")
+    h5file.close()
+
+    logger.info("Runtimes per stage in seconds for " + str(len(metadata)) + " models:")
+    with pd.option_context(
+        "display.max_rows", None, "display.max_columns", None, "display.width", 160,
+        "display.float_format", "{:.4f}".format
+    ):
+        print(compile_runtime_report(metadata, args.by))
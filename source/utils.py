@@ -2,9 +2,12 @@ import logging
 from contextlib import contextmanager
 import sys
 import os
+import pickle
+import json
+import struct
 import dropbox
 from dropbox.files import WriteMode as DropboxWriteMode
-from typing import List
+from typing import List, Tuple
 
 import pandas as pd
 import numpy as np
@@ -63,6 +66,107 @@ class Utils:
                 sys.stdout = old_stdout
                 sys.stderr = old_stderr
 
+    @staticmethod
+    def persist_array(file_path: str, array: np.ndarray, dtype: np.dtype = None) -> np.ndarray:
+        """
+        Stores array as .npy file, which can be memory-mapped by readers instead of being loaded into memory.
+        :param file_path: Path to .npy file.
+        :param array:
+        :param dtype: Type to cast array to before storing it. Keeps original type if None.
+        :return: Read-only, memory-mapped version of stored array.
+        """
+
+        np.save(file_path, array if dtype is None else array.astype(dtype, copy=False))
+
+        return Utils.load_array(file_path)
+
+    @staticmethod
+    def find_array_file(file_path: str) -> str:
+        """
+        Finds file holding array stored with persist_array(). Falls back to pickled version with same name (as
+        generated by older versions of generate_data.py).
+        :param file_path: Path to .npy file.
+        :return: Path to existing .npy or .pkl file; None if neither exists.
+        """
+
+        for path in (file_path, os.path.splitext(file_path)[0] + ".pkl"):
+            if os.path.isfile(path):
+                return path
+
+        return None
+
+    @staticmethod
+    def load_array(file_path: str) -> np.ndarray:
+        """
+        Loads array stored with persist_array() as read-only memory map, so that processes and threads reading it share
+        the same pages without copying them. Pickled arrays are loaded into memory.
+        :param file_path: Path to .npy file.
+        :return: Array.
+        """
+
+        path: str = Utils.find_array_file(file_path)
+        assert path is not None, "File " + file_path + " does not exist."
+
+        if path.endswith(".pkl"):
+            with open(path, "rb") as file:
+                return pickle.load(file)
+
+        return np.load(path, mmap_mode="r")
+
+    @staticmethod
+    def encode_binary_columns(columns: dict, header: dict = None) -> bytes:
+        """
+        Encodes arrays as compact binary payload, laid out as
+            - length of JSON header in bytes as little-endian uint32,
+            - JSON header (UTF-8),
+            - raw little-endian buffers of all arrays.
+        The header holds the supplied entries and, under "columns", name, dtype (numpy notation, e. g. "<f4"), offset
+        relative to start of first buffer and number of elements of each array. Header and buffers are padded to
+        multiples of 8 bytes, so clients can view buffers as typed arrays (e. g. Float32Array) without copying.
+        :param columns: Dictionary with one-dimensional array per column name.
+        :param header: Additional entries for header.
+        :return: Payload. See decode_binary_columns() for decoding.
+        """
+
+        buffers: list = []
+        column_descriptions: list = []
+        offset: int = 0
+
+        for name, array in columns.items():
+            array = np.ascontiguousarray(array).ravel()
+            array = array.astype(array.dtype.newbyteorder("<"), copy=False)
+            buffer: bytes = array.tobytes()
+            buffers.append(buffer + b"\0" * (-len(buffer) % 8))
+            column_descriptions.append({"name": name, "dtype": array.dtype.str, "offset": offset, "length": len(array)})
+            offset += len(buffers[-1])
+
+        encoded_header: bytes = json.dumps({**(header or {}), "columns": column_descriptions}).encode("utf-8")
+        encoded_header += b" " * (-(len(encoded_header) + 4) % 8)
+
+        return b"".join([struct.pack("<I", len(encoded_header)), encoded_header, *buffers])
+
+    @staticmethod
+    def decode_binary_columns(payload: bytes) -> Tuple[dict, dict]:
+        """
+        Decodes payload created with encode_binary_columns().
+        :param payload:
+        :return: Header; dictionary with array per column name.
+        """
+
+        header_length: int = struct.unpack_from("<I", payload)[0]
+        header: dict = json.loads(payload[4:4 + header_length].decode("utf-8"))
+        buffers_start: int = 4 + header_length
+
+        return header, {
+            column["name"]: np.frombuffer(
+                payload,
+                dtype=np.dtype(column["dtype"]),
+                count=column["length"],
+                offset=buffers_start + column["offset"]
+            )
+            for column in header["columns"]
+        }
+
     @staticmethod
     def preprocess_embedding_metadata_for_predictor(metadata_template: dict, embeddings_metadata: pandas.DataFrame):
         """
@@ -200,7 +304,9 @@ class Utils:
             "original": None,
             "features_preprocessed": None,
             "features_categorical_encoding_translation": None,
-            "labels": None
+            "labels": None,
+            # Scaled features and labels for finding neighbouring models.
+            "neighbourhood_features": None
         }
 
         # Store name of current dataset and kernel. Note that these values is only changed at call of /get_metadata.
@@ -208,6 +314,8 @@ class Utils:
         flask_app.config["DATASET_NAME"] = None
         flask_app.config["DR_KERNEL_NAME"] = "umap"
         flask_app.config["FULL_FILE_NAME"] = "movie"
+        # Maximal neighbourhood size objectives of current file were computed for. None for full neighbourhood rankings.
+        flask_app.config["MAX_K"] = None
 
         # For storage of global, unrestricted model used by local explanations.
         # Has one global regressor for each possible objective.
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("coranking")
+
+from scipy.spatial import distance
+from objectives.topology_preservation_objectives.CorankingMatrix import CorankingMatrix
+from objectives.topology_preservation_objectives.CorankingMatrixSummary import CorankingMatrixSummary
+
+
+def generate_rankings(n: int = 60, seed: int = 0) -> tuple:
+    rng: np.random.RandomState = np.random.RandomState(seed)
+    high_dim_data: np.ndarray = rng.normal(size=(n, 5))
+    low_dim_data: np.ndarray = high_dim_data[:, :2] + rng.normal(scale=0.5, size=(n, 2))
+
+    return (
+        CorankingMatrix.generate_neighbourhood_ranking(distance.squareform(distance.pdist(high_dim_data))),
+        CorankingMatrix.generate_neighbourhood_ranking(distance.squareform(distance.pdist(low_dim_data)))
+    )
+
+
+def test_bincount_matches_histogram2d():
+    high_dim_ranking, low_dim_ranking = generate_rankings()
+    n: int = high_dim_ranking.shape[0]
+
+    Q: np.ndarray = CorankingMatrix.compute_coranking_matrix(high_dim_ranking, low_dim_ranking)
+    expected_Q: np.ndarray = np.zeros((n, n), dtype=np.int64)
+    for high_dim_rank, low_dim_rank in zip(high_dim_ranking.ravel(), low_dim_ranking.ravel()):
+        expected_Q[high_dim_rank, low_dim_rank] += 1
+
+    np.testing.assert_array_equal(Q, expected_Q)
+    np.testing.assert_array_equal(
+        Q, CorankingMatrix.compute_coranking_matrix(high_dim_ranking, low_dim_ranking, method="histogram2d")
+    )
+    # Every record is its own closest neighbour in both spaces.
+    assert Q[0, 0] == n and Q[0, 1:].sum() == Q[1:, 0].sum() == 0
+
+
+def summarize_with_masks(Q: np.ndarray, k_values: list) -> dict:
+    """
+    Original per-k evaluation of criteria by masking the co-ranking matrix.
+    """
+
+    n: int = Q.shape[0]
+    criteria: dict = {"q_nx": [], "r_nx": [], "intrusion": [], "extrusion": []}
+    for k in k_values:
+        norm: float = k * (n + 1.)
+        mask: np.ndarray = np.zeros([n, n])
+        mask[:k, :k] = 1.
+        q_nx: float = (Q * mask).sum() / norm
+        criteria["q_nx"].append(q_nx)
+        criteria["r_nx"].append(((n - 1) * q_nx - k) / (n - 1 - k))
+        mask[:k, :k] = np.triu(np.ones([k, k]))
+        criteria["intrusion"].append((Q * mask).sum() / norm)
+        mask[:k, :k] = np.tril(np.ones([k, k]))
+        criteria["extrusion"].append((Q * mask).sum() / norm)
+
+    return criteria
+
+
+def test_summary_matches_masked_sums():
+    high_dim_ranking, low_dim_ranking = generate_rankings()
+    Q: np.ndarray = CorankingMatrix.compute_coranking_matrix(high_dim_ranking, low_dim_ranking)[1:, 1:]
+    summary: CorankingMatrixSummary = CorankingMatrixSummary(Q)
+    k_values: np.ndarray = summary.neighbourhood_sizes()
+    expected_criteria: dict = summarize_with_masks(Q, k_values.tolist())
+
+    for criterion, expected_values in expected_criteria.items():
+        np.testing.assert_allclose(getattr(summary, criterion)(k_values), expected_values, rtol=1e-12)
+    np.testing.assert_allclose(
+        summary.b_nx(k_values), np.asarray(expected_criteria["intrusion"]) - expected_criteria["extrusion"]
+    )
+
+    # Summary of the upper left block yields the same values for all k within the block.
+    truncated_summary: CorankingMatrixSummary = CorankingMatrixSummary(Q[:10, :10], n=Q.shape[0])
+    np.testing.assert_allclose(truncated_summary.curves()["r_nx"], summary.r_nx(np.arange(1, 11)), rtol=1e-12)
@@ -0,0 +1,92 @@
+import os
+import queue
+import threading
+import multiprocessing
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pytest
+
+# Required by data_generation's package imports.
+pytest.importorskip("MulticoreTSNE")
+pytest.importorskip("umap")
+pytest.importorskip("coranking")
+pytest.importorskip("dropbox")
+pytest.importorskip("lightgbm")
+pytest.importorskip("skrules")
+
+from data_generation.dimensionality_reduction.DimensionalityReductionProcessPool import \
+    DimensionalityReductionProcessPool
+from data_generation.dimensionality_reduction.DimensionalityReductionThread import DimensionalityReductionThread
+
+
+def test_run_raises_exception_of_failing_parameter_set():
+    """
+    A parameter set raising in a worker makes run() raise instead of blocking forever. More tasks than the pool keeps
+    pending are scheduled, so that the failure occurs while tasks are still being submitted.
+    """
+
+    # TruncatedSVD rejects n_components = 0. Distinct values of n_iter yield one task per parameter set.
+    parameter_sets: list = [{"id": i, "n_components": 0, "n_iter": i + 1} for i in range(10)]
+    pool: DimensionalityReductionProcessPool = DimensionalityReductionProcessPool(
+        results=queue.Queue(maxsize=4),
+        distance_matrix=np.random.RandomState(0).uniform(size=(20, 20)),
+        parameter_sets=parameter_sets,
+        input_dataset=None,
+        high_dimensional_neighbourhood_ranking=None,
+        dim_red_kernel_name="SVD",
+        n_jobs=2
+    )
+
+    exceptions: list = []
+
+    def run():
+        try:
+            pool.run()
+        except Exception as exception:
+            exceptions.append(exception)
+
+    thread: threading.Thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=60)
+
+    assert not thread.is_alive(), "run() blocked after parameter set failed."
+    assert len(exceptions) == 1 and isinstance(exceptions[0], ValueError)
+
+
+def test_run_raises_if_worker_process_dies(monkeypatch):
+    """
+    A worker process terminating without raising an exception (e. g. killed for running out of memory) makes run()
+    raise instead of blocking forever.
+    """
+
+    if multiprocessing.get_start_method() != "fork":
+        pytest.skip("Worker processes only inherit patched function if forked.")
+
+    def exit_process(**kwargs):
+        os._exit(1)
+
+    monkeypatch.setattr(DimensionalityReductionThread, "evaluate_parameter_set_group", exit_process)
+    pool: DimensionalityReductionProcessPool = DimensionalityReductionProcessPool(
+        results=queue.Queue(),
+        distance_matrix=np.random.RandomState(0).uniform(size=(20, 20)),
+        parameter_sets=[{"id": i, "n_components": 2, "n_iter": i + 1} for i in range(10)],
+        input_dataset=None,
+        high_dimensional_neighbourhood_ranking=None,
+        dim_red_kernel_name="SVD",
+        n_jobs=2
+    )
+
+    exceptions: list = []
+
+    def run():
+        try:
+            pool.run()
+        except Exception as exception:
+            exceptions.append(exception)
+
+    thread: threading.Thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=60)
+
+    assert not thread.is_alive(), "run() blocked after worker process died."
+    assert len(exceptions) == 1 and isinstance(exceptions[0], BrokenProcessPool)
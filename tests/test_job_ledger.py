@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+import tables
+
+# Required by data_generation's package imports.
+pytest.importorskip("MulticoreTSNE")
+pytest.importorskip("umap")
+pytest.importorskip("coranking")
+pytest.importorskip("dropbox")
+pytest.importorskip("lightgbm")
+pytest.importorskip("skrules")
+
+from data_generation.JobLedger import JobLedger
+
+
+PARAMETER_CONFIG: list = [
+    {"name": "n_neighbors", "type": "numeric"},
+    {"name": "min_dist", "type": "numeric"},
+    {"name": "metric", "type": "categorical"}
+]
+
+
+class MetadataDescription(tables.IsDescription):
+    id = tables.UInt32Col(pos=0)
+    n_neighbors = tables.UInt16Col(pos=1)
+    min_dist = tables.Float32Col(pos=2)
+    metric = tables.StringCol(20, pos=3)
+
+
+def generate_parameter_sets() -> list:
+    return [
+        {"n_neighbors": n_neighbors, "min_dist": min_dist, "metric": "cosine"}
+        for n_neighbors in (2, 5) for min_dist in (0.1, 0.3)
+    ]
+
+
+def test_equivalent_parameter_sets_have_same_hash():
+    parameter_hash: str = JobLedger.hash_parameter_set(
+        {"n_neighbors": 1, "min_dist": 0.1, "metric": "cosine", "id": 3}, PARAMETER_CONFIG
+    )
+
+    assert parameter_hash == JobLedger.hash_parameter_set(
+        {"n_neighbors": 1.0, "min_dist": np.float32(0.1), "metric": b"cosine"}, PARAMETER_CONFIG
+    )
+    assert parameter_hash == JobLedger.hash_parameter_set(
+        {"n_neighbors": np.int32(1), "min_dist": 0.1, "metric": "cosine"}, PARAMETER_CONFIG
+    )
+    assert parameter_hash != JobLedger.hash_parameter_set(
+        {"n_neighbors": 1, "min_dist": 0.1001, "metric": "cosine"}, PARAMETER_CONFIG
+    )
+
+
+def test_model_ids_are_grid_positions_unless_taken():
+    parameter_sets: list = generate_parameter_sets()
+    # Models of a file without ledger, whose IDs don't match grid positions.
+    model_ids: dict = {
+        JobLedger.hash_parameter_set(parameter_sets[2], PARAMETER_CONFIG): 0,
+        JobLedger.hash_parameter_set(parameter_sets[3], PARAMETER_CONFIG): 5
+    }
+
+    pending_parameter_sets: list = JobLedger.assign_model_ids(parameter_sets, model_ids, PARAMETER_CONFIG)
+
+    assert [parameter_set["id"] for parameter_set in pending_parameter_sets] == [6, 1]
+    assert [
+        {name: value for name, value in parameter_set.items() if name != "id"}
+        for parameter_set in pending_parameter_sets
+    ] == generate_parameter_sets()[:2]
+
+
+def test_resume_rolls_back_uncommitted_models(tmp_path):
+    file_path: str = str(tmp_path / "embeddings.h5")
+    parameter_sets: list = generate_parameter_sets()
+
+    # File created before the ledger was introduced, with two models.
+    with tables.open_file(file_path, mode="w") as h5file:
+        metadata_table: tables.Table = h5file.create_table(h5file.root, "metadata", MetadataDescription)
+        metadata_table.append([
+            (i, parameter_set["n_neighbors"], parameter_set["min_dist"], parameter_set["metric"])
+            for i, parameter_set in enumerate(parameter_sets[:2])
+        ])
+
+    # Run completing model 2 and interrupted while writing model 3.
+    with tables.open_file(file_path, mode="a") as h5file:
+        job_ledger: JobLedger = JobLedger(h5file, PARAMETER_CONFIG)
+        assert sorted(job_ledger.model_ids.values()) == [0, 1]
+
+        pending_parameter_sets: list = JobLedger.assign_model_ids(
+            generate_parameter_sets(), job_ledger.model_ids, PARAMETER_CONFIG
+        )
+        assert [parameter_set["id"] for parameter_set in pending_parameter_sets] == [2, 3]
+        for parameter_set in pending_parameter_sets:
+            h5file.root.metadata.append([(
+                parameter_set["id"], parameter_set["n_neighbors"], parameter_set["min_dist"], parameter_set["metric"]
+            )])
+        h5file.root.metadata.flush()
+        job_ledger.record(pending_parameter_sets[0], pending_parameter_sets[0]["id"])
+        job_ledger.commit()
+
+    with tables.open_file(file_path, mode="a") as h5file:
+        job_ledger = JobLedger(h5file, PARAMETER_CONFIG)
+        job_ledger.roll_back_metadata()
+
+        assert sorted(job_ledger.model_ids.values()) == [0, 1, 2]
+        assert h5file.root.metadata.col("id").tolist() == [0, 1, 2]
+        assert [
+            parameter_set["id"] for parameter_set in
+            JobLedger.assign_model_ids(generate_parameter_sets(), job_ledger.model_ids, PARAMETER_CONFIG)
+        ] == [3]
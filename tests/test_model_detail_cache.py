@@ -0,0 +1,41 @@
+import os
+import time
+from model_detail_cache import ModelDetailCache
+
+
+def list_response_files(cache_path: str) -> list:
+    return sorted(
+        os.path.relpath(os.path.join(directory, file_name), cache_path)
+        for directory, _, file_names in os.walk(cache_path) for file_name in file_names
+    )
+
+
+def test_outdated_versions_are_deleted(tmp_path):
+    cache: ModelDetailCache = ModelDetailCache(cache_path=str(tmp_path))
+    cache.get(("movie", "tsne", 0, 1), lambda: b"old")
+    cache.get(("movie", "tsne", 1, 1, "displacement", None), lambda: b"old")
+    cache.get(("movie", "umap", 0, 1), lambda: b"other kernel")
+    cache.get(("movie", "tsne", 0, 2), lambda: b"new")
+
+    assert list_response_files(str(tmp_path)) == [
+        os.path.join("movie_tsne", "2", "0.response"), os.path.join("movie_umap", "1", "0.response")
+    ]
+
+
+def test_second_tier_is_bounded_in_least_recently_used_order(tmp_path):
+    cache: ModelDetailCache = ModelDetailCache(max_size=0, cache_path=str(tmp_path), max_disk_size=250)
+    for model_id in range(3):
+        cache.get(("movie", "tsne", model_id, 1), lambda: b"x" * 100)
+        # Make sure modification times differ.
+        time.sleep(0.01)
+    assert list_response_files(str(tmp_path)) == [
+        os.path.join("movie_tsne", "1", str(model_id) + ".response") for model_id in (1, 2)
+    ]
+
+    # Loading a response from disk marks it as recently used.
+    assert cache.get(("movie", "tsne", 1, 1), lambda: b"recomputed") == b"x" * 100
+    time.sleep(0.01)
+    cache.get(("movie", "tsne", 3, 1), lambda: b"x" * 100)
+    assert list_response_files(str(tmp_path)) == [
+        os.path.join("movie_tsne", "1", str(model_id) + ".response") for model_id in (1, 3)
+    ]
@@ -0,0 +1,76 @@
+import queue
+import numpy as np
+import pytest
+import tables
+
+# Required by data_generation's package imports.
+pytest.importorskip("MulticoreTSNE")
+pytest.importorskip("umap")
+pytest.importorskip("coranking")
+pytest.importorskip("dropbox")
+pytest.importorskip("lightgbm")
+pytest.importorskip("skrules")
+
+from data_generation.PersistenceThread import PersistenceThread
+
+
+def test_failing_writer_closes_file_and_records_exception(tmp_path):
+    """
+    An exception while writing results terminates the thread with the file closed and the exception recorded. stop()
+    doesn't block afterwards, even if the queue is full.
+    """
+
+    results: queue.Queue = queue.Queue(maxsize=1)
+    persistence_thread: PersistenceThread = PersistenceThread(
+        results=results,
+        expected_number_of_results=2,
+        total_number_of_results=2,
+        dataset_name="test",
+        dim_red_kernel_name="SVD",
+        storage_path=str(tmp_path)
+    )
+    persistence_thread.start()
+
+    # Result without objectives can't be written.
+    results.put({
+        "parameter_set": {"id": 0, "n_components": 2, "n_iter": 5},
+        "low_dimensional_projection": np.zeros((10, 2))
+    })
+    persistence_thread.join(timeout=60)
+
+    assert not persistence_thread.is_alive()
+    assert isinstance(persistence_thread.exception, KeyError)
+    assert not persistence_thread._h5file.isopen
+
+    results.put({})
+    persistence_thread.stop()
+
+
+def test_models_with_more_records_than_int16_can_represent_are_written(tmp_path):
+    num_records: int = 40000
+    results: queue.Queue = queue.Queue()
+    persistence_thread: PersistenceThread = PersistenceThread(
+        results=results,
+        expected_number_of_results=1,
+        total_number_of_results=1,
+        dataset_name="test",
+        dim_red_kernel_name="SVD",
+        storage_path=str(tmp_path)
+    )
+    persistence_thread.start()
+
+    results.put({
+        "parameter_set": {"id": 0, "n_components": 2, "n_iter": 5},
+        "low_dimensional_projection": np.zeros((num_records, 2)),
+        "objectives": {
+            "runtime": 1, "r_nx": 0.5, "b_nx": 0, "stress": 0.1, "target_domain_performance": 0.5,
+            "separability_metric": 0.5, "pointwise_quality_values": np.zeros(num_records)
+        },
+        "intermediate_runtimes": {},
+        "objective_runtimes": {}
+    })
+    persistence_thread.join(timeout=60)
+
+    assert persistence_thread.exception is None
+    with tables.open_file(str(tmp_path / "embedding_svd.h5"), mode="r") as h5file:
+        assert h5file.root.metadata.col("num_records").tolist() == [num_records]
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+import sklearn.metrics
+
+# Required by data_generation's package imports.
+pytest.importorskip("MulticoreTSNE")
+pytest.importorskip("umap")
+pytest.importorskip("coranking")
+pytest.importorskip("dropbox")
+pytest.importorskip("lightgbm")
+pytest.importorskip("skrules")
+
+from data_generation.datasets.SeparabilityEvaluator import SeparabilityEvaluator
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_silhouette_score_matches_sklearn_with_hamming_distance(seed: int):
+    rng: np.random.RandomState = np.random.RandomState(seed)
+    n: int = 300
+    labels: np.ndarray = rng.randint(0, 4, n)
+    # Clusters correlated with labels, including noise (-1) and singleton clusters as produced by HDBSCAN.
+    cluster_labels: np.ndarray = np.where(rng.rand(n) < 0.6, labels, rng.randint(-1, 12, n))
+    cluster_labels[:3] = [100, 101, 102]
+
+    assert SeparabilityEvaluator(labels).compute_silhouette_score(cluster_labels) == pytest.approx(
+        sklearn.metrics.silhouette_score(X=labels.reshape(-1, 1), labels=cluster_labels, metric="hamming"), abs=1e-12
+    )
+
+
+def test_silhouette_score_is_undefined_for_degenerate_clusterings():
+    separability_evaluator: SeparabilityEvaluator = SeparabilityEvaluator(np.array([0, 0, 1, 1]))
+
+    assert separability_evaluator.compute_silhouette_score(np.zeros(4, dtype=int)) is None
+    assert separability_evaluator.compute_silhouette_score(np.arange(4)) is None
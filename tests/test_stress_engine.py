@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("coranking")
+
+from scipy.spatial import distance
+from objectives.distance_preservation_objectives.Stress import Stress
+from objectives.distance_preservation_objectives.StressEngine import StressEngine
+
+
+def compute_stress_with_squareform_matrices(high_dim_data: np.ndarray, low_dim_data: np.ndarray) -> float:
+    return Stress(
+        low_dimensional_data=low_dim_data,
+        high_dimensional_data=distance.squareform(distance.pdist(high_dim_data)),
+        distance_metric="precomputed"
+    ).compute()
+
+
+@pytest.mark.parametrize("on_grid", [False, True])
+def test_engine_matches_isotonic_regression_on_squareform_matrices(on_grid: bool):
+    rng: np.random.RandomState = np.random.RandomState(0)
+    high_dim_data: np.ndarray = rng.normal(size=(80, 6))
+    low_dim_data: np.ndarray = high_dim_data[:, :2] + rng.normal(scale=0.3, size=(80, 2))
+    if on_grid:
+        # Integer coordinates yield many pairs with identical low-dimensional distances, i. e. blocks of size > 1.
+        low_dim_data = np.round(low_dim_data * 2)
+
+    expected_stress: float = compute_stress_with_squareform_matrices(high_dim_data, low_dim_data)
+    engine: StressEngine = StressEngine.from_high_dimensional_data(high_dim_data)
+
+    assert engine.compute(low_dim_data) == pytest.approx(expected_stress, rel=1e-9)
+    assert StressEngine.from_distance_matrix(
+        distance.squareform(distance.pdist(high_dim_data)), pair_budget=10 ** 6
+    ).compute(low_dim_data) == pytest.approx(expected_stress, rel=1e-9)
+    stress, lower_bound, upper_bound = engine.estimate(low_dim_data)
+    assert stress == pytest.approx(expected_stress, rel=1e-9) and lower_bound == stress == upper_bound
+
+
+def test_subsampled_engine_estimates_stress():
+    rng: np.random.RandomState = np.random.RandomState(0)
+    high_dim_data: np.ndarray = rng.normal(size=(300, 6))
+    low_dim_data: np.ndarray = high_dim_data[:, :2] + rng.normal(scale=0.3, size=(300, 2))
+
+    engine: StressEngine = StressEngine.from_distance_matrix(
+        distance.squareform(distance.pdist(high_dim_data)), pair_budget=20000
+    )
+    assert engine.is_subsampled
+    stress, lower_bound, upper_bound = engine.estimate(low_dim_data)
+
+    assert lower_bound < stress < upper_bound
+    assert stress == pytest.approx(compute_stress_with_squareform_matrices(high_dim_data, low_dim_data), rel=0.05)